@@ -9,7 +9,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('ai_prompts.json', '.'), ('config.json', '.'), ('resources', 'resources')],
-    hiddenimports=['PIL._tkinter_finder', 'openai', 'anthropic', 'whisper', 'pydub', 'moviepy'],
+    hiddenimports=['PIL._tkinter_finder', 'openai', 'anthropic', 'whisper', 'pydub', 'moviepy', 'tiktoken', 'tiktoken_ext.openai_public'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -33,6 +33,7 @@ hiddenimports = []
 hiddenimports += collect_submodules('whisper')
 hiddenimports += collect_submodules('anthropic')
 hiddenimports += collect_submodules('openai')
+hiddenimports += collect_submodules('tiktoken') + collect_submodules('tiktoken_ext')
 hiddenimports += ['PIL', 'PIL._tkinter_finder']
 
 a = Analysis(
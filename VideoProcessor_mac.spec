@@ -20,7 +20,9 @@ a = Analysis(
         'anthropic',
         'whisper',
         'pydub',
-        'moviepy'
+        'moviepy',
+        'tiktoken',
+        'tiktoken_ext.openai_public'
     ],
     hookspath=[],
     hooksconfig={},
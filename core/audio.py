@@ -0,0 +1,357 @@
+"""
+Audio decoding and chunking helpers for the Video Processor application.
+
+Audio is handled as 16 kHz mono samples, the rate Whisper works at, so
+chunks can be passed to the transcriber without resampling.
+"""
+import os
+import math
+import struct
+import logging
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger("VideoProcessor")
+
+# Whisper's native sample rate
+SAMPLE_RATE = 16000
+
+
+def load_audio_array(media_path, sample_rate=SAMPLE_RATE):
+    """
+    Decode the audio track of a media file straight into memory.
+
+    ffmpeg writes raw mono float32 PCM to stdout, which is wrapped in a NumPy
+    array without touching the disk.
+
+    Args:
+        media_path (str): Path to the video or audio file
+        sample_rate (int): Output sample rate in Hz
+
+    Returns:
+        numpy.ndarray: float32 samples in the range [-1, 1]
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-i", media_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "f32le", "-acodec", "pcm_f32le", "-"
+    ]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+
+    samples = np.frombuffer(process.stdout, dtype=np.float32)
+    if samples.size == 0:
+        raise RuntimeError(f"No audio decoded from {media_path}")
+    return samples
+
+
+def split_audio_array(samples, chunk_seconds=30, sample_rate=SAMPLE_RATE):
+    """Split an in-memory signal into consecutive chunk views (no copies)"""
+    chunk_length = int(chunk_seconds * sample_rate)
+    return [samples[start:start + chunk_length] for start in range(0, len(samples), chunk_length)]
+
+
+def extraction_ranges(duration, segments, min_segment_seconds=60):
+    """
+    Split a recording into time ranges that are decoded in parallel.
+
+    Ranges start on whole seconds, so each one begins on an exact sample at
+    SAMPLE_RATE. The last range has no length and runs to the end of the file.
+
+    Returns:
+        list: (start_seconds, seconds) tuples; a single range for short recordings
+    """
+    count = max(1, min(int(segments), int(duration // max(1, min_segment_seconds))))
+    length = math.ceil(duration / count)
+    starts = [i * length for i in range(count) if i * length < duration]
+    return [(start, length) for start in starts[:-1]] + [(starts[-1], None)]
+
+
+def _range_command(media_path, start, seconds, sample_rate, output):
+    """ffmpeg command decoding one range to raw mono float32 PCM"""
+    # With -ss before -i and decoding, ffmpeg seeks to the nearest keyframe and
+    # decodes up to the exact start time (accurate seeking)
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-accurate_seek", "-ss", str(start), "-i", media_path]
+    if seconds is not None:
+        command += ["-t", str(seconds)]
+    return command + ["-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "-acodec", "pcm_f32le", "-y", output]
+
+
+def _range_frames(ranges, duration, sample_rate):
+    """Exact sample count of every range (the last one is an upper bound)"""
+    frames = [int(seconds * sample_rate) for _, seconds in ranges[:-1]]
+    return frames + [int(math.ceil((duration - ranges[-1][0] + 1) * sample_rate))]
+
+
+def _read_exactly(stream, buffer):
+    """Fill a memoryview from a pipe; returns the number of bytes read"""
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(buffer[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def load_audio_array_parallel(media_path, duration, segments=4, sample_rate=SAMPLE_RATE, min_segment_seconds=60):
+    """
+    Decode the audio track with one ffmpeg process per time range.
+
+    Every process writes straight into its own slice of one preallocated
+    array, so the ranges join without gaps, overlaps or a concatenation copy.
+    A range that decodes a few samples short (decoder priming) is padded with
+    silence to keep every later sample at its original time.
+
+    Args:
+        media_path (str): Path to the video or audio file
+        duration (float): Probed duration in seconds
+        segments (int): Largest number of parallel decodes
+        sample_rate (int): Output sample rate in Hz
+        min_segment_seconds (float): Shortest range worth its own process
+
+    Returns:
+        numpy.ndarray: float32 samples, as load_audio_array would return them
+    """
+    ranges = extraction_ranges(duration, segments, min_segment_seconds)
+    if len(ranges) == 1:
+        return load_audio_array(media_path, sample_rate)
+
+    frames = _range_frames(ranges, duration, sample_rate)
+    offsets = np.cumsum([0] + frames)
+    samples = np.zeros(offsets[-1], dtype=np.float32)
+    view = memoryview(samples).cast("B")
+
+    def decode(index):
+        start, seconds = ranges[index]
+        # stderr goes to a file: a damaged file can log more than a pipe holds,
+        # which would block ffmpeg while this thread waits on stdout
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(_range_command(media_path, start, seconds, sample_rate, "-"),
+                                       stdout=subprocess.PIPE, stderr=stderr)
+            filled = _read_exactly(process.stdout, view[offsets[index] * 4:offsets[index + 1] * 4])
+            # Past a middle range's exact length is only resampler rounding; past the
+            # last range's estimate is real audio the probe didn't account for
+            overflow = process.stdout.read()
+            process.stdout.close()
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"FFmpeg error: {stderr.read().decode('utf-8', errors='replace')}")
+        if seconds is not None and filled < frames[index] * 4:
+            logger.debug(f"Range at {start}s of {media_path} decoded {frames[index] - filled // 4} samples short")
+        return filled // 4, overflow
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        decoded = list(executor.map(decode, range(len(ranges))))
+
+    filled, overflow = decoded[-1]
+    end = offsets[-2] + filled
+    if end == 0:
+        raise RuntimeError(f"No audio decoded from {media_path}")
+    if overflow:
+        return np.concatenate([samples[:end], np.frombuffer(overflow[:len(overflow) // 4 * 4], dtype=np.float32)])
+    return samples[:end]
+
+
+def write_float_wav_header(f, frames, sample_rate=SAMPLE_RATE):
+    """Write the header of a mono IEEE float WAV file holding frames samples"""
+    data_size = frames * 4
+    f.write(struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"))
+    f.write(struct.pack("<4sIHHIIHH", b"fmt ", 16, 3, 1, sample_rate, sample_rate * 4, 4, 32))
+    f.write(struct.pack("<4sI", b"data", data_size))
+
+
+def extract_audio_file_parallel(media_path, wav_path, duration, segments=4, sample_rate=SAMPLE_RATE,
+                                min_segment_seconds=60):
+    """
+    Decode the audio track to a mono float32 WAV with one ffmpeg process per range.
+
+    Like load_audio_array_parallel, but the ranges are decoded to part files
+    next to wav_path and streamed into the WAV, so memory use stays small.
+
+    Returns:
+        int: Number of samples written
+    """
+    ranges = extraction_ranges(duration, segments, min_segment_seconds)
+    frames = _range_frames(ranges, duration, sample_rate)
+    parts = [f"{wav_path}.part{index}" for index in range(len(ranges))]
+
+    def decode(index):
+        start, seconds = ranges[index]
+        process = subprocess.run(_range_command(media_path, start, seconds, sample_rate, parts[index]),
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            list(executor.map(decode, range(len(ranges))))
+
+        # Middle ranges are trimmed or padded to their exact length; the last is taken as is
+        lengths = frames[:-1] + [os.path.getsize(parts[-1]) // 4]
+        total = sum(lengths)
+        if total == 0:
+            raise RuntimeError(f"No audio decoded from {media_path}")
+        block = 1024 * 1024
+        with open(wav_path, "wb") as out:
+            write_float_wav_header(out, total, sample_rate)
+            for part, length in zip(parts, lengths):
+                remaining = length * 4
+                with open(part, "rb") as f:
+                    while remaining:
+                        data = f.read(min(block, remaining)) or bytes(min(block, remaining))
+                        out.write(data)
+                        remaining -= len(data)
+        return total
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+
+
+def read_wav_header(wav_path):
+    """
+    Locate the PCM data region of a WAV file.
+
+    Returns:
+        dict: sample_rate, channels, dtype, data_offset and frames
+    """
+    file_size = os.path.getsize(wav_path)
+    with open(wav_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"Not a WAV file: {wav_path}")
+
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"WAV file has no data chunk: {wav_path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+            if chunk_id == b"fmt ":
+                fmt_data = f.read(chunk_size)
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt_data[:16])
+                if audio_format == 0xFFFE and len(fmt_data) >= 26:  # WAVE_FORMAT_EXTENSIBLE
+                    audio_format = struct.unpack("<H", fmt_data[24:26])[0]
+                fmt = (audio_format, channels, sample_rate, bits)
+                f.seek(chunk_size % 2, 1)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                # Streamed WAVs can carry a placeholder size, so trust the file length instead
+                if chunk_size == 0 or data_offset + chunk_size > file_size:
+                    chunk_size = file_size - data_offset
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    if fmt is None:
+        raise ValueError(f"WAV file has no fmt chunk: {wav_path}")
+
+    audio_format, channels, sample_rate, bits = fmt
+    dtypes = {(1, 16): np.int16, (1, 32): np.int32, (3, 32): np.float32}
+    if (audio_format, bits) not in dtypes:
+        raise ValueError(f"Unsupported WAV sample format {audio_format} ({bits} bit): {wav_path}")
+    dtype = np.dtype(dtypes[(audio_format, bits)])
+
+    return {
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "dtype": dtype,
+        "data_offset": data_offset,
+        "frames": chunk_size // (channels * dtype.itemsize),
+    }
+
+
+def to_whisper_samples(frames, sample_rate):
+    """
+    Convert a (frames, channels) block to mono float32 at SAMPLE_RATE.
+
+    16 kHz mono float32 input is returned as a view without copying.
+    """
+    if frames.dtype == np.int16:
+        frames = frames.astype(np.float32) / 32768.0
+    elif frames.dtype == np.int32:
+        frames = frames.astype(np.float32) / 2147483648.0
+
+    if frames.shape[1] == 1:
+        samples = np.asarray(frames[:, 0])
+    else:
+        samples = frames.mean(axis=1, dtype=np.float32)
+
+    if sample_rate != SAMPLE_RATE and len(samples):
+        target_length = int(round(len(samples) * SAMPLE_RATE / sample_rate))
+        positions = np.arange(target_length) * (sample_rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+class WavChunker:
+    """
+    Memory-mapped chunker for WAV files of any length.
+
+    Chunks are produced lazily from a numpy.memmap of the PCM region, so peak
+    memory is bounded by the chunk size rather than the recording length.
+    Supports len() and iteration, so it can stand in for a list of chunks.
+    """
+
+    def __init__(self, wav_path, chunk_seconds=30):
+        header = read_wav_header(wav_path)
+        self.wav_path = wav_path
+        self.sample_rate = header["sample_rate"]
+        self.frames = header["frames"]
+        self.chunk_length = max(1, int(chunk_seconds * self.sample_rate))
+        if self.frames == 0:
+            raise ValueError(f"WAV file contains no audio: {wav_path}")
+        self._pcm = np.memmap(
+            wav_path, dtype=header["dtype"], mode="c",
+            offset=header["data_offset"], shape=(self.frames, header["channels"])
+        )
+
+    @property
+    def duration(self):
+        """Length of the recording in seconds"""
+        return self.frames / self.sample_rate
+
+    def __len__(self):
+        return math.ceil(self.frames / self.chunk_length)
+
+    def __iter__(self):
+        for start in range(0, self.frames, self.chunk_length):
+            yield to_whisper_samples(self._pcm[start:start + self.chunk_length], self.sample_rate)
+
+    def read(self, start_seconds, end_seconds):
+        """Return the 16 kHz mono samples between two timestamps"""
+        start = int(start_seconds * self.sample_rate)
+        end = int(end_seconds * self.sample_rate)
+        return to_whisper_samples(self._pcm[start:end], self.sample_rate)
+
+
+def array_reader(samples, sample_rate=SAMPLE_RATE):
+    """Return a read(start_seconds, end_seconds) function over an in-memory signal"""
+    return lambda start, end: samples[int(start * sample_rate):int(end * sample_rate)]
+
+
+class SpanChunks:
+    """
+    Lazily materialized chunks, each made of (start, end) second spans.
+
+    Single-span chunks are returned as views of the source; chunks that skip
+    silence are joined into one buffer the size of the chunk.
+    """
+
+    def __init__(self, read, chunks):
+        self.read = read
+        self.chunks = chunks
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __iter__(self):
+        for spans in self.chunks:
+            parts = [self.read(start, end) for start, end in spans]
+            yield parts[0] if len(parts) == 1 else np.concatenate(parts)
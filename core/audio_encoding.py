@@ -0,0 +1,95 @@
+"""
+Compressed chunk encoding for remote transcription in the Video Processor application.
+
+Chunks uploaded to the whisper-1 API are encoded with an encoding profile
+(16 kHz mono Opus by default; Whisper resamples everything to 16 kHz mono
+anyway) instead of 44.1 kHz stereo WAV. Each chunk is made as long as the
+profile's bitrate allows within the API's upload limit, so a video needs far
+fewer bytes and far fewer requests.
+"""
+import os
+import glob
+import logging
+import subprocess
+
+from core.audio import SAMPLE_RATE
+
+logger = logging.getLogger("VideoProcessor")
+
+# bitrate_kbps is what chunk lengths are sized by; lossless codecs use the raw
+# PCM bitrate because how well they compress depends on the audio
+ENCODING_PROFILES = {
+    "opus": {"codec": "libopus", "format": "ogg", "bitrate": "24k", "bitrate_kbps": 24},
+    "flac": {"codec": "flac", "format": "flac", "bitrate": None, "bitrate_kbps": 256},
+    "wav": {"codec": "pcm_s16le", "format": "wav", "bitrate": None, "bitrate_kbps": 256},
+}
+
+DEFAULT_PROFILE = "opus"
+
+# Largest file the OpenAI transcription endpoint accepts
+UPLOAD_LIMIT_MB = 25
+
+
+def get_encoding_profile(config):
+    """Return (name, profile) of the whisper_api.encoding profile"""
+    name = config.get("whisper_api", {}).get("encoding", DEFAULT_PROFILE)
+    if name not in ENCODING_PROFILES:
+        logger.warning(f"Unknown encoding profile {name}, using {DEFAULT_PROFILE}")
+        name = DEFAULT_PROFILE
+    return name, ENCODING_PROFILES[name]
+
+
+def chunk_seconds(profile, upload_limit_mb=UPLOAD_LIMIT_MB, max_chunk_seconds=None, headroom=0.9):
+    """
+    Return the chunk length that keeps a chunk of this profile under the upload limit.
+
+    Args:
+        profile (dict): Encoding profile
+        upload_limit_mb (float): Largest upload the API accepts
+        max_chunk_seconds (float): Optional cap, so long videos are still split
+            into several chunks that upload in parallel
+        headroom (float): Fraction of the limit to fill, leaving room for
+            container overhead and bitrate variation
+    """
+    seconds = int(upload_limit_mb * 1024 * 1024 * 8 * headroom / (profile["bitrate_kbps"] * 1000))
+    if max_chunk_seconds:
+        seconds = min(seconds, int(max_chunk_seconds))
+    return max(1, seconds)
+
+
+def encode_chunks(input_path, output_dir, profile, seconds, prefix="chunk"):
+    """
+    Encode audio into 16 kHz mono chunks of the given length with one ffmpeg run.
+
+    Returns:
+        list: Chunk file paths, in order
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    for old in glob.glob(os.path.join(output_dir, f"{prefix}_*.{profile['format']}")):
+        os.remove(old)
+
+    # Bit-exact output (no random Ogg stream serials, encoder tags or copied
+    # metadata) keeps the same audio encoding to the same bytes, which the
+    # transcript cache keys chunks by
+    command = [
+        "ffmpeg", "-i", input_path, "-vn",
+        "-fflags", "+bitexact", "-flags:a", "+bitexact", "-map_metadata", "-1",
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-c:a", profile["codec"],
+    ]
+    if profile["bitrate"]:
+        command += ["-b:a", profile["bitrate"]]
+    command += [
+        "-f", "segment", "-segment_time", str(seconds), "-reset_timestamps", "1",
+        "-y", os.path.join(output_dir, f"{prefix}_%05d.{profile['format']}")
+    ]
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    return sorted(glob.glob(os.path.join(output_dir, f"{prefix}_*.{profile['format']}")))
+
+
+def oversized_chunks(paths, upload_limit_mb=UPLOAD_LIMIT_MB):
+    """Return the chunk files that are larger than the upload limit"""
+    limit = upload_limit_mb * 1024 * 1024
+    return [path for path in paths if os.path.getsize(path) > limit]
@@ -0,0 +1,74 @@
+"""
+Transcript compaction for the Video Processor application.
+
+Removes text that costs prompt tokens without carrying content: failed-chunk
+markers, filler words, stuttered words and repeated sentences (Whisper tends
+to repeat itself over music and silence).
+"""
+import re
+import logging
+
+from core.tokens import count_tokens
+
+logger = logging.getLogger("VideoProcessor")
+
+# Placeholder written for chunks that could not be transcribed
+FAILED_SEGMENT_MARKER = "[Transcription failed for this segment]"
+
+# Only sounds that are never words ("um", "uh", "erm"); interjections like
+# "hmm" or "mhm" can answer a question
+FILLER_PATTERN = re.compile(r"(?<![\w'])(?:u+h+m*|u+m+|e+r+m+)(?![\w'])[,.]?\s*", re.IGNORECASE)
+# "you know" only as an aside between commas or before the end of a sentence;
+# "do you know" and "you know what" are content
+YOU_KNOW_PATTERN = re.compile(r",\s*you know(?=\s*[,.!?])", re.IGNORECASE)
+# Three or more repeats; a doubled word is often grammatical ("had had", "that that")
+STUTTER_PATTERN = re.compile(r"\b(\w+)(?:[,\s]+\1\b){2,}", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Sentences at least this long are dropped when repeated anywhere, shorter
+# ones ("Thank you.") only when repeated back to back
+MIN_WORDS_FOR_GLOBAL_DEDUPE = 8
+
+
+def _sentence_key(sentence):
+    """Normalize a sentence for duplicate detection"""
+    return re.sub(r"[^\w\s]", "", sentence.lower()).split()
+
+
+def compact_transcript(text):
+    """
+    Remove failure markers, fillers, stutters and duplicate sentences.
+
+    Returns:
+        str: The compacted transcript
+    """
+    text = text.replace(FAILED_SEGMENT_MARKER, " ")
+    text = FILLER_PATTERN.sub("", text)
+    text = YOU_KNOW_PATTERN.sub("", text)
+    text = STUTTER_PATTERN.sub(r"\1", text)
+
+    kept, seen, previous = [], set(), None
+    for sentence in SENTENCE_PATTERN.split(text.strip()):
+        words = _sentence_key(sentence)
+        if not words:
+            continue
+        key = " ".join(words)
+        if key == previous or (len(words) >= MIN_WORDS_FOR_GLOBAL_DEDUPE and key in seen):
+            continue
+        seen.add(key)
+        previous = key
+        # A removed filler may have left a lowercase sentence start
+        kept.append(sentence[0].upper() + sentence[1:])
+
+    return re.sub(r"\s+", " ", " ".join(kept)).strip()
+
+
+def compact_with_report(text, model=None):
+    """
+    Compact a transcript and count the tokens it saves.
+
+    Returns:
+        tuple: (compacted text, tokens before, tokens after)
+    """
+    compacted = compact_transcript(text)
+    return compacted, count_tokens(text, model), count_tokens(compacted, model)
@@ -0,0 +1,145 @@
+"""
+Social media content generation for the Video Processor application.
+
+Turns a transcript into the social media JSON: compacts the transcript,
+condenses it if it is too long for the model, and runs either one request for
+every field or one streamed request per field. Responses are requested in the
+provider's JSON mode, validated against the schema the Results tab expects and
+repaired with one follow-up request when they are invalid.
+"""
+import json
+import logging
+
+from core.compaction import compact_with_report
+from core.llm import complete, hedged_complete
+from core.map_reduce import condense_transcript
+from core.platform_content import generate_platform_content
+from core.structured_output import (ANY_OBJECT_SCHEMA, SOCIAL_MEDIA_SCHEMA, IncrementalJSONParser,
+                                    response_errors, structured_response)
+from core.tokens import context_window, count_tokens
+
+logger = logging.getLogger("VideoProcessor")
+
+SYSTEM_PROMPT = "You are a social media content creator assistant."
+
+# Built-in prompt; the transcript is appended to it
+CONTENT_PROMPT = """
+            Based on the following transcript, generate social media content in JSON format:
+            1. A catchy title for YouTube
+            2. A description for YouTube (with appropriate hashtags)
+            3. Three tweets/posts for Twitter/X
+            4. A LinkedIn post
+            5. Three short clips suggestions with timestamps (if identifiable)
+
+            Format the response as a valid JSON object with these keys:
+            youtube_title, youtube_description, tweets, linkedin_post, clip_suggestions
+
+            Transcript:
+            """
+
+
+def is_json_object(content):
+    """Whether a response is a JSON object (a usable social media response)"""
+    try:
+        return isinstance(json.loads(content), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+def _default_log(message, level="INFO"):
+    """Log to the application logger"""
+    if level == "ERROR":
+        logger.error(message)
+    elif level == "WARNING":
+        logger.warning(message)
+    else:
+        logger.info(message)
+
+
+def generate_social_media_content(config, transcript, prompts=None, name=None, log=None, on_update=None):
+    """
+    Generate social media content from a transcript.
+
+    Args:
+        config (dict): Application configuration
+        transcript (str): Full transcript
+        prompts (dict): "system_prompt" and a "content_generation_prompt" with a
+            {transcript} placeholder (as edited in the Prompts tab); the
+            built-in prompt is used when omitted
+        name (str): Video name for log messages
+        log (callable): log(message, level); defaults to the application logger
+        on_update (callable): on_update(field, value, done) receives each field
+            as it streams in
+
+    Returns:
+        str: The response text (normally a JSON object)
+
+    Raises:
+        Exception: If a request fails or the prompt cannot fit the model
+    """
+    log = log or _default_log
+    openai_config = config.get("openai", {})
+    llm_config = config.get("llm", {})
+    model = openai_config.get("model", "gpt-4")
+    temperature = openai_config.get("temperature", 0.7)
+    max_tokens = openai_config.get("max_tokens", 1000)
+
+    if prompts:
+        system_prompt = prompts["system_prompt"]
+        template = prompts["content_generation_prompt"]
+    else:
+        system_prompt = SYSTEM_PROMPT
+        template = CONTENT_PROMPT + "{transcript}"
+
+    # Drop fillers, repeats and failure markers before paying for their tokens
+    if llm_config.get("compact_transcript", True):
+        transcript, before, after = compact_with_report(transcript, model)
+        percent = 100 * (before - after) / before if before else 0
+        log(f"Transcript compaction saved {before - after} tokens ({before} -> {after}, {percent:.0f}%)"
+            + (f" for {name}" if name else ""))
+
+    # Transcripts too long for the context window are condensed first
+    window = context_window(model)
+    budget = int(window * 0.9) - max_tokens - count_tokens(system_prompt + template.format(transcript=""), model)
+    if llm_config.get("map_reduce", True) and count_tokens(transcript, model) > budget:
+        summary_tokens = llm_config.get("summary_tokens", 500)
+        section_tokens = min(llm_config.get("section_tokens", 4000), int(window * 0.9) - summary_tokens - 200)
+        log(f"Transcript exceeds the {model} context window, summarizing it in sections")
+        transcript = condense_transcript(
+            transcript,
+            lambda system, user, tokens: hedged_complete(config, model, system, user, temperature, tokens),
+            budget, section_tokens, model, summary_tokens, llm_config.get("map_workers", 4)
+        )
+        template = template.replace("Transcript:", "Transcript (summarized in parts):")
+
+    if llm_config.get("per_platform", False) and not prompts:
+        # One streaming request per field, all at once
+        log(f"Generating each platform's content concurrently with model: {model}")
+        return json.dumps(generate_platform_content(
+            config, model, transcript, temperature, max_tokens, on_update=on_update
+        ), indent=2, ensure_ascii=False)
+
+    # Custom prompts choose their own keys, so only the built-in one has a fixed schema
+    schema = ANY_OBJECT_SCHEMA if prompts else SOCIAL_MEDIA_SCHEMA
+    user_prompt = template.format(transcript=transcript)
+    log(f"Calling LLM API with model: {model}")
+    if on_update is not None:
+        content = _stream_fields(config, model, system_prompt, user_prompt, temperature, max_tokens, on_update)
+    else:
+        content = hedged_complete(config, model, system_prompt, user_prompt, temperature, max_tokens,
+                                  validate=lambda text: not response_errors(text, schema)[1], json_mode=True)
+    return structured_response(config, model, content, schema, log, max_tokens)
+
+
+def _stream_fields(config, model, system_prompt, user_prompt, temperature, max_tokens, on_update):
+    """Stream one JSON response, reporting each field as it is received and when it is complete"""
+    parser = IncrementalJSONParser(lambda key, value: on_update(key, value, True))
+
+    def on_delta(text):
+        parser.feed(text)
+        partial = parser.partial_value()
+        if partial:
+            on_update(partial[0], partial[1], False)
+
+    return complete(config, model, system_prompt, user_prompt, temperature, max_tokens,
+                    on_delta=on_delta, json_mode=True)
@@ -0,0 +1,174 @@
+"""
+Hedged requests for the Video Processor application.
+
+A request that has not finished by a latency-percentile deadline is duplicated
+(optionally to a fallback model). The first valid response wins and the other
+request is cancelled: its open response is closed from the winner's side, so
+a stalled connection is released at once instead of at its read timeout. A
+budget caps how many requests may be duplicated, so hedging trims tail
+latency without doubling spend.
+"""
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger("VideoProcessor")
+
+MIN_LATENCY_SAMPLES = 5
+
+
+class RequestCancelled(Exception):
+    """Raised inside a request that lost a hedged race"""
+
+
+class Cancellation(threading.Event):
+    """Cancel event that also closes the responses registered with on_cancel()"""
+
+    def __init__(self):
+        super().__init__()
+        self._closers = []
+        self._closers_lock = threading.Lock()
+
+    def on_cancel(self, close):
+        """Call close() when the request is cancelled (at once if it already is)"""
+        with self._closers_lock:
+            if not self.is_set():
+                self._closers.append(close)
+                return
+        close()
+
+    def set(self):
+        """Cancel: wake waiters and close registered responses from this thread"""
+        with self._closers_lock:
+            super().set()
+            closers, self._closers = self._closers, []
+        for close in closers:
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Error closing a cancelled request: {str(e)}")
+
+
+class LatencyTracker:
+    """Recent request latencies per model"""
+
+    def __init__(self, window=200):
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, model, seconds):
+        """Record the latency of a completed request"""
+        with self._lock:
+            self._latencies[model].append(seconds)
+
+    def percentile(self, model, percent):
+        """Return the latency percentile for a model, or None with too few samples"""
+        with self._lock:
+            latencies = sorted(self._latencies[model])
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+
+class HedgeBudget:
+    """Allows one hedge plus a fixed fraction of all requests"""
+
+    def __init__(self, ratio=0.1):
+        self.ratio = ratio
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """Count a request that could be hedged"""
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self):
+        """Take one hedge from the budget; return False when it is used up"""
+        with self._lock:
+            if self.hedges >= 1 + self.ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self):
+        """Count a hedge that finished first"""
+        with self._lock:
+            self.wins += 1
+
+    def stats(self):
+        """Return request, hedge and hedge-win counts"""
+        with self._lock:
+            return {"requests": self.requests, "hedges": self.hedges, "hedge_wins": self.wins}
+
+
+# Shared by every request in the process
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+
+
+def hedged_call(primary, hedge, deadline, budget=None, validate=None):
+    """
+    Run primary, and also hedge if primary hasn't finished within deadline.
+
+    Args:
+        primary (callable): primary(cancellation) -> result
+        hedge (callable): hedge(cancellation) -> result; should register its
+            open response with cancellation.on_cancel() and stop with
+            RequestCancelled once cancelled
+        deadline (float): Seconds to wait for primary before hedging
+        budget (HedgeBudget): Limits how many calls are hedged
+        validate (callable): validate(result) -> bool; defaults to truthiness
+
+    Returns:
+        The first valid result. If neither is valid, primary's result (or the
+        hedge's if primary failed); if both raised, primary's error is raised.
+    """
+    validate = validate or bool
+    if budget is not None:
+        budget.record_request()
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        cancels = {}
+        started = time.monotonic()
+        primary_future = executor.submit(primary, cancels.setdefault("primary", Cancellation()))
+        done, _ = wait([primary_future], timeout=deadline)
+        if primary_future in done or (budget is not None and not budget.try_spend()):
+            return primary_future.result()
+
+        logger.info(f"Request still running after {time.monotonic() - started:.1f}s, sending a hedged request")
+        hedge_future = executor.submit(hedge, cancels.setdefault("hedge", Cancellation()))
+        names = {primary_future: "primary", hedge_future: "hedge"}
+
+        results, errors = {}, {}
+        pending = {primary_future, hedge_future}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer the primary when both finish together
+            for future in sorted(done, key=lambda f: names[f] != "primary"):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors[names[future]] = e
+                    continue
+                if validate(result):
+                    for other in pending:
+                        cancels[names[other]].set()
+                    if names[future] == "hedge" and budget is not None:
+                        budget.record_win()
+                    return result
+                results[names[future]] = result
+
+        for name in ("primary", "hedge"):
+            if name in results:
+                return results[name]
+        raise errors.get("primary") or errors["hedge"]
+    finally:
+        # Don't wait for a cancelled loser; it stops on its own
+        executor.shutdown(wait=False)
@@ -0,0 +1,54 @@
+"""
+Job reports for the Video Processor application.
+
+Read-only views of the job store (see core.job_store) for the GUI's Job Status
+and results list and the backend's --jobs listing.
+"""
+import os
+
+
+def list_jobs(store, status=None, output_dir=None, pipeline=None):
+    """
+    Return jobs (newest first) with their chunk progress.
+
+    Each job dict has the jobs table columns plus chunks_done and chunks_total.
+    """
+    sql = ("SELECT jobs.*, COUNT(chunks.idx) AS chunks_total, "
+           "COALESCE(SUM(chunks.status = 'done'), 0) AS chunks_done "
+           "FROM jobs LEFT JOIN chunks ON chunks.job_id = jobs.id")
+    conditions, params = [], []
+    if status:
+        conditions.append("jobs.status = ?")
+        params.append(status)
+    if output_dir:
+        conditions.append("jobs.output_dir = ?")
+        params.append(os.path.abspath(output_dir))
+    if pipeline:
+        conditions.append("jobs.pipeline = ?")
+        params.append(pipeline)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " GROUP BY jobs.id ORDER BY jobs.id DESC"
+    return store.query(sql, params)
+
+
+def status_counts(store, pipeline=None):
+    """Return {status: number of jobs}, optionally of one pipeline only"""
+    sql, params = "SELECT status, COUNT(*) AS count FROM jobs", []
+    if pipeline:
+        sql += " WHERE pipeline = ?"
+        params.append(pipeline)
+    return {row["status"]: row["count"] for row in store.query(sql + " GROUP BY status", params)}
+
+
+def format_jobs(jobs):
+    """Format jobs as a plain-text table for the terminal and CLI"""
+    lines = [f"{'ID':>5}  {'STATUS':<8}  {'PIPELINE':<11}  {'STAGE':<10}  {'CHUNKS':>7}  {'TRIES':>5}  VIDEO"]
+    for job in jobs:
+        chunks = f"{job['chunks_done']}/{job['chunks_total']}" if job["chunks_total"] else "-"
+        line = (f"{job['id']:>5}  {job['status']:<8}  {job['pipeline']:<11}  {job['stage'] or '-':<10}  "
+                f"{chunks:>7}  {job['attempts']:>5}  {os.path.basename(job['video_path'])}")
+        if job["error"]:
+            line += f"  ({job['error']})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,354 @@
+"""
+Persistent job store for the Video Processor application.
+
+Every video processed is a job in a SQLite database (WAL mode, so the GUI and
+CLI can read it while workers write), with the status of each stage and each
+transcribed chunk. Workers claim a job with a lease that a heartbeat thread
+keeps renewing; after a crash the lease expires (at once if the crashed
+process ran on this host), the job can be claimed again and transcription
+resumes after the last completed chunk.
+
+Each job records the pipeline that runs it ("local" Whisper in the GUI and
+core.video_processor, "whisper_api" in the backend), so each one only resumes
+its own jobs. Reports on the store are in core.job_reports.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import sqlite3
+import threading
+
+from utils.file_ops import get_documents_directory
+
+logger = logging.getLogger("VideoProcessor")
+
+DEFAULT_LEASE_SECONDS = 300
+
+# Pipelines that process jobs; each resumes only its own
+LOCAL_PIPELINE = "local"
+WHISPER_API_PIPELINE = "whisper_api"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    video_path TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    output_folder TEXT NOT NULL,
+    pipeline TEXT NOT NULL DEFAULT 'local',
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    UNIQUE (video_path, output_dir)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL,
+    finished REAL,
+    artifact TEXT,
+    PRIMARY KEY (job_id, stage)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    segments TEXT,
+    duration REAL,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+
+def _process_exists(pid):
+    """Whether a process with this pid is running on this host"""
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION; fails with ERROR_ACCESS_DENIED if the process belongs to another user
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return kernel32.GetLastError() == 5
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # EPERM: the process exists but belongs to another user
+        return True
+    return True
+
+
+def lease_owner_died(owner):
+    """Whether a lease owner ("host:pid") is a process on this host that no longer runs"""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    return not _process_exists(int(pid))
+
+
+def job_store_path(config):
+    """Return the job database path (jobs.database if configured)"""
+    return (config.get("jobs", {}).get("database")
+            or os.path.join(get_documents_directory(), "VideoProcessor_Data", "jobs.sqlite3"))
+
+
+class JobStore:
+    """Thread-safe SQLite store of jobs, their stages and their transcribed chunks"""
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # Leases belong to this process; a new process never mistakes a crashed one's lease for its own
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._stop = threading.Event()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        # Databases created before jobs recorded their pipeline
+        if "pipeline" not in {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}:
+            connection.execute("ALTER TABLE jobs ADD COLUMN pipeline TEXT NOT NULL DEFAULT 'local'")
+        connection.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (pipeline, status, priority)")
+
+    def _connect(self):
+        """Return this thread's connection (sqlite3 connections can't be shared between threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Each connection is only used by its thread, but close() may run on another
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _execute(self, sql, params=()):
+        return self._connect().execute(sql, params)
+
+    def query(self, sql, params=()):
+        """Run a read-only query and return its rows as dicts"""
+        return [dict(row) for row in self._execute(sql, params)]
+
+    def enqueue(self, video_path, output_dir, output_folder, priority=0, pipeline=LOCAL_PIPELINE):
+        """
+        Add a video to the queue and return its job id.
+
+        A job that already finished, or was made by the other pipeline (whose
+        chunks and stages don't carry over), is reset for a fresh run; an
+        unfinished one keeps its completed stages and chunks so it resumes
+        where it stopped.
+        """
+        video_path, output_dir, output_folder = (os.path.abspath(path) for path in (video_path, output_dir, output_folder))
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT id, status, pipeline FROM jobs WHERE video_path = ? AND output_dir = ?",
+                                     (video_path, output_dir)).fetchone()
+            if row is None:
+                job_id = connection.execute(
+                    "INSERT INTO jobs (video_path, output_dir, output_folder, pipeline, priority, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_path, output_dir, output_folder, pipeline, priority, time.time())
+                ).lastrowid
+            else:
+                job_id = row["id"]
+                # A running job is left alone; its worker may still hold the lease
+                if row["status"] == "done" or (row["pipeline"] != pipeline and row["status"] != "running"):
+                    connection.execute("DELETE FROM stages WHERE job_id = ?", (job_id,))
+                    connection.execute("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+                    connection.execute("UPDATE jobs SET status = 'queued', stage = NULL, attempts = 0, pipeline = ?, "
+                                       "error = NULL, started = NULL, finished = NULL WHERE id = ?",
+                                       (pipeline, job_id))
+                elif row["status"] == "failed":
+                    connection.execute("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
+            connection.execute("COMMIT")
+            return job_id
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def claim(self, job_id):
+        """
+        Lease a job for this process. Fails if another worker holds a live
+        lease; a lease whose owner was a process on this host that has since
+        died (e.g. a crash followed by a restart) doesn't count as live.
+
+        Returns:
+            bool: Whether the job was claimed
+        """
+        now = time.time()
+        update = ("UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                  "started = COALESCE(started, ?), error = NULL WHERE id = ? AND ")
+        claimed = self._execute(
+            update + "(status != 'running' OR lease_expires IS NULL OR lease_expires < ?)",
+            (self.owner, now + self.lease_seconds, now, job_id, now)
+        ).rowcount == 1
+        if not claimed:
+            row = self._execute("SELECT status, lease_owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row and row["status"] == "running" and lease_owner_died(row["lease_owner"]):
+                logger.info(f"Taking over job {job_id} from {row['lease_owner']}, which is no longer running")
+                # Only if nobody took it over in the meantime
+                claimed = self._execute(
+                    update + "status = 'running' AND lease_owner = ?",
+                    (self.owner, now + self.lease_seconds, now, job_id, row["lease_owner"])
+                ).rowcount == 1
+        if claimed:
+            self._start_heartbeat()
+        return claimed
+
+    def next_jobs(self, max_attempts=None, pipeline=LOCAL_PIPELINE):
+        """
+        Return a pipeline's unfinished jobs nobody holds a lease on, highest
+        priority first: queued jobs, failed jobs with attempts left and running
+        jobs whose worker died (their lease expired, or they ran on this host
+        and the process is gone).
+        """
+        now = time.time()
+        host_prefix = f"{socket.gethostname()}:"
+        sql = ("SELECT * FROM jobs WHERE pipeline = ? AND status IN ('queued', 'failed', 'running') "
+               "AND (status != 'running' OR lease_expires IS NULL OR lease_expires < ? "
+               "OR substr(lease_owner, 1, ?) = ?)")
+        params = [pipeline, now, len(host_prefix), host_prefix]
+        if max_attempts:
+            sql += " AND attempts < ?"
+            params.append(max_attempts)
+        sql += " ORDER BY priority DESC, id"
+        return [dict(row) for row in self._execute(sql, params)
+                if row["status"] != "running" or row["lease_expires"] is None or row["lease_expires"] < now
+                or lease_owner_died(row["lease_owner"])]
+
+    def renew_leases(self):
+        """Extend every lease this process holds; returns how many were renewed"""
+        return self._execute("UPDATE jobs SET lease_expires = ? WHERE lease_owner = ? AND status = 'running'",
+                             (time.time() + self.lease_seconds, self.owner)).rowcount
+
+    def _start_heartbeat(self):
+        """Renew this process's leases every third of the lease period until close()"""
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+
+            def beat():
+                while not self._stop.wait(self.lease_seconds / 3):
+                    try:
+                        self.renew_leases()
+                    except sqlite3.Error as e:
+                        logger.error(f"Error renewing job leases: {str(e)}")
+
+            self._heartbeat = threading.Thread(target=beat, name="JobLeaseHeartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def finish(self, job_id, success, error=None):
+        """Mark a claimed job done or failed and release its lease"""
+        self._execute("UPDATE jobs SET status = ?, error = ?, finished = ?, lease_owner = NULL, "
+                      "lease_expires = NULL WHERE id = ?",
+                      ("done" if success else "failed", error, time.time(), job_id))
+
+    def start_stage(self, job_id, stage):
+        """Record that a job entered a stage"""
+        connection = self._connect()
+        connection.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+        connection.execute("INSERT OR REPLACE INTO stages (job_id, stage, status, started) VALUES (?, ?, 'running', ?)",
+                           (job_id, stage, time.time()))
+
+    def finish_stage(self, job_id, stage, success=True, artifact=None):
+        """Record the outcome of a stage and the path of what it produced"""
+        self._execute("UPDATE stages SET status = ?, finished = ?, artifact = ? WHERE job_id = ? AND stage = ?",
+                      ("done" if success else "failed", time.time(), artifact, job_id, stage))
+
+    def completed_stages(self, job_id):
+        """Return {stage: artifact path} for the stages a job has completed"""
+        return {row["stage"]: row["artifact"] for row in self._execute(
+            "SELECT stage, artifact FROM stages WHERE job_id = ? AND status = 'done'", (job_id,))}
+
+    def save_chunk(self, job_id, index, start, end, segments, duration=None):
+        """
+        Checkpoint one transcribed chunk. Chunks without any segments are saved
+        as failed (transcription errors also produce none) and retried on resume.
+        """
+        self._execute(
+            "INSERT INTO chunks (job_id, idx, start, end, status, attempts, segments, duration) "
+            "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (job_id, idx) DO UPDATE SET start = excluded.start, end = excluded.end, "
+            "status = excluded.status, attempts = attempts + 1, segments = excluded.segments, "
+            "duration = excluded.duration",
+            (job_id, index, start, end, "done" if segments else "failed", json.dumps(segments), duration)
+        )
+
+    def completed_chunks(self, job_id):
+        """Return {index: (start, end, segments)} for a job's transcribed chunks"""
+        return {row["idx"]: (row["start"], row["end"], json.loads(row["segments"])) for row in self._execute(
+            "SELECT idx, start, end, segments FROM chunks WHERE job_id = ? AND status = 'done'", (job_id,))}
+
+    def get_job(self, job_id):
+        """Return a job as a dict, or None"""
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        """Stop the heartbeat and close every connection"""
+        self._stop.set()
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_job_store(config):
+    """Return the shared job store, or None when jobs.enabled is off"""
+    jobs_config = config.get("jobs", {})
+    if not jobs_config.get("enabled", True):
+        return None
+
+    path = job_store_path(config)
+    with _stores_lock:
+        if path not in _stores:
+            try:
+                _stores[path] = JobStore(path, jobs_config.get("lease_seconds", DEFAULT_LEASE_SECONDS))
+            except sqlite3.Error as e:
+                # Processing still works without resume
+                logger.error(f"Error opening job store {path}: {str(e)}")
+                return None
+        return _stores[path]
+
+
+def close_job_stores():
+    """Close every shared job store"""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,267 @@
+"""
+LLM completion requests for the Video Processor application.
+
+Routes a prompt to the right provider through the pooled clients, under the
+shared rate limiter and through the response cache.
+"""
+import time
+import logging
+
+from core.hedging import RequestCancelled, hedge_budget, hedged_call, latency_tracker
+from core.llm_cache import cached_completion
+from core.llm_clients import get_llm_client
+from core.rate_limiter import rate_limited_call
+from core.tokens import check_prompt_fits
+
+logger = logging.getLogger("VideoProcessor")
+
+# OpenAI models that support JSON mode
+JSON_MODE_MODELS = ("gpt-3.5-turbo", "gpt-4-turbo", "gpt-4o", "gpt-4.5")
+
+
+def provider_for_model(model):
+    """Return the provider that serves a model"""
+    if model.startswith("o1") or model.startswith("o3"):
+        return "anthropic"
+    return "openai"
+
+
+def supports_json_mode(model):
+    """Whether an OpenAI model accepts response_format={"type": "json_object"}"""
+    return model.startswith(JSON_MODE_MODELS)
+
+
+def _request_options(provider, model, system_prompt, user_prompt, json_mode):
+    """
+    Return provider-specific request arguments for JSON output, and the
+    assistant prefill the response continues from (Anthropic only).
+    """
+    if not json_mode:
+        return {}, ""
+    if provider == "anthropic":
+        # Prefilling the assistant turn with "{" makes Claude continue a JSON object
+        return {}, "{"
+    # JSON mode is rejected unless the prompt itself asks for JSON
+    if supports_json_mode(model) and "json" in (system_prompt + user_prompt).lower():
+        return {"response_format": {"type": "json_object"}}, ""
+    return {}, ""
+
+
+def _anthropic_messages(user_prompt, prefill):
+    """Return the messages of an Anthropic request, ending with the prefill if any"""
+    messages = [{"role": "user", "content": user_prompt}]
+    if prefill:
+        messages.append({"role": "assistant", "content": prefill})
+    return messages
+
+
+def _close_on_cancel(cancel, close):
+    """Have cancelling close the open response, from the thread that cancels"""
+    if cancel is not None and hasattr(cancel, "on_cancel"):
+        cancel.on_cancel(close)
+
+
+def _request(config, provider, model, system_prompt, user_prompt, temperature, max_tokens, json_mode=False,
+             cancel=None):
+    """
+    Send one completion request and return the response text. Setting the
+    cancel event closes the response, so a stalled read stops at once.
+    """
+    client = get_llm_client(provider, config)
+    options, prefill = _request_options(provider, model, system_prompt, user_prompt, json_mode)
+    if provider == "anthropic":
+        api = client.messages
+        arguments = dict(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system_prompt,
+            messages=_anthropic_messages(user_prompt, prefill)
+        )
+    else:
+        api = client.chat.completions
+        arguments = dict(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **options
+        )
+
+    if cancel is None:
+        response = api.create(**arguments)
+    else:
+        # The raw response is what can be closed while its body is being read
+        with api.with_streaming_response.create(**arguments) as raw:
+            _close_on_cancel(cancel, raw.close)
+            try:
+                response = raw.parse()
+            except Exception:
+                if cancel.is_set():
+                    raise RequestCancelled(f"{model} request cancelled")
+                raise
+        if cancel.is_set():
+            raise RequestCancelled(f"{model} request cancelled")
+
+    if provider == "anthropic":
+        return prefill + response.content[0].text
+    return response.choices[0].message.content
+
+
+def _stream_request(config, provider, model, system_prompt, user_prompt, temperature, max_tokens, on_delta,
+                    cancel=None, json_mode=False):
+    """
+    Send one streaming completion request, pass each text delta to on_delta and
+    return the full text. Setting the cancel event closes the stream, so a
+    stalled stream stops without waiting for its next event.
+    """
+    client = get_llm_client(provider, config)
+    options, prefill = _request_options(provider, model, system_prompt, user_prompt, json_mode)
+    parts = []
+    if prefill:
+        parts.append(prefill)
+        on_delta(prefill)
+
+    if provider == "anthropic":
+        stream = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system_prompt,
+            messages=_anthropic_messages(user_prompt, prefill),
+            stream=True
+        )
+
+        def deltas():
+            for event in stream:
+                if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                    yield event.delta.text
+    else:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **options
+        )
+
+        def deltas():
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    _close_on_cancel(cancel, stream.close)
+    try:
+        for text in deltas():
+            if cancel is not None and cancel.is_set():
+                break
+            parts.append(text)
+            on_delta(text)
+    except Exception:
+        # Closing the stream from another thread breaks the read in progress
+        if cancel is None or not cancel.is_set():
+            raise
+    if cancel is not None and cancel.is_set():
+        stream.close()
+        raise RequestCancelled(f"{model} request cancelled")
+    return "".join(parts)
+
+
+def complete(config, model, system_prompt, user_prompt, temperature=0.7, max_tokens=1000, bypass=None,
+             on_delta=None, cancel=None, json_mode=False):
+    """
+    Return the completion of a prompt, from the cache or from the provider.
+
+    Args:
+        config (dict): Application configuration
+        model (str): Model name (o1/o3 models are sent to Anthropic)
+        system_prompt (str): System prompt
+        user_prompt (str): User message
+        temperature (float): Sampling temperature
+        max_tokens (int): Maximum completion tokens
+        bypass (bool): Ignore cached responses (defaults to cache.llm_bypass)
+        on_delta (callable): When given, the response is streamed and each piece
+            of text is passed to it as it arrives (a cached response arrives
+            as a single piece)
+        cancel (threading.Event): Setting the event stops the request with
+            RequestCancelled; a core.hedging.Cancellation also closes its open
+            response right away
+        json_mode (bool): Ask the provider for a JSON object where supported
+            (OpenAI JSON mode, Anthropic "{" prefill)
+
+    Returns:
+        str: The response text
+
+    Raises:
+        PromptTooLargeError: If the prompt cannot fit the model's context window
+    """
+    provider = provider_for_model(model)
+    if bypass is None:
+        bypass = config.get("cache", {}).get("llm_bypass", False)
+    # Fail here rather than after a round trip to the provider
+    tokens = check_prompt_fits(model, system_prompt + user_prompt, max_tokens) + max_tokens
+
+    streamed = []
+
+    def call_api():
+        logger.info(f"Calling {provider} API with model: {model}")
+        started = time.monotonic()
+        try:
+            if on_delta is None:
+                content = _request(config, provider, model, system_prompt, user_prompt, temperature, max_tokens,
+                                   json_mode, cancel)
+            else:
+                streamed.append(True)
+                content = _stream_request(config, provider, model, system_prompt, user_prompt, temperature,
+                                          max_tokens, on_delta, cancel, json_mode)
+        except RequestCancelled:
+            # A cancelled straggler took at least this long; leaving it out would drag the hedge deadline down
+            latency_tracker.record(model, time.monotonic() - started)
+            raise
+        latency_tracker.record(model, time.monotonic() - started)
+        return content
+
+    content = cached_completion(
+        config, lambda: rate_limited_call(config, provider, model, call_api, tokens, cancel=cancel),
+        provider, model, system_prompt, user_prompt, temperature, max_tokens, bypass=bypass,
+        response_format="json" if json_mode else None
+    )
+    if on_delta is not None and not streamed and content:
+        on_delta(content)
+    return content
+
+
+def hedged_complete(config, model, system_prompt, user_prompt, temperature=0.7, max_tokens=1000, validate=None,
+                    json_mode=False):
+    """
+    Like complete(), but with llm.hedge_requests enabled a request still running
+    after the model's llm.hedge_percentile latency is duplicated (to
+    llm.hedge_fallback_model if set). The first response that passes validate
+    wins and the other is cancelled. llm.hedge_budget caps the fraction of
+    requests that are duplicated.
+    """
+    llm_config = config.get("llm", {})
+    if not llm_config.get("hedge_requests", False):
+        return complete(config, model, system_prompt, user_prompt, temperature, max_tokens, json_mode=json_mode)
+
+    deadline = latency_tracker.percentile(model, llm_config.get("hedge_percentile", 95))
+    if deadline is None:
+        deadline = llm_config.get("hedge_default_deadline", 30)
+    deadline = max(deadline, llm_config.get("hedge_min_deadline", 5))
+    fallback_model = llm_config.get("hedge_fallback_model") or model
+    hedge_budget.ratio = llm_config.get("hedge_budget", 0.1)
+
+    return hedged_call(
+        lambda cancel: complete(config, model, system_prompt, user_prompt, temperature, max_tokens,
+                                cancel=cancel, json_mode=json_mode),
+        lambda cancel: complete(config, fallback_model, system_prompt, user_prompt, temperature, max_tokens,
+                                cancel=cancel, json_mode=json_mode),
+        deadline, hedge_budget, validate
+    )
@@ -0,0 +1,81 @@
+"""
+Persistent LLM response cache for the Video Processor application.
+
+Responses are keyed by a hash of everything that determines them (provider,
+model, system prompt, user prompt, temperature and max_tokens), so re-running
+a batch after a crash returns previous generations from disk instead of
+paying for the same API calls again.
+"""
+import logging
+import threading
+
+from utils.disk_cache import DiskCache, cache_directory, make_cache_key
+
+logger = logging.getLogger("VideoProcessor")
+
+DEFAULT_TTL_HOURS = 24 * 7
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def llm_cache_key(provider, model, system_prompt, user_prompt, temperature, max_tokens, response_format=None):
+    """Build the cache key for one completion request"""
+    parts = [provider, model, system_prompt, user_prompt, temperature, max_tokens]
+    # Only part of the key when set, so plain-text requests keep their existing keys
+    if response_format:
+        parts.append(response_format)
+    return make_cache_key(*parts)
+
+
+def get_llm_cache(config):
+    """Return the shared LLM response cache, or None when it is disabled"""
+    cache_config = config.get("cache", {})
+    if not cache_config.get("llm_responses", True):
+        return None
+
+    directory = cache_directory(config, "llm")
+    ttl_hours = cache_config.get("llm_ttl_hours", DEFAULT_TTL_HOURS)
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = DiskCache(
+                directory,
+                cache_config.get("llm_max_mb", 64),
+                ttl_seconds=ttl_hours * 3600 if ttl_hours else None
+            )
+        return _caches[directory]
+
+
+def cached_completion(config, call, provider, model, system_prompt, user_prompt,
+                      temperature, max_tokens, bypass=False, response_format=None):
+    """
+    Return a completion from the cache, or make the request and cache its text.
+
+    Args:
+        config (dict): Application configuration
+        call (callable): Makes the API request and returns the response text
+        provider (str): "openai" or "anthropic"
+        model, system_prompt, user_prompt, temperature, max_tokens: Request parameters
+        bypass (bool): Skip the lookup and always call the API (the new
+            response still replaces the cached one)
+        response_format (str): Output format requested from the provider, e.g. "json"
+
+    Returns:
+        str: The response text
+    """
+    cache = get_llm_cache(config)
+    if cache is None:
+        return call()
+
+    key = llm_cache_key(provider, model, system_prompt, user_prompt, temperature, max_tokens, response_format)
+    if not bypass:
+        content = cache.get(key)
+        if content is not None:
+            logger.info(f"Using cached {provider} response for model {model}")
+            return content
+
+    content = call()
+    # Empty responses are usually errors and should be retried next time
+    if content:
+        cache.set(key, content)
+    return content
@@ -0,0 +1,120 @@
+"""
+Pooled LLM provider clients for the Video Processor application.
+
+One OpenAI or Anthropic client is created per (provider, API key) and shared by
+every thread in the process. Each client keeps its own HTTP keep-alive pool, so
+a batch of videos reuses a few TLS connections instead of opening one per video.
+"""
+import hashlib
+import logging
+import threading
+
+import httpx
+
+from utils.config import get_api_key
+
+logger = logging.getLogger("VideoProcessor")
+
+# Environment variable that holds each provider's API key
+API_KEY_NAMES = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+
+# "llm" settings the clients are built with; other llm settings don't need a new client
+CLIENT_SETTINGS = ("pool_size", "timeout", "connect_timeout", "keepalive_seconds", "openai_base_url")
+
+_clients = {}  # (provider, key hash) -> (settings, client)
+_clients_lock = threading.Lock()
+
+
+def _http_client(llm_config):
+    """Create an HTTP client with the configured connection pool and timeouts"""
+    pool_size = llm_config.get("pool_size", 10)
+    timeout = llm_config.get("timeout", 60)
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=llm_config.get("keepalive_seconds", 30)
+        ),
+        timeout=httpx.Timeout(timeout, connect=llm_config.get("connect_timeout", 10))
+    )
+
+
+def _create_client(provider, api_key, llm_config):
+    """
+    Create an SDK client for a provider that uses a pooled HTTP client.
+
+    SDK retries are off: core.rate_limiter.rate_limited_call owns retries, so
+    a 429 reaches the rate limiter instead of being retried out of its sight.
+    """
+    if provider == "anthropic":
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key, max_retries=0, http_client=_http_client(llm_config))
+    if provider == "openai":
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, base_url=llm_config.get("openai_base_url"), max_retries=0,
+                      http_client=_http_client(llm_config))
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def resolve_api_key(provider):
+    """Return the API key for a provider (Anthropic falls back to the OpenAI key, as before)"""
+    api_key = get_api_key(API_KEY_NAMES.get(provider, "OPENAI_API_KEY"))
+    if not api_key and provider == "anthropic":
+        api_key = get_api_key("OPENAI_API_KEY")
+    return api_key
+
+
+def get_llm_client(provider, config=None, api_key=None):
+    """
+    Return the shared client for a provider and API key, creating it on first use.
+
+    Args:
+        provider (str): "openai" or "anthropic"
+        config (dict): Application configuration (pool size and timeouts come
+            from its "llm" section)
+        api_key (str): API key; looked up from the environment when omitted
+
+    Returns:
+        The provider's SDK client
+    """
+    api_key = api_key or resolve_api_key(provider)
+    if not api_key:
+        raise ValueError(f"{provider.capitalize()} API key not found. Cannot call the API.")
+
+    llm_config = (config or {}).get("llm", {})
+    # Never keep raw keys around as dictionary keys; a changed key gets a new client
+    pool_key = (provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+    settings = tuple(str(llm_config.get(name)) for name in CLIENT_SETTINGS)
+
+    with _clients_lock:
+        current = _clients.get(pool_key)
+        if current is not None and current[0] == settings:
+            return current[1]
+        if current is not None:
+            # Changed connection settings replace the client; close the old one's connections
+            logger.info(f"Connection settings changed, replacing pooled {provider} client")
+            _close_client(current[1])
+        else:
+            logger.info(f"Creating pooled {provider} client")
+        client = _create_client(provider, api_key, llm_config)
+        _clients[pool_key] = (settings, client)
+        return client
+
+
+def _close_client(client):
+    """Close a client's connections, logging rather than raising errors"""
+    try:
+        client.close()
+    except Exception as e:
+        logger.error(f"Error closing LLM client: {str(e)}")
+
+
+def close_llm_clients():
+    """Close every pooled client and its connections"""
+    with _clients_lock:
+        for _, client in _clients.values():
+            _close_client(client)
+        _clients.clear()
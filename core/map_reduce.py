@@ -0,0 +1,107 @@
+"""
+Map-reduce condensing of long transcripts for the Video Processor application.
+
+A transcript that does not fit the model's context window is split into
+sections at sentence boundaries, the sections are summarized concurrently, and
+the summaries are used in place of the transcript for the final generation
+request. Summaries are condensed again if they are still too long.
+"""
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from core.tokens import count_tokens
+
+logger = logging.getLogger("VideoProcessor")
+
+SUMMARY_SYSTEM_PROMPT = "You summarize sections of video transcripts for a social media content creator."
+
+SECTION_PROMPT = """Summarize part {index} of {total} of a video transcript.
+Keep the key points, memorable quotes, names, numbers and timestamps, in the order they appear.
+
+Transcript part:
+"""
+
+
+def _split_long_sentence(sentence, max_tokens, model):
+    """Split a sentence that alone exceeds max_tokens into groups of words"""
+    pieces, current, current_tokens = [], [], 0
+    for word in sentence.split():
+        # Each word is counted once, with the space that joins it (tokenizers fold it into the word)
+        tokens = count_tokens(" " + word, model)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_transcript(text, max_tokens, model=None):
+    """
+    Split text into sections of at most max_tokens, breaking between sentences.
+
+    Returns:
+        list: Section strings, in order
+    """
+    sentences = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if count_tokens(sentence, model) > max_tokens:
+            sentences.extend(_split_long_sentence(sentence, max_tokens, model))
+        elif sentence:
+            sentences.append(sentence)
+
+    sections, current, current_tokens = [], [], 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence, model) + 1
+        if current and current_tokens + tokens > max_tokens:
+            sections.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        sections.append(" ".join(current))
+    return sections
+
+
+def condense_transcript(transcript, complete, budget_tokens, section_tokens, model=None,
+                        summary_tokens=500, max_workers=4):
+    """
+    Summarize a transcript section by section until it fits budget_tokens.
+
+    Args:
+        transcript (str): Full transcript
+        complete (callable): complete(system_prompt, user_prompt, max_tokens) -> str
+        budget_tokens (int): Tokens the condensed text may use in the final prompt
+        section_tokens (int): Maximum tokens per summarized section
+        model (str): Model used for token counting
+        summary_tokens (int): Maximum tokens per section summary
+        max_workers (int): Sections summarized at the same time
+
+    Returns:
+        str: The transcript itself if it fits, otherwise the joined summaries
+    """
+    text = transcript
+    tokens = count_tokens(text, model)
+    while tokens > budget_tokens:
+        sections = split_transcript(text, section_tokens, model)
+        logger.info(f"Condensing {tokens} transcript tokens: summarizing {len(sections)} sections")
+
+        def summarize(numbered_section):
+            index, section = numbered_section
+            prompt = SECTION_PROMPT.format(index=index + 1, total=len(sections)) + section
+            return complete(SUMMARY_SYSTEM_PROMPT, prompt, summary_tokens)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as executor:
+            summaries = list(executor.map(summarize, enumerate(sections)))
+
+        condensed = "\n\n".join(f"Part {i + 1}: {summary.strip()}" for i, summary in enumerate(summaries))
+        condensed_tokens = count_tokens(condensed, model)
+        if condensed_tokens >= tokens:
+            # Summaries are not getting shorter; stop rather than loop forever
+            logger.warning("Transcript summaries did not shrink; using them as they are")
+            return condensed
+        text, tokens = condensed, condensed_tokens
+    return text
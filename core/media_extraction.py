@@ -0,0 +1,202 @@
+"""
+Single-pass media extraction for the Video Processor application.
+
+One ffmpeg run demuxes and decodes the video once and writes every artifact
+the pipeline needs from it through separately mapped outputs: 16 kHz mono
+float32 audio for transcription, JPEG keyframes at scene changes (offered as
+thumbnails next to the YouTube description) and a stats sidecar recording
+the scene scores and ffmpeg's own progress counters.
+"""
+import os
+import glob
+import json
+import time
+import logging
+import subprocess
+
+import numpy as np
+
+from core.audio import SAMPLE_RATE
+
+logger = logging.getLogger("VideoProcessor")
+
+KEYFRAME_DIR = "keyframes"
+STATS_FILE = "extraction_stats.json"
+
+
+def keyframe_filter(threshold=0.4, min_interval=30, width=640):
+    """Filter chain selecting scene changes at least min_interval seconds apart"""
+    select = f"select='gt(scene,{threshold})*(isnan(prev_selected_t)+gte(t-prev_selected_t,{min_interval}))'"
+    return f"scale={width}:-2,{select}"
+
+
+def single_pass_command(video_path, audio_output, keyframe_pattern, scenes_path, progress_path,
+                        threshold=0.4, min_interval=30, max_keyframes=20, width=640, keyframes_only=True):
+    """
+    Build the ffmpeg command writing audio and keyframes from one decode.
+
+    Args:
+        video_path (str): Input video
+        audio_output (str): "-" for raw f32le PCM on stdout, a .wav path, or
+            None to skip the audio output
+        keyframe_pattern (str): JPEG output pattern, e.g. keyframes/scene_%03d.jpg
+        scenes_path (str): File receiving the selected frames' scene scores,
+            relative to ffmpeg's working directory (keeps it free of characters
+            the filtergraph parser would need escaped)
+        progress_path (str): File receiving ffmpeg's progress counters
+        keyframes_only (bool): Decode only the video's keyframes (much cheaper;
+            scene changes are then detected between keyframes)
+    """
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-progress", progress_path]
+    if keyframes_only:
+        command += ["-skip_frame:v", "nokey"]
+    command += ["-i", video_path]
+
+    if audio_output is not None:
+        command += ["-map", "0:a:0", "-ac", "1", "-ar", str(SAMPLE_RATE), "-acodec", "pcm_f32le"]
+        if audio_output == "-":
+            command += ["-f", "f32le"]
+        command += ["-y", audio_output]
+
+    # -vsync rather than -fps_mode, which needs ffmpeg 5.1; newer releases still
+    # accept -vsync (their deprecation warning is below -loglevel error)
+    command += [
+        "-map", "0:v:0", "-an",
+        "-vf", f"{keyframe_filter(threshold, min_interval, width)},metadata=print:file={scenes_path}",
+        "-vsync", "vfr", "-frames:v", str(max_keyframes), "-q:v", "3",
+        "-y", keyframe_pattern,
+    ]
+    return command
+
+
+def parse_scene_metadata(text):
+    """
+    Read the metadata filter's output.
+
+    Returns:
+        list: {"time", "score"} of every selected frame, in output order
+    """
+    frames = []
+    for line in text.splitlines():
+        if line.startswith("frame:"):
+            fields = dict(part.split(":", 1) for part in line.split() if ":" in part)
+            frames.append({"time": float(fields.get("pts_time", 0) or 0), "score": None})
+        elif line.startswith("lavfi.scene_score=") and frames:
+            frames[-1]["score"] = float(line.split("=", 1)[1])
+    return frames
+
+
+def parse_progress(text):
+    """Return the last block of ffmpeg's -progress output as a dict"""
+    block = {}
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        if key == "progress":
+            continue
+        if key:
+            block[key.strip()] = value.strip()
+    return block
+
+
+def _read(path):
+    """Return a text file's contents, or "" if ffmpeg didn't write it"""
+    if not os.path.exists(path):
+        return ""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def extract_media(video_path, output_folder, config, audio_output="-"):
+    """
+    Run the single-pass extraction and write the stats sidecar.
+
+    Args:
+        video_path (str): Input video
+        output_folder (str): The video's output folder (keyframes and the
+            sidecar are written here)
+        config (dict): Application configuration (processing.keyframe_* keys)
+        audio_output (str): "-" to return the audio as an array, a WAV path
+            to write it there, or None to extract only keyframes
+
+    Returns:
+        tuple: (samples or None, stats dict)
+
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    processing_config = config.get("processing", {})
+    keyframe_dir = os.path.join(output_folder, KEYFRAME_DIR)
+    os.makedirs(keyframe_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(keyframe_dir, "scene_*.jpg")):
+        os.remove(old)
+    scenes_path = os.path.join(output_folder, "scenes.txt.tmp")
+    progress_path = os.path.join(output_folder, "progress.txt.tmp")
+    if audio_output not in (None, "-"):
+        audio_output = os.path.abspath(audio_output)
+
+    # ffmpeg runs in the output folder so the scene sidecar can be named relatively
+    command = single_pass_command(
+        os.path.abspath(video_path), audio_output, os.path.abspath(os.path.join(keyframe_dir, "scene_%03d.jpg")),
+        os.path.basename(scenes_path), os.path.abspath(progress_path),
+        threshold=processing_config.get("keyframe_threshold", 0.4),
+        min_interval=processing_config.get("keyframe_min_interval", 30),
+        max_keyframes=processing_config.get("keyframe_max", 20),
+        width=processing_config.get("keyframe_width", 640),
+        keyframes_only=processing_config.get("keyframes_only", True),
+    )
+
+    started = time.time()
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=output_folder)
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg error: {process.stderr.decode('utf-8', errors='replace')}")
+
+        samples = None
+        if audio_output == "-":
+            samples = np.frombuffer(process.stdout, dtype=np.float32)
+            if samples.size == 0:
+                raise RuntimeError(f"No audio decoded from {video_path}")
+
+        files = sorted(glob.glob(os.path.join(keyframe_dir, "scene_*.jpg")))
+        scenes = parse_scene_metadata(_read(scenes_path))
+        progress = parse_progress(_read(progress_path))
+    finally:
+        for path in (scenes_path, progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    stats = {
+        "video": os.path.basename(video_path),
+        "elapsed": round(time.time() - started, 3),
+        "audio_seconds": samples.size / SAMPLE_RATE if samples is not None else None,
+        "keyframes": [
+            {"file": os.path.join(KEYFRAME_DIR, os.path.basename(path)),
+             "time": scene["time"] if scene else None,
+             "score": scene["score"] if scene else None}
+            for path, scene in zip(files, scenes + [None] * (len(files) - len(scenes)))
+        ],
+        "ffmpeg": {key: progress[key] for key in ("frame", "out_time", "speed", "total_size") if key in progress},
+    }
+    with open(os.path.join(output_folder, STATS_FILE), "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+    return samples, stats
+
+
+def load_extraction_stats(output_folder):
+    """Return the stats sidecar of an earlier extraction, or None"""
+    path = os.path.join(output_folder, STATS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def add_thumbnails(content, output_folder):
+    """Add the extraction pass's scene keyframes to social media content as youtube_thumbnails"""
+    stats = load_extraction_stats(output_folder)
+    if isinstance(content, dict) and stats and stats.get("keyframes"):
+        content["youtube_thumbnails"] = [
+            {"file": keyframe["file"], "time": keyframe["time"]} for keyframe in stats["keyframes"]
+        ]
+    return content
@@ -0,0 +1,172 @@
+"""
+Process-wide Whisper model registry for the Video Processor application.
+
+Each model is loaded once per (model name, device, dtype) and shared by every
+chunk and every VideoProcessor running in the process. Least recently used
+models are unloaded when the configured memory budget is exceeded. Whisper
+keeps per-call decoder state on the model, so transcribe() runs one chunk at a
+time on each shared model.
+"""
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+logger = logging.getLogger("VideoProcessor")
+
+# Approximate in-memory size of each checkpoint (MB), used to make room before
+# a model is loaded and its real size is known
+MODEL_SIZE_ESTIMATES_MB = {
+    "tiny": 75, "tiny.en": 75,
+    "base": 145, "base.en": 145,
+    "small": 470, "small.en": 470,
+    "medium": 1500, "medium.en": 1500,
+    "large": 3000, "large-v1": 3000, "large-v2": 3000, "large-v3": 3000,
+}
+
+DEFAULT_MEMORY_BUDGET_MB = 4096
+
+
+def _model_size_mb(model):
+    """Return the size of a loaded model's parameters and buffers in MB"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """Thread-safe LRU cache of loaded Whisper models"""
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()  # key -> (model, size_mb)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._inference_locks = weakref.WeakKeyDictionary()
+
+    def resolve_key(self, model_name, device=None, dtype=None):
+        """Fill in the default device and dtype for a model key"""
+        if device is None:
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        if dtype is None:
+            dtype = "float16" if str(device).startswith("cuda") else "float32"
+        return (model_name, device, dtype)
+
+    def get_model(self, model_name, device=None, dtype=None):
+        """Return the shared model for a key, loading it on first use"""
+        key = self.resolve_key(model_name, device, dtype)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given key; the others wait and reuse it
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+                self._evict(MODEL_SIZE_ESTIMATES_MB.get(model_name, 0))
+
+            model = self._load(*key)
+            size_mb = _model_size_mb(model)
+
+            with self._lock:
+                self._models[key] = (model, size_mb)
+                self._evict(0, keep=key)
+            return model
+
+    def _load(self, model_name, device, dtype):
+        """Load a model from disk"""
+        import whisper
+
+        logger.info(f"Loading Whisper model: {model_name} ({device}, {dtype})")
+        model = whisper.load_model(model_name, device=device)
+        if dtype == "float16" and str(device).startswith("cuda"):
+            model = model.half()
+        return model
+
+    def _evict(self, incoming_mb, keep=None):
+        """Unload least recently used models until the budget fits incoming_mb more"""
+        while self._models:
+            used_mb = sum(size for _, size in self._models.values())
+            if used_mb + incoming_mb <= self.memory_budget_mb:
+                return
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                return
+            self._unload_key(oldest)
+
+    def _unload_key(self, key):
+        """Drop a model from the registry and release cached GPU memory"""
+        self._models.pop(key, None)
+        logger.info(f"Unloaded Whisper model: {key[0]} ({key[1]}, {key[2]})")
+        if str(key[1]).startswith("cuda"):
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+    def inference_lock(self, model):
+        """Return the lock that serializes transcribe() calls on a shared model"""
+        with self._lock:
+            if model not in self._inference_locks:
+                self._inference_locks[model] = threading.Lock()
+            return self._inference_locks[model]
+
+    def transcribe(self, model, audio, **options):
+        """Run model.transcribe() under the model's inference lock"""
+        # Whisper installs its kv-cache hooks on the model, so concurrent calls would corrupt each other
+        with self.inference_lock(model):
+            return model.transcribe(audio, **options)
+
+    def warm(self, model_name, device=None, dtype=None):
+        """Load a model ahead of time so the first chunk doesn't pay for it"""
+        try:
+            self.get_model(model_name, device, dtype)
+            return True
+        except Exception as e:
+            logger.error(f"Error warming Whisper model {model_name}: {str(e)}")
+            return False
+
+    def unload(self, model_name=None, device=None, dtype=None):
+        """Unload one model, or every model when no name is given"""
+        with self._lock:
+            if model_name is None:
+                keys = list(self._models)
+            else:
+                keys = [self.resolve_key(model_name, device, dtype)]
+            for key in keys:
+                if key in self._models:
+                    self._unload_key(key)
+
+    def loaded_models(self):
+        """Return a dict of loaded model keys and their sizes in MB"""
+        with self._lock:
+            return {key: size for key, (_, size) in self._models.items()}
+
+
+# Shared registry for the whole process
+model_registry = ModelRegistry()
+
+
+def get_whisper_model(whisper_config):
+    """
+    Get the shared model for a "whisper" configuration section.
+
+    Returns:
+        tuple: (model, dtype) so callers can pick the matching fp16 option
+    """
+    model_registry.memory_budget_mb = whisper_config.get("model_memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)
+    key = model_registry.resolve_key(
+        whisper_config.get("model", "base"),
+        whisper_config.get("device"),
+        whisper_config.get("dtype")
+    )
+    return model_registry.get_model(*key), key[2]
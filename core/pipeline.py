@@ -0,0 +1,127 @@
+"""
+Stage-pipelined executor for the Video Processor application.
+
+Every stage (audio extraction, transcription, content generation) has its
+own bounded pool of worker threads, connected by bounded queues. While one
+video is transcribing, the next can be decoding and the previous can be
+waiting on the LLM, so batch throughput is set by the slowest stage.
+"""
+import time
+import queue
+import logging
+import threading
+import traceback
+
+logger = logging.getLogger("VideoProcessor")
+
+# Tells a stage worker that no more items are coming
+_DONE = object()
+
+
+class StagePipeline:
+    """Runs items through a fixed sequence of stages with per-stage worker pools"""
+
+    def __init__(self, stages, queue_size=2):
+        """
+        Args:
+            stages (list): (name, func, workers) tuples in order. func(item)
+                returns a truthy value to pass the item on, or raises/returns
+                a falsy value to stop it at that stage.
+            queue_size (int): Items allowed to wait between two stages
+        """
+        self.stages = [(name, func, max(1, int(workers))) for name, func, workers in stages]
+        self.queue_size = max(1, int(queue_size))
+        self.stage_busy = {name: 0.0 for name, _, _ in self.stages}
+        self._lock = threading.Lock()
+
+    def _stage_worker(self, index, inbox, outbox, remaining, results):
+        """Run one stage's function on items until the upstream stage is finished"""
+        name, func, _ = self.stages[index]
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                with self._lock:
+                    remaining[index] -= 1
+                    last_out = remaining[index] == 0
+                # The last worker of a stage tells every worker of the next one to stop
+                if last_out and outbox is not None:
+                    for _ in range(self.stages[index + 1][2]):
+                        outbox.put(_DONE)
+                return
+
+            seq, item, result = entry
+            started = time.time()
+            try:
+                ok = bool(func(item))
+                if not ok:
+                    result["error"] = f"{name} stage failed"
+            except Exception as e:
+                ok = False
+                result["error"] = f"{name} stage failed: {str(e)}"
+                logger.error(f"Pipeline {name} stage failed for {result['name']}: {str(e)}")
+                logger.error(traceback.format_exc())
+            elapsed = time.time() - started
+
+            with self._lock:
+                self.stage_busy[name] += elapsed
+            result["stages"][name] = elapsed
+
+            if not ok:
+                result["failed_stage"] = name
+            if ok and outbox is not None:
+                outbox.put((seq, item, result))
+            else:
+                result["success"] = ok
+                result["duration"] = time.time() - result["started"]
+                with self._lock:
+                    results.append((seq, result))
+
+    def run(self, items, names=None):
+        """
+        Push every item through all stages and wait for them to finish.
+
+        Returns:
+            dict: total, succeeded, failed, duration, per-item results in
+                input order and per-stage busy seconds
+        """
+        started = time.time()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [workers for _, _, workers in self.stages]
+        results = []
+
+        threads = []
+        for index, (_, _, workers) in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            for _ in range(workers):
+                thread = threading.Thread(
+                    target=self._stage_worker,
+                    args=(index, queues[index], outbox, remaining, results),
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        # Feeding blocks while the first stage is saturated, which bounds memory
+        for seq, item in enumerate(items):
+            name = names[seq] if names else str(item)
+            result = {"name": name, "success": False, "error": None, "failed_stage": None,
+                      "stages": {}, "started": time.time()}
+            queues[0].put((seq, item, result))
+        for _ in range(self.stages[0][2]):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        ordered = [result for _, result in sorted(results, key=lambda entry: entry[0])]
+        for result in ordered:
+            result.pop("started", None)
+        succeeded = sum(1 for result in ordered if result["success"])
+        return {
+            "total": len(ordered),
+            "succeeded": succeeded,
+            "failed": len(ordered) - succeeded,
+            "duration": time.time() - started,
+            "results": ordered,
+            "stage_busy": dict(self.stage_busy),
+        }
@@ -0,0 +1,93 @@
+"""
+Per-platform social media generation for the Video Processor application.
+
+Instead of one completion that returns every field in a single JSON object,
+each field gets its own short prompt. The prompts run concurrently and stream,
+so the first fields can be shown after a few tokens instead of after the
+whole response.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from core.llm import complete
+
+logger = logging.getLogger("VideoProcessor")
+
+SYSTEM_PROMPT = "You are a social media content creator assistant."
+
+# Separates the items of list fields in a response
+LIST_SEPARATOR = "---"
+
+# Field: (prompt, is a list, maximum tokens)
+PLATFORM_PROMPTS = {
+    "youtube_title": (
+        "Write one catchy YouTube title for the video with the following transcript. "
+        "Reply with the title only.", False, 60),
+    "youtube_description": (
+        "Write a YouTube description for the video with the following transcript, "
+        "ending with appropriate hashtags. Reply with the description only.", False, 500),
+    "tweets": (
+        "Write three tweets/posts for Twitter/X about the video with the following transcript. "
+        f"Separate them with a line containing only {LIST_SEPARATOR}. Reply with the posts only.", True, 400),
+    "linkedin_post": (
+        "Write a LinkedIn post about the video with the following transcript. "
+        "Reply with the post only.", False, 500),
+    "clip_suggestions": (
+        "Suggest three short clips from the video with the following transcript, with timestamps if "
+        f"identifiable. Separate them with a line containing only {LIST_SEPARATOR}. "
+        "Reply with the suggestions only.", True, 400),
+}
+
+
+def parse_field(text, is_list):
+    """Turn a field's response into its value (a list of items for list fields)"""
+    text = text.strip()
+    if not is_list:
+        return text
+    items, current = [], []
+    for line in text.splitlines():
+        if line.strip() == LIST_SEPARATOR:
+            items.append("\n".join(current).strip())
+            current = []
+        else:
+            current.append(line)
+    items.append("\n".join(current).strip())
+    return [item for item in items if item]
+
+
+def generate_platform_content(config, model, transcript, temperature=0.7, max_tokens=1000,
+                              on_update=None, max_workers=None):
+    """
+    Generate every social media field with its own concurrent request.
+
+    Args:
+        config (dict): Application configuration
+        model (str): Model name
+        transcript (str): Transcript (or condensed transcript) of the video
+        temperature (float): Sampling temperature
+        max_tokens (int): Upper bound on each field's completion tokens
+        on_update (callable): on_update(field, text, done), called with the
+            text received so far whenever a field's stream advances
+        max_workers (int): Fields generated at the same time (default: all)
+
+    Returns:
+        dict: youtube_title, youtube_description, tweets, linkedin_post, clip_suggestions
+    """
+    def generate(field):
+        prompt, is_list, field_tokens = PLATFORM_PROMPTS[field]
+        received = []
+
+        def on_delta(text):
+            received.append(text)
+            on_update(field, "".join(received), False)
+
+        content = complete(
+            config, model, SYSTEM_PROMPT, f"{prompt}\n\nTranscript:\n{transcript}",
+            temperature, min(field_tokens, max_tokens), on_delta=on_delta if on_update else None
+        )
+        if on_update:
+            on_update(field, content, True)
+        return field, parse_field(content, is_list)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(PLATFORM_PROMPTS)) as executor:
+        return dict(executor.map(generate, PLATFORM_PROMPTS))
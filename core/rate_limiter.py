@@ -0,0 +1,205 @@
+"""
+Process-wide API rate limiting for the Video Processor application.
+
+Every request to a provider/model first reserves one request and its estimated
+tokens from token buckets sized to the per-minute limits in the "rate_limits"
+config section. Reservations are taken in arrival order, so concurrent
+VideoProcessors share the limit fairly, and a 429's Retry-After pauses every
+caller of that model instead of only the one that was rejected.
+
+This is the only layer that retries API requests: the pooled SDK clients are
+built with max_retries=0, so every 429 reaches the limiter.
+"""
+import time
+import random
+import logging
+import threading
+
+from core.hedging import RequestCancelled
+
+logger = logging.getLogger("VideoProcessor")
+
+DEFAULT_RATE_LIMIT_RETRIES = 3
+DEFAULT_MAX_RETRIES = 2
+
+
+class TokenBucket:
+    """Bucket refilled continuously up to a per-minute capacity"""
+
+    def __init__(self, per_minute, now):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount from the bucket and return how long the caller must wait to use it"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # The level may go negative: later callers queue behind this reservation
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider/model"""
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        self._requests = TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self._blocked_until = now
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.request_count = 0
+        self.throttled_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self, tokens=0):
+        """Block until a request using this many tokens may be sent; return the wait in seconds"""
+        with self._lock:
+            now = self._clock()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            self.request_count += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        if wait > 0:
+            logger.debug(f"Rate limiter {self.name}: waiting {wait:.2f}s")
+            self._sleep(wait)
+        return wait
+
+    def block_for(self, seconds):
+        """Hold back every caller for the given time (e.g. a 429's Retry-After)"""
+        with self._lock:
+            self.throttled_count += 1
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def stats(self):
+        """Return request counts and queueing delay for this limiter"""
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "throttled": self.throttled_count,
+                "total_wait": self.total_wait,
+                "average_wait": self.total_wait / self.request_count if self.request_count else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider, model, config):
+    """
+    Return the shared limiter for a provider/model.
+
+    Limits come from config["rate_limits"]["<provider>/<model>"], falling back
+    to config["rate_limits"]["<provider>"].
+    """
+    rate_limits = config.get("rate_limits", {})
+    name = f"{provider}/{model}"
+    limits = rate_limits.get(name) or rate_limits.get(provider) or {}
+    key = (name, limits.get("requests_per_minute"), limits.get("tokens_per_minute"))
+
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(name, limits.get("requests_per_minute"), limits.get("tokens_per_minute"))
+        return _limiters[key]
+
+
+def rate_limiter_stats():
+    """Return the metrics of every limiter used in this process, by provider/model"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def _retry_after(error):
+    """Return the Retry-After delay of a 429 error in seconds, or None if it isn't one"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    try:
+        return float(response.headers.get("retry-after", 1))
+    except (AttributeError, TypeError, ValueError):
+        return 1.0
+
+
+def _is_transient(error):
+    """Whether an error is a dropped connection, a timeout or a server error worth retrying"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status is not None:
+        return status >= 500 or status in (408, 409)
+    # openai and anthropic both raise APIConnectionError (and its APITimeoutError subclass)
+    return any(cls.__name__ == "APIConnectionError" for cls in type(error).__mro__)
+
+
+def rate_limited_call(config, provider, model, call, tokens=0, max_retries=None, retry_delay=0.5, cancel=None):
+    """
+    Run an API call under the provider/model rate limit.
+
+    A 429 response blocks the limiter for its Retry-After period and the call
+    is retried (up to llm.rate_limit_retries times). Connection errors,
+    timeouts and server errors are retried with exponential backoff (up to
+    llm.max_retries times, as the SDKs would). Other errors are raised.
+
+    Args:
+        config (dict): Application configuration
+        provider (str): "openai" or "anthropic"
+        model (str): Model name
+        call (callable): Makes the request and returns its result; called once per attempt
+        tokens (int): Estimated prompt plus completion tokens of the request
+        max_retries (int): Retries of transient errors (defaults to llm.max_retries)
+        retry_delay (float): Seconds before the first retry; doubles with each one
+        cancel (threading.Event): Once set, no further attempt is sent and
+            RequestCancelled is raised (a backoff ends as soon as it is set)
+    """
+    def check_cancelled():
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled(f"{provider}/{model} request cancelled")
+
+    limiter = get_rate_limiter(provider, model, config)
+    llm_config = config.get("llm", {})
+    retries = llm_config.get("rate_limit_retries", DEFAULT_RATE_LIMIT_RETRIES)
+    if max_retries is None:
+        max_retries = llm_config.get("max_retries", DEFAULT_MAX_RETRIES)
+    rate_limited = failed = 0
+    while True:
+        check_cancelled()
+        limiter.acquire(tokens)
+        # The request may have lost its race while waiting for the limiter
+        check_cancelled()
+        try:
+            return call()
+        except Exception as e:
+            check_cancelled()
+            retry_after = _retry_after(e)
+            if retry_after is not None and rate_limited < retries:
+                rate_limited += 1
+                logger.warning(f"Rate limited by {limiter.name}, retrying in {retry_after:.1f}s")
+                limiter.block_for(retry_after)
+            elif retry_after is None and _is_transient(e) and failed < max_retries:
+                # Jitter keeps requests that failed together from retrying together
+                delay = retry_delay * (2 ** failed) * (1 + random.random())
+                failed += 1
+                logger.warning(f"Request to {limiter.name} failed, retrying in {delay:.1f}s: {str(e)}")
+                if cancel is not None:
+                    cancel.wait(delay)
+                else:
+                    time.sleep(delay)
+            else:
+                raise
@@ -0,0 +1,103 @@
+"""
+Bulk social media regeneration for the Video Processor application.
+
+Re-runs only the generation stage for videos that were already processed,
+using their saved transcript.txt, so edited prompts can be applied to a whole
+output directory without extracting or transcribing anything again. New
+results are written next to the existing ones as social_media.<timestamp>.json.
+"""
+import os
+import glob
+import json
+import logging
+import datetime
+
+from utils.config import load_config
+from utils.prompts import load_prompts
+from core.generation import generate_social_media_content, is_json_object
+from core.media_extraction import add_thumbnails
+from core.scheduler import JobScheduler
+
+logger = logging.getLogger("VideoProcessor")
+
+
+def find_transcript_folders(output_dir):
+    """Return the video folders in output_dir that have a saved transcript"""
+    folders = []
+    for name in sorted(os.listdir(output_dir)):
+        folder = os.path.join(output_dir, name)
+        if os.path.isfile(os.path.join(folder, "transcript.txt")):
+            folders.append(folder)
+    return folders
+
+
+def latest_social_media_json(folder):
+    """Return the newest social media JSON in a video folder (original or regenerated), or None"""
+    paths = glob.glob(os.path.join(folder, "social_media.json")) + glob.glob(os.path.join(folder, "social_media.*.json"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def _regenerate_folder(folder, config, prompts, timestamp, log):
+    """Generate new content for one video folder and return the path it was saved to"""
+    name = os.path.basename(folder)
+    with open(os.path.join(folder, "transcript.txt"), "r", encoding="utf-8") as f:
+        transcript = f.read()
+    if not transcript.strip():
+        raise ValueError(f"Transcript of {name} is empty")
+
+    content = generate_social_media_content(config, transcript, prompts, name, log)
+    # Same fallback as the generation stage: keep non-JSON responses as text
+    data = json.loads(content) if is_json_object(content) else {"content": content}
+    add_thumbnails(data, folder)
+
+    path = os.path.join(folder, f"social_media.{timestamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    log(f"Saved regenerated social media content to: {path}", "SUCCESS")
+    return path
+
+
+def regenerate_social_content(output_dir, prompts=None, max_workers=None, terminal_output_func=None):
+    """
+    Regenerate social media content for every processed video in output_dir.
+
+    Args:
+        output_dir (str): Directory containing one folder per processed video
+        prompts (dict): Prompts to use; defaults to the saved ai_prompts.json
+        max_workers (int): Videos generated at the same time; defaults to
+            processing.stage_workers["generate"]
+        terminal_output_func (callable): Optional terminal output callback
+
+    Returns:
+        dict: Scheduler summary; each successful result is the new file's path
+    """
+    config = load_config()
+    prompts = prompts or load_prompts()
+    if max_workers is None:
+        max_workers = config.get("processing", {}).get("stage_workers", {}).get("generate", 4)
+
+    def log(message, level="INFO"):
+        if level == "ERROR":
+            logger.error(message)
+        elif level == "WARNING":
+            logger.warning(message)
+        else:
+            logger.info(message)
+        if terminal_output_func:
+            terminal_output_func(message, level)
+
+    folders = find_transcript_folders(output_dir)
+    log(f"Regenerating social media content for {len(folders)} videos in {output_dir}")
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    scheduler = JobScheduler(max_workers)
+    for folder in folders:
+        scheduler.submit(os.path.basename(folder), _regenerate_folder, folder, config, prompts, timestamp, log)
+    summary = scheduler.run()
+
+    for result in summary["results"]:
+        if not result["success"]:
+            log(f"Failed to regenerate {result['name']}: {result['error'] or 'see log for details'}", "ERROR")
+    log(f"Regenerated {summary['succeeded']}/{summary['total']} videos in {summary['duration']:.1f}s",
+        "SUCCESS" if summary["failed"] == 0 else "WARNING")
+    return summary
@@ -0,0 +1,117 @@
+"""
+Concurrent whisper-1 transcription for the Video Processor application.
+
+Chunk files are uploaded to the OpenAI transcription endpoint in parallel (up
+to whisper_api.max_concurrency at once, within the whisper-1 rate limit). A
+chunk that fails is retried on its own with exponential backoff by
+rate_limited_call (up to whisper_api.retries times), and the texts are
+returned in chunk order, so a long video takes about as long as its slowest
+chunks instead of the sum of every round trip.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.llm_clients import get_llm_client
+from core.rate_limiter import rate_limited_call
+from core.transcript_cache import get_transcript_cache, transcript_cache_key
+
+logger = logging.getLogger("VideoProcessor")
+
+MODEL = "whisper-1"
+
+
+class ChunkTranscriptionError(RuntimeError):
+    """Raised when chunks still fail after their retries"""
+
+    def __init__(self, errors):
+        """errors maps chunk index to the last error message"""
+        self.errors = errors
+        chunks = ", ".join(str(i + 1) for i in sorted(errors))
+        super().__init__(f"Failed to transcribe chunk(s) {chunks}: {errors[min(errors)]}")
+
+
+def _transcribe_chunk(config, index, path, language, cache, record_upload):
+    """Transcribe one chunk (from the cache if possible), retrying failed uploads"""
+    api_config = config.get("whisper_api", {})
+
+    cache_key = None
+    if cache is not None:
+        # Chunks are exported deterministically, so identical audio hashes identically
+        with open(path, "rb") as f:
+            cache_key = transcript_cache_key(f.read(), MODEL, language)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached[0]["text"]
+
+    def call_api():
+        # Every attempt is an upload, retries included
+        record_upload(os.path.getsize(path))
+        options = {"language": language} if language else {}
+        with open(path, "rb") as audio_file:
+            return get_llm_client("openai", config).audio.transcriptions.create(
+                model=MODEL, file=audio_file, timeout=api_config.get("timeout", 120), **options
+            )
+
+    # rate_limited_call is the only retry layer; whisper_api sets how hard it tries
+    text = rate_limited_call(config, "openai", MODEL, call_api, max_retries=api_config.get("retries", 3),
+                             retry_delay=api_config.get("retry_delay", 1.0)).text
+
+    if cache_key:
+        cache.set(cache_key, [{"text": text}])
+    return text
+
+
+def transcribe_chunk_files(config, paths, language=None, done=None, on_chunk=None, stats=None):
+    """
+    Transcribe chunk files concurrently and return their texts in chunk order.
+
+    Args:
+        config (dict): Application configuration
+        paths (list): Chunk files, in order
+        language (str): Spoken language, or None to let the API detect it
+        done (dict): {index: text} of chunks transcribed earlier; not uploaded again
+        on_chunk (callable): on_chunk(index, text), called from worker threads as
+            soon as each new chunk is transcribed
+        stats (dict): Receives the number of upload "requests" (retries
+            included) and "bytes_uploaded"
+
+    Returns:
+        list: One text per chunk
+
+    Raises:
+        ChunkTranscriptionError: If chunks still fail after whisper_api.retries
+            retries (every other chunk has been transcribed and reported)
+    """
+    done = done or {}
+    texts = [done.get(i) for i in range(len(paths))]
+    pending = [i for i in range(len(paths)) if i not in done]
+    cache = get_transcript_cache(config)
+    errors = {}
+    stats = {} if stats is None else stats
+    stats.update(requests=0, bytes_uploaded=0)
+    stats_lock = threading.Lock()
+
+    def record_upload(size):
+        with stats_lock:
+            stats["requests"] += 1
+            stats["bytes_uploaded"] += size
+
+    def transcribe(index):
+        try:
+            texts[index] = _transcribe_chunk(config, index, paths[index], language, cache, record_upload)
+        except Exception as e:
+            logger.error(f"Error transcribing chunk {index + 1}: {str(e)}")
+            errors[index] = str(e)
+            return
+        if on_chunk:
+            on_chunk(index, texts[index])
+
+    max_concurrency = config.get("whisper_api", {}).get("max_concurrency", 8)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pending) or 1))) as executor:
+        list(executor.map(transcribe, pending))
+
+    if errors:
+        raise ChunkTranscriptionError(errors)
+    return texts
@@ -0,0 +1,87 @@
+"""
+Bounded job scheduler for the Video Processor application.
+
+Jobs wait in a priority queue (FIFO within a priority) and are run by a
+fixed number of worker threads, so selecting many videos never starts more
+decodes and transcriptions than the machine is configured for.
+"""
+import time
+import queue
+import logging
+import itertools
+import threading
+import traceback
+
+logger = logging.getLogger("VideoProcessor")
+
+
+class JobScheduler:
+    """Runs submitted jobs on a bounded pool of worker threads"""
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max(1, int(max_workers))
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._results = []
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, priority=0, **kwargs):
+        """
+        Queue a job. Higher priorities run first; equal priorities run in
+        submission order. The job succeeds if func returns a truthy value.
+        """
+        self._queue.put((-priority, next(self._counter), name, func, args, kwargs))
+
+    def _worker(self):
+        """Take jobs off the queue until it is empty"""
+        while True:
+            try:
+                _, seq, name, func, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+            started = time.time()
+            result = {"name": name, "success": False, "result": None, "error": None}
+            try:
+                result["result"] = func(*args, **kwargs)
+                result["success"] = bool(result["result"])
+            except Exception as e:
+                result["error"] = str(e)
+                logger.error(f"Job {name} failed: {str(e)}")
+                logger.error(traceback.format_exc())
+            result["duration"] = time.time() - started
+
+            with self._lock:
+                self._results.append((seq, result))
+            self._queue.task_done()
+
+    def run(self):
+        """
+        Run every queued job and wait for them to finish.
+
+        Returns:
+            dict: total, succeeded, failed, duration and per-job results in
+                submission order
+        """
+        started = time.time()
+        workers = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(min(self.max_workers, max(self._queue.qsize(), 1)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        with self._lock:
+            results = [result for _, result in sorted(self._results, key=lambda item: item[0])]
+            self._results = []
+
+        succeeded = sum(1 for result in results if result["success"])
+        return {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "duration": time.time() - started,
+            "results": results,
+        }
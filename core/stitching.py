@@ -0,0 +1,95 @@
+"""
+Chunk planning and transcript stitching for the Video Processor application.
+
+Chunks are described as lists of (start_seconds, end_seconds) spans of the
+source recording. Whisper segment timestamps are mapped back onto the source
+timeline so overlapping chunks can be joined without repeated or lost words.
+"""
+import logging
+
+logger = logging.getLogger("VideoProcessor")
+
+
+def fixed_chunk_spans(duration, chunk_seconds, overlap_seconds=0):
+    """
+    Plan fixed-length chunks that overlap by overlap_seconds.
+
+    The overlap is clamped to half the chunk length, so every chunk starts at
+    least half a chunk after the one before it.
+
+    Returns:
+        list: One [(start_seconds, end_seconds)] span list per chunk
+
+    Raises:
+        ValueError: If chunk_seconds isn't positive
+    """
+    if chunk_seconds <= 0:
+        raise ValueError(f"Chunk length must be positive, got {chunk_seconds}")
+    if not 0 <= overlap_seconds <= chunk_seconds / 2:
+        clamped = min(max(overlap_seconds, 0), chunk_seconds / 2)
+        logger.warning(f"Chunk overlap of {overlap_seconds}s doesn't fit {chunk_seconds}s chunks, using {clamped}s")
+        overlap_seconds = clamped
+    step = chunk_seconds - overlap_seconds
+    chunks = []
+    start = 0.0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        chunks.append([(start, end)])
+        if end >= duration:
+            break
+        start += step
+    return chunks
+
+
+def to_source_time(seconds, spans):
+    """Map a time inside a chunk onto the source timeline"""
+    offset = 0.0
+    for start, end in spans:
+        length = end - start
+        if seconds <= offset + length:
+            return start + (seconds - offset)
+        offset += length
+    return spans[-1][1] if spans else seconds
+
+
+def _seam(previous_spans, next_spans):
+    """Return the source time at which to switch chunks, or None if they don't overlap"""
+    previous_end = previous_spans[-1][1]
+    next_start = next_spans[0][0]
+    if previous_end <= next_start:
+        return None
+    return (previous_end + next_start) / 2
+
+
+def stitch_segments(chunk_results):
+    """
+    Join per-chunk Whisper segments into one transcript.
+
+    Where two chunks overlap, each keeps only the segments whose midpoint
+    falls on its side of the middle of the overlap, so words cut off at a
+    chunk edge are taken from the chunk that heard them in full.
+
+    Args:
+        chunk_results (list): (spans, segments) pairs in chunk order, where
+            segments are Whisper result segments with start, end and text
+
+    Returns:
+        str: The stitched transcript
+    """
+    texts = []
+    for i, (spans, segments) in enumerate(chunk_results):
+        lower = _seam(chunk_results[i - 1][0], spans) if i > 0 else None
+        upper = _seam(spans, chunk_results[i + 1][0]) if i + 1 < len(chunk_results) else None
+
+        for segment in segments:
+            start = to_source_time(segment["start"], spans)
+            end = to_source_time(segment["end"], spans)
+            midpoint = (start + end) / 2
+            if lower is not None and midpoint < lower:
+                continue
+            if upper is not None and midpoint >= upper:
+                continue
+            text = segment["text"].strip()
+            if text:
+                texts.append(text)
+    return " ".join(texts)
@@ -0,0 +1,240 @@
+"""
+Structured JSON output for the Video Processor application.
+
+Validates social media responses against a schema, parses streamed JSON
+incrementally so each field can be shown as soon as it is complete, and
+repairs invalid responses with one small follow-up request instead of
+regenerating from the whole transcript.
+"""
+import json
+import logging
+
+from core.llm import complete
+
+logger = logging.getLogger("VideoProcessor")
+
+# Fields the Results tab shows, as produced by the built-in prompt
+SOCIAL_MEDIA_SCHEMA = {
+    "type": "object",
+    "required": ["youtube_title", "youtube_description", "tweets", "linkedin_post", "clip_suggestions"],
+    "properties": {
+        "youtube_title": {"type": "string"},
+        "youtube_description": {"type": "string"},
+        "tweets": {"type": "array", "items": {"type": "string"}},
+        "linkedin_post": {"type": "string"},
+        "clip_suggestions": {"type": "array"},
+    },
+}
+
+# Custom prompts choose their own keys; only require an object
+ANY_OBJECT_SCHEMA = {"type": "object"}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+REPAIR_SYSTEM_PROMPT = "You fix malformed JSON. Reply with the corrected JSON object only."
+
+REPAIR_PROMPT = """The response below should be a JSON object matching this JSON schema:
+{schema}
+
+It has these problems:
+{errors}
+
+Return the corrected JSON object, keeping all of the content.
+
+Response:
+{content}"""
+
+
+def validate_json(value, schema, path="$"):
+    """
+    Check a value against a (subset of) JSON schema: type, required, properties and items.
+
+    Returns:
+        list: Error messages; empty if the value is valid
+    """
+    expected = schema.get("type")
+    if expected and not isinstance(value, _TYPES[expected]) or (expected in ("number", "integer")
+                                                                and isinstance(value, bool)):
+        return [f"{path} should be of type {expected}, not {type(value).__name__}"]
+
+    errors = []
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path} is missing required field \"{key}\"")
+        for key, property_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_json(value[key], property_schema, f"{path}.{key}"))
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_json(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def extract_json_object(text):
+    """Return the JSON object in a response (also inside code fences or prose), or None"""
+    if not text:
+        return None
+    for candidate in (text, text[text.find("{"):text.rfind("}") + 1]):
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def response_errors(content, schema):
+    """Parse a response and validate it; return (object or None, errors)"""
+    value = extract_json_object(content)
+    if value is None:
+        return None, ["the response is not a JSON object"]
+    return value, validate_json(value, schema)
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON object as it streams in.
+
+    Each top-level field is reported to on_field(key, value) as soon as its
+    value is complete, and partial_value() returns the string value that is
+    currently being received. Text before the opening brace (e.g. a code
+    fence) is ignored.
+    """
+
+    def __init__(self, on_field=None):
+        self.on_field = on_field
+        self.fields = {}
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "start"  # start, key, colon, value, after, done
+        self._key = None
+        self._token_start = None
+
+    def feed(self, text):
+        """Add streamed text and report any fields it completes"""
+        self._text += text
+        text = self._text
+        while self._pos < len(text) and self._state != "done":
+            char = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_token(self._pos + 1)
+            elif self._state == "start":
+                if char == "{":
+                    self._depth, self._state = 1, "key"
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state in ("key", "value"):
+                    self._token_start = self._pos
+            elif char in "{[":
+                if self._depth == 1 and self._state == "value":
+                    self._token_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._state == "value":
+                    self._end_token(self._pos + 1)
+                elif self._depth == 0:
+                    self._end_primitive(self._pos)
+                    self._state = "done"
+            elif self._depth == 1:
+                if char == ":" and self._state == "colon":
+                    self._state, self._token_start = "value", None
+                elif char == ",":
+                    self._end_primitive(self._pos)
+                    self._state = "key"
+                elif not char.isspace() and self._state == "value" and self._token_start is None:
+                    self._token_start = self._pos  # Number, true, false or null
+            self._pos += 1
+
+    def _end_token(self, end):
+        """Finish a key or a string/array/object value at depth 1"""
+        token = self._text[self._token_start:end]
+        self._token_start = None
+        if self._state == "key":
+            self._key = json.loads(token)
+            self._state = "colon"
+        elif self._state == "value":
+            self._set_field(token)
+
+    def _end_primitive(self, end):
+        """Finish a number/true/false/null value ended by a comma or brace"""
+        if self._state == "value" and self._token_start is not None:
+            token = self._text[self._token_start:end].strip()
+            self._token_start = None
+            self._set_field(token)
+
+    def _set_field(self, token):
+        """Decode a complete value and report it"""
+        self._state = "after"
+        try:
+            value = json.loads(token)
+        except ValueError:
+            return
+        self.fields[self._key] = value
+        if self.on_field:
+            self.on_field(self._key, value)
+
+    def partial_value(self):
+        """Return (key, text so far) of the string value being received, or None"""
+        if not (self._in_string and self._depth == 1 and self._state == "value" and self._token_start is not None):
+            return None
+        raw = self._text[self._token_start:]
+        # Drop an incomplete escape sequence at the end, if any
+        for cut in range(0, 7):
+            try:
+                return self._key, json.loads(raw[:len(raw) - cut] + '"')
+            except ValueError:
+                continue
+        return None
+
+
+def structured_response(config, model, content, schema=SOCIAL_MEDIA_SCHEMA, log=None, max_tokens=1000):
+    """
+    Validate a response and, if it is invalid, make one repair request.
+
+    Returns:
+        str: Pretty-printed JSON when the (repaired) response is a valid
+        object, the best JSON object found otherwise, or the raw text if
+        there is no JSON object at all
+    """
+    value, errors = response_errors(content, schema)
+    if not errors:
+        return json.dumps(value, indent=2, ensure_ascii=False)
+
+    message = f"Response failed validation ({'; '.join(errors[:5])}), requesting a repair"
+    log(message, "WARNING") if log else logger.warning(message)
+    try:
+        repaired = complete(
+            config, model, REPAIR_SYSTEM_PROMPT,
+            REPAIR_PROMPT.format(schema=json.dumps(schema), errors="\n".join(f"- {e}" for e in errors),
+                                 content=content),
+            temperature=0, max_tokens=max_tokens, json_mode=True
+        )
+        repaired_value, repaired_errors = response_errors(repaired, schema)
+        if not repaired_errors:
+            return json.dumps(repaired_value, indent=2, ensure_ascii=False)
+        if value is None and repaired_value is not None:
+            value = repaired_value
+    except Exception as e:
+        logger.error(f"Error repairing JSON response: {str(e)}")
+
+    return json.dumps(value, indent=2, ensure_ascii=False) if value is not None else content
@@ -0,0 +1,90 @@
+"""
+Token counting for the Video Processor application.
+
+Uses tiktoken when it is available and otherwise estimates three characters
+per token. English averages about four, so the estimate errs towards too many
+tokens and a prompt that passes the context-window check isn't rejected by the
+API.
+"""
+import logging
+import functools
+
+logger = logging.getLogger("VideoProcessor")
+
+# Context window (prompt plus completion tokens) of the models offered in settings
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4.5": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "o1": 200000,
+    "o3-mini": 200000,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+# Characters per token of the estimate used without tiktoken
+ESTIMATE_CHARS_PER_TOKEN = 3
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    """Return the tiktoken encoding for a model, or None if it can't be loaded"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding's BPE file is downloaded on first use, which can fail offline
+        logger.warning(f"Could not load the tiktoken encoding for {model}, estimating tokens instead: {str(e)}")
+        return None
+
+
+def count_tokens(text, model=None):
+    """Return the number of tokens in text for a model"""
+    if not text:
+        return 0
+    encoding = _encoding(model or "gpt-4")
+    if encoding is None:
+        return len(text) // ESTIMATE_CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def context_window(model):
+    """Return a model's context window in tokens"""
+    for name in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+        if model == name or model.startswith(name + "-"):
+            return CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class PromptTooLargeError(ValueError):
+    """Raised instead of sending a prompt that cannot fit a model's context window"""
+
+
+def check_prompt_fits(model, prompt, max_tokens):
+    """
+    Count a prompt's tokens and make sure it leaves room for max_tokens of completion.
+
+    Returns:
+        int: Prompt tokens
+
+    Raises:
+        PromptTooLargeError: If prompt plus completion exceed the context window
+    """
+    tokens = count_tokens(prompt, model)
+    window = context_window(model)
+    if tokens + max_tokens > window:
+        raise PromptTooLargeError(
+            f"Prompt of {tokens} tokens plus {max_tokens} completion tokens does not fit "
+            f"the {window}-token context window of {model}"
+        )
+    return tokens
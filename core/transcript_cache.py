@@ -0,0 +1,43 @@
+"""
+Content-addressed transcript cache for the Video Processor application.
+
+Transcripts are keyed by a hash of the decoded PCM chunk plus the Whisper
+model and language, so the same footage is never transcribed twice, no matter
+which file name or output folder it is processed under.
+"""
+import threading
+
+import numpy as np
+
+from utils.disk_cache import DiskCache, cache_directory, make_cache_key
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def transcript_cache_key(pcm, model_name, language):
+    """
+    Build the cache key for a chunk of audio.
+
+    Args:
+        pcm: Decoded samples as a NumPy array, or raw PCM bytes
+        model_name (str): Whisper model used for the transcript
+        language (str): Transcription language (None for auto-detect)
+    """
+    if isinstance(pcm, np.ndarray):
+        # Hash the samples in place; tobytes() would copy every chunk
+        pcm = memoryview(np.ascontiguousarray(pcm))
+    return make_cache_key(pcm, model_name, language or "auto")
+
+
+def get_transcript_cache(config):
+    """Return the shared transcript cache, or None when it is disabled"""
+    cache_config = config.get("cache", {})
+    if not cache_config.get("transcripts", True):
+        return None
+
+    directory = cache_directory(config, "transcripts")
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = DiskCache(directory, cache_config.get("transcript_max_mb", 256))
+        return _caches[directory]
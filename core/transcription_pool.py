@@ -0,0 +1,188 @@
+"""
+Multi-process Whisper transcription for the Video Processor application.
+
+Each worker process loads its own model and is limited to a fixed number of
+torch threads (optionally pinned to its own CPUs), so several transcriptions
+run in parallel without contending on the GIL or oversubscribing the cores.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from core.transcript_cache import transcript_cache_key
+
+logger = logging.getLogger("VideoProcessor")
+
+DEFAULT_THREADS_PER_WORKER = 4
+
+# Set in each worker process by _init_worker
+_worker_whisper_config = None
+
+
+def _init_worker(whisper_config, threads_per_worker, cpu_sets):
+    """Configure a worker process: thread budget, CPU affinity and model"""
+    global _worker_whisper_config
+    _worker_whisper_config = whisper_config
+
+    # Must be set before torch is imported for OpenMP/MKL to honor them
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads_per_worker)
+
+    if cpu_sets is not None:
+        try:
+            os.sched_setaffinity(0, cpu_sets.get_nowait())
+        except Exception as e:
+            logger.warning(f"Could not set CPU affinity for transcription worker: {str(e)}")
+
+    import torch
+    torch.set_num_threads(threads_per_worker)
+
+    from core.model_registry import model_registry
+    model_registry.warm(whisper_config.get("model", "base"), whisper_config.get("device"), whisper_config.get("dtype"))
+
+
+def _transcribe_in_worker(audio, language):
+    """Transcribe one chunk inside a worker process and return its segments"""
+    from core.model_registry import get_whisper_model, model_registry
+
+    model, dtype = get_whisper_model(_worker_whisper_config)
+    result = model_registry.transcribe(model, audio, language=language, fp16=(dtype == "float16"))
+    # Only send back what the caller needs
+    return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+
+class TranscriptionPool:
+    """Process pool that transcribes 16 kHz float32 chunks with Whisper"""
+
+    def __init__(self, whisper_config, workers=None, threads_per_worker=None, cpu_affinity=False):
+        cpu_count = os.cpu_count() or 1
+        self.whisper_config = whisper_config
+        self.threads_per_worker = max(1, int(threads_per_worker or min(DEFAULT_THREADS_PER_WORKER, cpu_count)))
+        self.workers = max(1, int(workers or cpu_count // self.threads_per_worker))
+
+        # Spawn instead of fork: forking a process that already runs threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        cpu_sets = None
+        if cpu_affinity and hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+            cpu_sets = context.Queue()
+            for i in range(self.workers):
+                cpu_set = cpus[i * self.threads_per_worker:(i + 1) * self.threads_per_worker]
+                cpu_sets.put(set(cpu_set or cpus))
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(whisper_config, self.threads_per_worker, cpu_sets)
+        )
+        # A replaced pool is only shut down once the maps still using it finish
+        self._lock = threading.Lock()
+        self._active_maps = 0
+        self._retired = False
+        logger.info(f"Started {self.workers} transcription workers with {self.threads_per_worker} threads each")
+
+    def map(self, chunks, language, cache=None):
+        """
+        Transcribe chunks in parallel and yield their segments in order.
+
+        At most two chunks per worker are in flight, so lazily produced chunks
+        are never all held in memory at once. Chunks found in the transcript
+        cache are not sent to a worker. A chunk that fails yields an empty
+        list, matching in-process transcription.
+        """
+        model_name = self.whisper_config.get("model", "base")
+        with self._lock:
+            self._active_maps += 1
+        try:
+            pending = deque()
+            for chunk in chunks:
+                cache_key = None
+                if cache is not None:
+                    cache_key = transcript_cache_key(chunk, model_name, language)
+                    segments = cache.get(cache_key)
+                    if segments is not None:
+                        future = Future()
+                        future.set_result(segments)
+                        pending.append((future, None))
+                        continue
+                pending.append((self._executor.submit(_transcribe_in_worker, chunk, language), cache_key))
+                if len(pending) >= self.workers * 2:
+                    yield self._result(*pending.popleft(), cache)
+            while pending:
+                yield self._result(*pending.popleft(), cache)
+        finally:
+            with self._lock:
+                self._active_maps -= 1
+                last = self._retired and self._active_maps == 0
+            if last:
+                self._executor.shutdown(wait=False)
+
+    def _result(self, future, cache_key, cache):
+        """Return a future's segments (caching new ones), or [] if the worker failed"""
+        try:
+            segments = future.result()
+        except Exception as e:
+            logger.error(f"Error transcribing audio in worker process: {str(e)}")
+            return []
+        if cache_key:
+            cache.set(cache_key, segments)
+        return segments
+
+    def retire(self):
+        """Stop the worker processes once every map in progress has finished"""
+        with self._lock:
+            self._retired = True
+            idle = self._active_maps == 0
+        if idle:
+            self._executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the worker processes, cancelling chunks that haven't started"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# "whisper" settings that need new worker processes when they change
+POOL_SETTINGS = ("model", "device", "dtype", "worker_processes", "threads_per_worker", "cpu_affinity")
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def get_transcription_pool(whisper_config):
+    """
+    Return the process-wide transcription pool for a "whisper" config section,
+    or None when transcription should run in-process (worker_processes is 0,
+    or "auto" on a CUDA device, where one process already saturates the GPU).
+    """
+    global _pool, _pool_key
+
+    workers = whisper_config.get("worker_processes", "auto")
+    if workers == "auto":
+        from core.model_registry import model_registry
+        device = model_registry.resolve_key(whisper_config.get("model", "base"), whisper_config.get("device"))[1]
+        if str(device).startswith("cuda"):
+            return None
+        workers = None
+    elif not workers:
+        return None
+
+    # Only settings the workers are started with; language and the like are passed per map
+    key = tuple(str(whisper_config.get(name)) for name in POOL_SETTINGS) + (workers,)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                # Another video may still be mid-map on the old pool
+                _pool.retire()
+            _pool = TranscriptionPool(
+                whisper_config,
+                workers=workers,
+                threads_per_worker=whisper_config.get("threads_per_worker"),
+                cpu_affinity=whisper_config.get("cpu_affinity", False)
+            )
+            _pool_key = key
+        return _pool
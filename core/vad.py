@@ -0,0 +1,136 @@
+"""
+Voice activity detection for the Video Processor application.
+
+A vectorized energy / zero-crossing detector finds speech in 16 kHz audio so
+chunks can end in pauses instead of mid-word, and long silent stretches are
+never sent to Whisper.
+"""
+import logging
+
+import numpy as np
+
+from core.audio import SAMPLE_RATE
+
+logger = logging.getLogger("VideoProcessor")
+
+FRAME_SECONDS = 0.03
+SILENCE_FLOOR = 10 ** (-50 / 20)  # -50 dBFS, anything quieter is never speech
+
+
+def frame_features(blocks, sample_rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS):
+    """
+    Compute per-frame RMS energy and zero-crossing rate.
+
+    Args:
+        blocks: Iterable of consecutive 1-D float32 sample blocks, so long
+            recordings can be analysed one chunk at a time
+        sample_rate (int): Sample rate of the blocks
+        frame_seconds (float): Analysis frame length
+
+    Returns:
+        tuple: (energy, zcr) arrays with one value per frame
+    """
+    frame_length = int(frame_seconds * sample_rate)
+    energies, zcrs = [], []
+    leftover = np.zeros(0, dtype=np.float32)
+
+    for block in blocks:
+        block = np.concatenate([leftover, block]) if len(leftover) else block
+        usable = len(block) - len(block) % frame_length
+        frames = np.asarray(block[:usable], dtype=np.float32).reshape(-1, frame_length)
+        leftover = np.array(block[usable:], dtype=np.float32)
+
+        energies.append(np.sqrt(np.mean(frames ** 2, axis=1)))
+        signs = np.signbit(frames)
+        zcrs.append(np.mean(signs[:, 1:] != signs[:, :-1], axis=1))
+
+    if not energies:
+        return np.zeros(0), np.zeros(0)
+    return np.concatenate(energies), np.concatenate(zcrs)
+
+
+def _runs(mask):
+    """Return (starts, ends) of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def speech_mask(energy, zcr, frame_seconds=FRAME_SECONDS, threshold_ratio=3.0,
+                min_silence_seconds=1.0, hangover_seconds=0.2):
+    """
+    Classify frames as speech, bridging pauses shorter than min_silence_seconds.
+
+    The threshold adapts to the recording: a multiple of the noise floor
+    (10th percentile energy), capped well below the speech level so quiet
+    talkers are not dropped. Low-energy frames with a high zero-crossing
+    rate (fricatives such as "s" and "f") also count as speech.
+    """
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+
+    noise_floor = np.percentile(energy, 10)
+    speech_level = np.percentile(energy, 95)
+    threshold = min(max(noise_floor * threshold_ratio, SILENCE_FLOOR), speech_level * 0.25)
+    threshold = max(threshold, SILENCE_FLOOR)
+
+    mask = (energy > threshold) | ((energy > threshold * 0.5) & (zcr > 0.3))
+
+    # Extend speech a little on both sides so word onsets and tails are kept
+    hangover = int(hangover_seconds / frame_seconds)
+    if hangover > 0:
+        mask = np.convolve(mask, np.ones(2 * hangover + 1), mode="same") > 0
+
+    # Short pauses are part of speech; only long silences are skipped
+    starts, ends = _runs(~mask)
+    short = (ends - starts) < int(min_silence_seconds / frame_seconds)
+    for start, end in zip(starts[short], ends[short]):
+        mask[start:end] = True
+    return mask
+
+
+def _split_region(energy, start, end, target_frames, search_frames):
+    """Split a long speech region at its quietest frames near the target length"""
+    pieces = []
+    while end - start > target_frames:
+        window_start = start + max(1, target_frames - search_frames)
+        window_end = start + target_frames
+        cut = window_start + int(np.argmin(energy[window_start:window_end]))
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def plan_speech_chunks(blocks, target_seconds=30, frame_seconds=FRAME_SECONDS,
+                       search_seconds=5.0, **mask_options):
+    """
+    Plan transcription chunks that contain only speech.
+
+    Consecutive speech regions are packed into chunks of up to target_seconds
+    of speech; regions longer than that are cut at the quietest point within
+    search_seconds before the target length.
+
+    Returns:
+        tuple: (chunks, skipped_seconds) where each chunk is a list of
+            (start_seconds, end_seconds) spans in the source recording
+    """
+    energy, zcr = frame_features(blocks, frame_seconds=frame_seconds)
+    mask = speech_mask(energy, zcr, frame_seconds, **mask_options)
+
+    target_frames = max(1, int(target_seconds / frame_seconds))
+    search_frames = int(search_seconds / frame_seconds)
+
+    chunks, current, current_frames = [], [], 0
+    for start, end in zip(*_runs(mask)):
+        for piece_start, piece_end in _split_region(energy, start, end, target_frames, search_frames):
+            length = piece_end - piece_start
+            if current and current_frames + length > target_frames:
+                chunks.append(current)
+                current, current_frames = [], 0
+            current.append((piece_start * frame_seconds, piece_end * frame_seconds))
+            current_frames += length
+    if current:
+        chunks.append(current)
+
+    skipped_seconds = float(np.count_nonzero(~mask)) * frame_seconds
+    return chunks, skipped_seconds
@@ -3,18 +3,30 @@ Core video processing functionality for the Video Processor application.
 """
 import os
 import json
+import time
 import subprocess
 import logging
 import traceback
-import threading
-from pydub import AudioSegment
-import whisper
-import openai
 import platform
 import datetime
 
 from utils.logger import status_queue, log_exception
 from utils.config import get_api_key, load_config
+from core.model_registry import get_whisper_model, model_registry
+from core.transcription_pool import get_transcription_pool
+from core.transcript_cache import get_transcript_cache, transcript_cache_key
+from core.generation import generate_social_media_content
+from core.hedging import hedge_budget
+from core.rate_limiter import rate_limiter_stats
+from core.audio import (SAMPLE_RATE, SpanChunks, WavChunker, array_reader, extract_audio_file_parallel,
+                        load_audio_array, load_audio_array_parallel, split_audio_array)
+from core.vad import plan_speech_chunks
+from core.stitching import fixed_chunk_spans, stitch_segments
+from core.scheduler import JobScheduler
+from core.pipeline import StagePipeline
+from core.job_store import LOCAL_PIPELINE, get_job_store
+from core.media_extraction import add_thumbnails, extract_media
+from utils.media_probe import probe, probed_durations
 
 # Set up logging in user's documents folder
 if platform.system() == 'Windows':
@@ -39,8 +51,13 @@ logging.basicConfig(
 class VideoProcessor:
     """Class to handle video processing operations"""
     
-    def __init__(self, video_path, output_dir, terminal_output_func=None):
-        """Initialize the video processor with a video file and output directory"""
+    def __init__(self, video_path, output_dir, terminal_output_func=None, content_stream_func=None):
+        """
+        Initialize the video processor with a video file and output directory.
+        
+        content_stream_func(field, text, done) receives social media fields as
+        they stream in when llm.per_platform is enabled.
+        """
         self.video_path = video_path
         self.output_dir = output_dir
         self.video_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -53,76 +70,74 @@ class VideoProcessor:
         # Create output folder if it doesn't exist
         os.makedirs(self.output_folder, exist_ok=True)
         
+        # Intermediate results handed from one stage to the next
+        self.chunks = None
+        self.full_transcript = ""
+        self.failed_chunks = 0
+        
         # Initialize logger
         self.logger = logging.getLogger("VideoProcessor")
         self.terminal_output = terminal_output_func
+        self.content_stream = content_stream_func
         
         # Load configuration
         self.config = load_config()
         
-        # Set OpenAI API key from environment variables
-        api_key = get_api_key("OPENAI_API_KEY")
-        if api_key:
-            openai.api_key = api_key
-            self._log("OpenAI API key loaded successfully")
-        else:
+        # Stages and transcribed chunks are recorded so an interrupted run can resume
+        self.jobs = get_job_store(self.config)
+        self.job_id = None
+        self.claimed = False
+        self.skip_stages = set()
+        self.keyframes_failed = False
+        if self.jobs is not None:
+            try:
+                self.job_id = self.jobs.enqueue(video_path, output_dir, self.output_folder, pipeline=LOCAL_PIPELINE)
+            except Exception as e:
+                self._log(f"Error recording job for {self.video_name}, it won't be resumable: {str(e)}", "WARNING")
+        
+        # API clients are shared per process (see core.llm_clients); only check the key here
+        if not get_api_key("OPENAI_API_KEY"):
             self._log("OpenAI API key not found. Some features may not work correctly.", "WARNING")
     
+    # Processing stages, in order; each maps to a _<name>_stage method
+    STAGES = ("extract", "transcribe", "generate")
+    
     def process_video(self):
         """Process a video file to generate social media content"""
+        for stage in self.STAGES:
+            if not self.run_stage(stage):
+                return False
+        return True
+    
+    def run_stage(self, stage):
+        """
+        Run one processing stage. Stages share state on the processor, so they
+        must run in STAGES order, but different videos can be in different
+        stages at the same time (see core.pipeline).
+        """
         try:
-            # Extract audio from video
-            status_queue.put(f"Extracting audio from: {self.video_name}")
-            self._log("Extracting audio from video: {self.video_name}")
-            self._extract_audio()
-            
-            # Split audio into chunks
-            status_queue.put(f"Splitting audio into chunks: {self.video_name}")
-            self._log(f"Splitting audio into chunks: {self.video_name}")
-            chunks = self._split_audio()
-            
-            # Transcribe each chunk
-            transcripts = []
-            for i, chunk_path in enumerate(chunks):
-                status_queue.put(f"Transcribing chunk {i+1}/{len(chunks)} for {self.video_name}")
-                self._log(f"Transcribing chunk {i+1}/{len(chunks)}: {os.path.basename(chunk_path)}")
-                transcript = self._transcribe_audio(chunk_path)
-                transcripts.append(transcript)
-            
-            # Combine transcripts
-            full_transcript = " ".join(transcripts)
-            
-            # Save transcript
-            with open(self.transcript_path, "w", encoding="utf-8") as f:
-                f.write(full_transcript)
-            self._log(f"Saved transcript to: {self.transcript_path}", "SUCCESS")
-            
-            # Generate social media content
-            status_queue.put(f"Generating social media content for {self.video_name}")
-            self._log(f"Generating social media content for: {self.video_name}")
-            social_media_content = self._generate_social_media_content(full_transcript)
-            
-            # Save social media content
-            with open(self.social_media_path, "w", encoding="utf-8") as f:
-                f.write(social_media_content)
-            
-            # Save as JSON
-            try:
-                social_media_json = json.loads(social_media_content)
-                with open(self.social_media_json_path, "w", encoding="utf-8") as f:
-                    json.dump(social_media_json, f, indent=2, ensure_ascii=False)
-                self._log(f"Saved social media content to: {self.social_media_json_path}", "SUCCESS")
-            except json.JSONDecodeError:
-                # If not valid JSON, save as plain text
-                self._log("Social media content is not valid JSON, saving as plain text", "WARNING")
-                with open(self.social_media_json_path, "w", encoding="utf-8") as f:
-                    f.write(json.dumps({"content": social_media_content}, indent=2, ensure_ascii=False))
-            
-            status_queue.put(f"Processing completed for {self.video_name}")
-            self._log(f"Processing completed for: {self.video_name}", "SUCCESS")
+            if self.job_id is None or self._begin_stage(stage):
+                getattr(self, f"_{stage}_stage")()
+                if self.claimed:
+                    artifact = getattr(self, self.STAGE_ARTIFACTS[stage]) if stage in self.STAGE_ARTIFACTS else None
+                    # A transcript with failed chunks isn't done: resume transcribes them again
+                    success = not (stage == "transcribe" and self.failed_chunks)
+                    self.jobs.finish_stage(self.job_id, stage, success=success, artifact=artifact)
+            if stage == self.STAGES[-1]:
+                if self.failed_chunks:
+                    self._finish_job(False, f"{self.failed_chunks} chunk(s) failed to transcribe")
+                    self._log(f"Processing completed for: {self.video_name}, but {self.failed_chunks} chunk(s) "
+                              f"failed to transcribe; resuming the job transcribes them again", "WARNING")
+                else:
+                    self._finish_job(True)
+                    self._log(f"Processing completed for: {self.video_name}", "SUCCESS")
+                status_queue.put(f"Processing completed for {self.video_name}")
             return True
             
         except Exception as e:
+            if self.claimed:
+                self.jobs.finish_stage(self.job_id, stage, success=False)
+                self._finish_job(False, f"{stage} stage failed: {str(e)}")
             if self.terminal_output:
                 error_msg = log_exception(self.logger, e, f"Error processing video {self.video_name}", self.terminal_output)
             else:
@@ -133,6 +148,173 @@ class VideoProcessor:
             status_queue.put(f"Error processing {self.video_name}: {str(e)}")
             return False
     
+    # Files that let a completed stage be skipped when a job resumes
+    STAGE_ARTIFACTS = {"transcribe": "transcript_path", "generate": "social_media_json_path"}
+    
+    def _begin_stage(self, stage):
+        """
+        Claim the job before its first stage and record each stage in the job store.
+        
+        Returns:
+            bool: False if the stage was completed by an earlier, interrupted run
+        """
+        if stage == self.STAGES[0]:
+            if not self.jobs.claim(self.job_id):
+                raise RuntimeError(f"{self.video_name} is being processed by another worker")
+            self.claimed = True
+            completed = self.jobs.completed_stages(self.job_id)
+            self.skip_stages = {name for name, artifact in completed.items() if artifact and os.path.exists(artifact)}
+            if "transcribe" in self.skip_stages:
+                # The audio is only needed for transcription
+                self.skip_stages.add("extract")
+        
+        if stage in self.skip_stages:
+            self._log(f"Skipping {stage} stage for {self.video_name}: completed by an earlier run")
+            if stage == "transcribe":
+                with open(self.transcript_path, "r", encoding="utf-8") as f:
+                    self.full_transcript = f.read()
+            return False
+        
+        self.jobs.start_stage(self.job_id, stage)
+        return True
+    
+    def _finish_job(self, success, error=None):
+        """Record the outcome of a claimed job and release its lease"""
+        if self.claimed:
+            self.jobs.finish(self.job_id, success, error)
+            self.claimed = False
+    
+    def _extract_stage(self):
+        """Extract audio from video and split it into chunks"""
+        self.chunks = self._prepare_chunks()
+    
+    def _transcribe_stage(self):
+        """Transcribe each chunk and save the stitched transcript"""
+        chunks = self.chunks
+        done = self._resumable_chunks(chunks)
+        pending = SpanChunks(chunks.read, [spans for i, spans in enumerate(chunks.chunks) if i not in done])
+        
+        whisper_config = self.config.get("whisper", {})
+        pool = get_transcription_pool(whisper_config)
+        if pool:
+            # Chunks are transcribed in parallel by worker processes
+            self._log(f"Transcribing {len(pending)} chunks with {pool.workers} worker processes")
+            results = pool.map(pending, whisper_config.get("language", "en"), get_transcript_cache(self.config))
+        else:
+            results = (self._transcribe_audio(chunk) for chunk in pending)
+        results = iter(results)
+        
+        chunk_results = []
+        self.failed_chunks = 0
+        for i, spans in enumerate(chunks.chunks):
+            if i in done:
+                segments = done[i]
+            else:
+                started = time.time()
+                segments = next(results)
+                if not segments:
+                    # Errors come back as no segments; the rest of the video still gets transcribed
+                    self.failed_chunks += 1
+                if self.claimed:
+                    # Checkpoint each chunk so a crash only loses the chunks in flight
+                    self.jobs.save_chunk(self.job_id, i, spans[0][0], spans[-1][1], segments, time.time() - started)
+            status_queue.put(f"Transcribed chunk {i+1}/{len(chunks)} for {self.video_name}")
+            self._log(f"Transcribed chunk {i+1}/{len(chunks)} ({spans[0][0]:.0f}s-{spans[-1][1]:.0f}s)")
+            chunk_results.append((spans, segments))
+        
+        # Release the audio as soon as it is no longer needed
+        self.chunks = None
+        
+        cache = get_transcript_cache(self.config)
+        if cache is not None:
+            stats = cache.stats()
+            self._log(f"Transcript cache: {stats['hits']} hits, {stats['misses']} misses "
+                      f"({stats['hit_rate']:.0%} hit rate)")
+        
+        # Combine transcripts, removing words repeated in overlapping chunks
+        self.full_transcript = stitch_segments(chunk_results)
+        
+        # Save transcript
+        with open(self.transcript_path, "w", encoding="utf-8") as f:
+            f.write(self.full_transcript)
+        self._log(f"Saved transcript to: {self.transcript_path}", "SUCCESS")
+    
+    def _resumable_chunks(self, chunks):
+        """Return {index: segments} of chunks transcribed by an earlier run of the same chunk plan"""
+        if not self.claimed:
+            return {}
+        done = {}
+        for i, (start, end, segments) in self.jobs.completed_chunks(self.job_id).items():
+            # A changed chunk plan (e.g. different chunk settings) can't reuse old chunks
+            if i < len(chunks.chunks) and abs(chunks.chunks[i][0][0] - start) < 1e-3 \
+                    and abs(chunks.chunks[i][-1][1] - end) < 1e-3:
+                done[i] = segments
+        if done:
+            self._log(f"Resuming transcription of {self.video_name}: {len(done)} of {len(chunks)} "
+                      f"chunks were transcribed by an earlier run")
+        return done
+    
+    def _generate_stage(self):
+        """Generate social media content from the transcript and save it"""
+        status_queue.put(f"Generating social media content for {self.video_name}")
+        self._log(f"Generating social media content for: {self.video_name}")
+        social_media_content = self._generate_social_media_content(self.full_transcript)
+        
+        # Save social media content
+        with open(self.social_media_path, "w", encoding="utf-8") as f:
+            f.write(social_media_content)
+        
+        # Save as JSON
+        try:
+            social_media_json = add_thumbnails(json.loads(social_media_content), self.output_folder)
+            with open(self.social_media_json_path, "w", encoding="utf-8") as f:
+                json.dump(social_media_json, f, indent=2, ensure_ascii=False)
+            self._log(f"Saved social media content to: {self.social_media_json_path}", "SUCCESS")
+        except json.JSONDecodeError:
+            # If not valid JSON, save as plain text
+            self._log("Social media content is not valid JSON, saving as plain text", "WARNING")
+            with open(self.social_media_json_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"content": social_media_content}, indent=2, ensure_ascii=False))
+    
+    def _prepare_chunks(self):
+        """Extract the audio and return the chunks to transcribe"""
+        processing_config = self.config.get("processing", {})
+        
+        status_queue.put(f"Extracting audio from: {self.video_name}")
+        self._log(f"Extracting audio from video: {self.video_name}")
+        source = None
+        if self._in_memory_audio():
+            source = self._extract_audio_in_memory()
+        
+        if source is None:
+            self._extract_audio()
+            
+            # Split audio into chunks
+            status_queue.put(f"Splitting audio into chunks: {self.video_name}")
+            self._log(f"Splitting audio into chunks: {self.video_name}")
+            source = self._split_audio()
+        
+        if isinstance(source, WavChunker):
+            blocks, read, duration = source, source.read, source.duration
+        else:
+            blocks, read, duration = split_audio_array(source), array_reader(source), len(source) / SAMPLE_RATE
+        
+        chunk_seconds = processing_config.get("chunk_size", 600)
+        if processing_config.get("vad", True):
+            # Boundaries fall in pauses, so VAD chunks don't need to overlap
+            chunks, skipped_seconds = plan_speech_chunks(
+                blocks, chunk_seconds, min_silence_seconds=processing_config.get("vad_min_silence", 1.0)
+            )
+            percent = 100 * skipped_seconds / duration if duration else 0
+            self._log(f"Voice activity detection: {len(chunks)} chunks, skipped {skipped_seconds:.1f}s "
+                      f"of silence ({percent:.0f}% of {duration:.1f}s)", "INFO")
+            status_queue.put(f"Skipped {skipped_seconds:.0f}s of silence in {self.video_name}")
+        else:
+            chunks = fixed_chunk_spans(duration, chunk_seconds, processing_config.get("overlap", 30))
+            self._log(f"Split {duration:.1f}s of audio into {len(chunks)} chunks of {chunk_seconds}s", "INFO")
+        
+        return SpanChunks(read, chunks)
+    
     def _log(self, message, level="INFO"):
         """Log a message to both the logger and terminal output if available"""
         if level == "ERROR":
@@ -147,8 +329,99 @@ class VideoProcessor:
         if self.terminal_output:
             self.terminal_output(message, level)
     
+    def _extraction_duration(self):
+        """
+        Return the probed duration if the video is long enough for segment-parallel
+        extraction (processing.extract_segments > 1), otherwise None
+        """
+        processing_config = self.config.get("processing", {})
+        if processing_config.get("extract_segments", 4) <= 1:
+            return None
+        info = probe(self.video_path, self.config)
+        if not info or not info["valid"] or not info["audio"]:
+            return None
+        if info["duration"] < 2 * processing_config.get("extract_segment_min_seconds", 300):
+            return None
+        return info["duration"]
+    
+    def _in_memory_audio(self):
+        """
+        True if the audio should be decoded straight into memory: only with
+        processing.in_memory_audio on and a probed duration of at most
+        processing.in_memory_audio_max_seconds. Longer or unprobed videos are
+        memory-mapped from audio.wav, so peak memory doesn't grow with their length.
+        """
+        processing_config = self.config.get("processing", {})
+        if not processing_config.get("in_memory_audio", True):
+            return False
+        max_seconds = processing_config.get("in_memory_audio_max_seconds", 1800)
+        if not max_seconds:
+            return True
+        info = probe(self.video_path, self.config)
+        if not info or not info["valid"]:
+            return False
+        if info["duration"] > max_seconds:
+            self._log(f"{self.video_name} is {info['duration']:.0f}s long, memory-mapping its audio "
+                      f"instead of decoding it into memory", "INFO")
+            return False
+        return True
+    
+    def _single_pass(self):
+        """True if scene keyframes are wanted and the video has the streams the single pass maps"""
+        if self.keyframes_failed or not self.config.get("processing", {}).get("keyframes", True):
+            return False
+        info = probe(self.video_path, self.config)
+        return bool(info and info["valid"] and info["video"] and info["audio"])
+    
+    def _extract_media(self, audio_output):
+        """
+        Extract the audio (unless audio_output is None), scene keyframes and the
+        stats sidecar in one ffmpeg pass; returns the samples for audio_output "-"
+        """
+        samples, stats = extract_media(self.video_path, self.output_folder, self.config, audio_output)
+        what = "audio and " if audio_output is not None else ""
+        self._log(f"Extracted {what}{len(stats['keyframes'])} scene keyframes in one pass "
+                  f"({stats['elapsed']:.1f}s)", "SUCCESS")
+        return samples
+    
+    def _extract_keyframes(self):
+        """Extract scene keyframes on their own (after a segment-parallel audio extraction)"""
+        if not self._single_pass():
+            return
+        try:
+            self._extract_media(None)
+        except Exception as e:
+            self.keyframes_failed = True
+            self._log(f"Keyframe extraction failed, continuing without thumbnails: {str(e)}", "WARNING")
+    
     def _extract_audio(self):
         """Extract audio from video file"""
+        duration = self._extraction_duration()
+        if duration is not None:
+            processing_config = self.config.get("processing", {})
+            try:
+                os.makedirs(os.path.dirname(self.audio_path), exist_ok=True)
+                started = time.time()
+                extract_audio_file_parallel(
+                    self.video_path, self.audio_path, duration,
+                    processing_config.get("extract_segments", 4),
+                    min_segment_seconds=processing_config.get("extract_segment_min_seconds", 300)
+                )
+                self._log(f"Extracted {duration:.1f}s of audio in parallel segments "
+                          f"in {time.time() - started:.1f}s", "SUCCESS")
+                self._extract_keyframes()
+                return
+            except Exception as e:
+                self._log(f"Parallel audio extraction failed, using a single ffmpeg process: {str(e)}", "WARNING")
+        
+        if self._single_pass():
+            try:
+                self._extract_media(self.audio_path)
+                return
+            except Exception as e:
+                self.keyframes_failed = True
+                self._log(f"Single-pass extraction failed, extracting audio only: {str(e)}", "WARNING")
+        
         try:
             self._log(f"Extracting audio using ffmpeg: {self.video_path}")
             # Create the output directory if it doesn't exist
@@ -157,8 +430,8 @@ class VideoProcessor:
             # Command to extract audio
             command = [
                 "ffmpeg", "-i", self.video_path, 
-                "-vn", "-acodec", "pcm_s16le", 
-                "-ar", "44100", "-ac", "1", 
+                "-vn", "-acodec", "pcm_f32le", 
+                "-ar", str(SAMPLE_RATE), "-ac", "1", 
                 self.audio_path, "-y"
             ]
             
@@ -211,35 +484,41 @@ class VideoProcessor:
             
             raise RuntimeError("Failed to extract audio using both primary and fallback methods") from e
     
-    def _split_audio(self, chunk_length_ms=30000):
-        """Split audio file into chunks"""
+    def _extract_audio_in_memory(self):
+        """Decode audio at 16 kHz into memory without writing intermediate WAV files"""
         try:
-            # Load audio file
-            audio = AudioSegment.from_wav(self.audio_path)
-            
-            # Calculate number of chunks
-            num_chunks = len(audio) // chunk_length_ms + (1 if len(audio) % chunk_length_ms > 0 else 0)
-            
-            # Create chunks directory
-            chunks_dir = os.path.join(self.output_folder, "chunks")
-            os.makedirs(chunks_dir, exist_ok=True)
-            
-            # Split audio into chunks
-            chunks = []
-            for i in range(num_chunks):
-                start = i * chunk_length_ms
-                end = min(start + chunk_length_ms, len(audio))
-                chunk = audio[start:end]
-                
-                # Save chunk
-                chunk_path = os.path.join(chunks_dir, f"chunk_{i+1}.wav")
-                chunk.export(chunk_path, format="wav")
-                chunks.append(chunk_path)
-                
-                status_queue.put(f"Created chunk {i+1} for {self.video_name}")
-                self._log(f"Created chunk {i+1}/{num_chunks}", "INFO")
-            
-            return chunks
+            self._log(f"Decoding audio into memory using ffmpeg: {self.video_path}")
+            duration = self._extraction_duration()
+            if duration is not None:
+                processing_config = self.config.get("processing", {})
+                samples = load_audio_array_parallel(
+                    self.video_path, duration, processing_config.get("extract_segments", 4),
+                    min_segment_seconds=processing_config.get("extract_segment_min_seconds", 300)
+                )
+                # Long videos favour the parallel audio decode over sharing one pass
+                self._extract_keyframes()
+            elif self._single_pass():
+                try:
+                    samples = self._extract_media("-")
+                except Exception as e:
+                    self.keyframes_failed = True
+                    self._log(f"Single-pass extraction failed, extracting audio only: {str(e)}", "WARNING")
+                    samples = load_audio_array(self.video_path)
+            else:
+                samples = load_audio_array(self.video_path)
+            self._log(f"Decoded {len(samples) / SAMPLE_RATE:.1f}s of audio", "SUCCESS")
+            return samples
+        except Exception as e:
+            # Fall back to the file-based path, which has its own moviepy fallback
+            self._log(f"In-memory audio extraction failed, using audio file instead: {str(e)}", "WARNING")
+            return None
+    
+    def _split_audio(self):
+        """Memory-map the extracted audio so chunks can be read from it lazily"""
+        try:
+            chunker = WavChunker(self.audio_path)
+            self._log(f"Mapped {chunker.duration:.1f}s of audio from {os.path.basename(self.audio_path)}", "INFO")
+            return chunker
             
         except Exception as e:
             if self.terminal_output:
@@ -250,118 +529,64 @@ class VideoProcessor:
             
             raise
     
-    def _transcribe_audio(self, audio_path):
-        """Transcribe audio using Whisper"""
+    def _transcribe_audio(self, audio):
+        """Transcribe audio using Whisper and return its timestamped segments"""
+        audio_label = os.path.basename(audio) if isinstance(audio, str) else "in-memory audio"
         try:
-            self._log(f"Transcribing audio: {os.path.basename(audio_path)}")
+            self._log(f"Transcribing audio: {audio_label}")
             
             # Load whisper model based on configuration
             whisper_config = self.config.get("whisper", {})
             model_name = whisper_config.get("model", "base")
             language = whisper_config.get("language", "en")
             
-            self._log(f"Loading Whisper model: {model_name}")
-            model = whisper.load_model(model_name)
+            # The same audio transcribed before (under any file name) is served from the cache
+            cache = get_transcript_cache(self.config)
+            cache_key = None
+            if cache is not None and not isinstance(audio, str):
+                cache_key = transcript_cache_key(audio, model_name, language)
+                segments = cache.get(cache_key)
+                if segments is not None:
+                    self._log("Using cached transcription", "SUCCESS")
+                    return segments
+            
+            # Reuse the process-wide model instead of reloading it per chunk
+            self._log(f"Using Whisper model: {model_name}")
+            model, dtype = get_whisper_model(whisper_config)
             
             # Transcribe
             self._log("Transcribing audio...")
-            result = model.transcribe(audio_path, language=language)
+            # The shared model decodes one chunk at a time
+            result = model_registry.transcribe(model, audio, language=language, fp16=(dtype == "float16"))
+            segments = [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+            
+            if cache_key:
+                cache.set(cache_key, segments)
             
             self._log("Transcription completed", "SUCCESS")
-            return result["text"]
+            return segments
             
         except Exception as e:
             if self.terminal_output:
-                log_exception(self.logger, e, f"Error transcribing audio: {os.path.basename(audio_path)}", self.terminal_output)
+                log_exception(self.logger, e, f"Error transcribing audio: {audio_label}", self.terminal_output)
             else:
                 self.logger.error(f"Error transcribing audio: {str(e)}")
                 self.logger.error(traceback.format_exc())
             
-            # Return empty string on error to allow processing to continue
-            return ""
+            # Return no segments on error to allow processing to continue
+            return []
     
-    def _generate_social_media_content(self, transcript):
-        """Generate social media content from transcript using OpenAI"""
+    def _generate_social_media_content(self, transcript, prompts=None):
+        """
+        Generate social media content from transcript using OpenAI.
+        
+        prompts overrides the built-in prompt (see core.generation).
+        """
         try:
             self._log("Generating social media content from transcript")
-            
-            # Check if API key is set
-            if not openai.api_key:
-                api_key = get_api_key("OPENAI_API_KEY")
-                if api_key:
-                    openai.api_key = api_key
-                    self._log("OpenAI API key loaded successfully")
-                else:
-                    raise ValueError("OpenAI API key not found. Cannot generate social media content.")
-            
-            # Load OpenAI configuration
-            openai_config = self.config.get("openai", {})
-            model = openai_config.get("model", "gpt-4")
-            temperature = openai_config.get("temperature", 0.7)
-            max_tokens = openai_config.get("max_tokens", 1000)
-            
-            # Create prompt for social media content
-            prompt = """
-            Based on the following transcript, generate social media content in JSON format:
-            1. A catchy title for YouTube
-            2. A description for YouTube (with appropriate hashtags)
-            3. Three tweets/posts for Twitter/X
-            4. A LinkedIn post
-            5. Three short clips suggestions with timestamps (if identifiable)
-            
-            Format the response as a valid JSON object with these keys: 
-            youtube_title, youtube_description, tweets, linkedin_post, clip_suggestions
-            
-            Transcript:
-            """
-            
-            # Call OpenAI API
-            self._log(f"Calling OpenAI API with model: {model}")
-            
-            # Handle different model types (OpenAI vs Anthropic)
-            if model.startswith("o1") or model.startswith("o3"):
-                # Anthropic models
-                import anthropic
-                client = anthropic.Anthropic(api_key=openai.api_key)
-                response = client.messages.create(
-                    model=model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    system="You are a social media content creator assistant.",
-                    messages=[
-                        {"role": "user", "content": prompt + transcript}
-                    ]
-                )
-                content = response.content[0].text
-            else:
-                # OpenAI models
-                if model in ["gpt-4o", "gpt-4o-mini", "gpt-4.5"]:
-                    # Newer OpenAI models use the OpenAI client
-                    from openai import OpenAI
-                    client = OpenAI(api_key=openai.api_key)
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": "You are a social media content creator assistant."},
-                            {"role": "user", "content": prompt + transcript}
-                        ],
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-                    content = response.choices[0].message.content
-                else:
-                    # Legacy OpenAI models
-                    response = openai.ChatCompletion.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": "You are a social media content creator assistant."},
-                            {"role": "user", "content": prompt + transcript}
-                        ],
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-                    content = response.choices[0].message.content
-            
+            content = generate_social_media_content(
+                self.config, transcript, prompts, self.video_name, self._log, self.content_stream
+            )
             self._log("Social media content generated successfully", "SUCCESS")
             
             return content
@@ -383,25 +608,89 @@ class VideoProcessor:
                 "clip_suggestions": []
             }, indent=2)
 
-def process_videos_multithreaded(video_paths, output_dir, terminal_output_func=None):
-    """Process multiple videos concurrently using threading"""
+def _process_single_video(video_path, output_dir, terminal_output_func=None):
+    """Create a processor for one video and run it (a scheduler job)"""
+    return VideoProcessor(video_path, output_dir, terminal_output_func).process_video()
+
+def _run_stage_pipeline(video_paths, output_dir, terminal_output_func, processing_config, max_workers):
+    """Overlap extraction, transcription and generation across videos"""
+    stage_workers = processing_config.get("stage_workers", {})
+    workers = {stage: max(1, min(stage_workers.get(stage, 1), max_workers)) for stage in VideoProcessor.STAGES}
+    if workers != {stage: stage_workers.get(stage, 1) for stage in VideoProcessor.STAGES}:
+        logging.getLogger("VideoProcessor").info(
+            f"Stage workers capped at {max_workers} per stage: "
+            + ", ".join(f"{stage} {count}" for stage, count in workers.items()))
+    pipeline = StagePipeline(
+        [(stage, lambda processor, stage=stage: processor.run_stage(stage), workers[stage])
+         for stage in VideoProcessor.STAGES],
+        queue_size=processing_config.get("stage_queue_size", 2)
+    )
+    processors = [VideoProcessor(video_path, output_dir, terminal_output_func) for video_path in video_paths]
+    return pipeline.run(processors, names=[os.path.basename(video_path) for video_path in video_paths])
+
+def process_videos_multithreaded(video_paths, output_dir, terminal_output_func=None, max_workers=None):
+    """
+    Process multiple videos concurrently.
+    
+    max_workers defaults to processing.max_threads. With processing.pipeline_stages
+    enabled, each stage has its own worker pool (processing.stage_workers, each
+    capped at max_workers) so stages overlap across videos, and no stage works on
+    more than max_workers videos at once. Otherwise at most max_workers videos run
+    end to end at once and the rest wait in a queue, longest first.
+    
+    Returns:
+        dict: Summary with total, succeeded, failed, duration and per-video results
+    """
     try:
-        # Create a list to store threads
-        threads = []
+        config = load_config()
+        if max_workers is None:
+            max_workers = config.get("processing", {}).get("max_threads", 4)
         
-        # Create and start a thread for each video
-        for video_path in video_paths:
-            processor = VideoProcessor(video_path, output_dir, terminal_output_func)
-            thread = threading.Thread(target=processor.process_video)
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
+        # Load the Whisper model once before the workers start sharing it
+        whisper_config = config.get("whisper", {})
+        model_registry.warm(
+            whisper_config.get("model", "base"),
+            whisper_config.get("device"),
+            whisper_config.get("dtype")
+        )
         
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        # Probe the whole batch at once; each processor's validation then hits the
+        # probe index, and starting the longest videos first shortens the batch
+        durations = probed_durations(video_paths, config)
         
-        return True
+        processing_config = config.get("processing", {})
+        if processing_config.get("pipeline_stages", True):
+            ordered = sorted(video_paths, key=lambda path: durations.get(path, 0), reverse=True)
+            summary = _run_stage_pipeline(ordered, output_dir, terminal_output_func, processing_config, max_workers)
+        else:
+            scheduler = JobScheduler(max_workers)
+            for video_path in video_paths:
+                scheduler.submit(os.path.basename(video_path), _process_single_video,
+                                 video_path, output_dir, terminal_output_func,
+                                 priority=int(durations.get(video_path, 0)))
+            summary = scheduler.run()
+        
+        logger = logging.getLogger("VideoProcessor")
+        message = (f"Processed {summary['succeeded']}/{summary['total']} videos "
+                   f"in {summary['duration']:.1f}s")
+        if "stage_busy" in summary:
+            busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in summary["stage_busy"].items())
+            message += f" (stage busy time: {busy})"
+        logger.info(message)
+        if terminal_output_func:
+            terminal_output_func(message, "SUCCESS" if summary["failed"] == 0 else "WARNING")
+        
+        summary["hedging"] = hedge_budget.stats()
+        if summary["hedging"]["hedges"]:
+            logger.info(f"Hedged {summary['hedging']['hedges']} of {summary['hedging']['requests']} requests "
+                        f"({summary['hedging']['hedge_wins']} hedges finished first)")
+        
+        summary["rate_limits"] = rate_limiter_stats()
+        for name, stats in summary["rate_limits"].items():
+            logger.info(f"Rate limiter {name}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                        f"waited {stats['total_wait']:.1f}s (max {stats['max_wait']:.1f}s)")
+        
+        return summary
         
     except Exception as e:
         logger = logging.getLogger("VideoProcessor")
@@ -411,4 +700,40 @@ def process_videos_multithreaded(video_paths, output_dir, terminal_output_func=N
             logger.error(f"Error in multi-threaded processing: {str(e)}")
             logger.error(traceback.format_exc())
         
-        return False
+        return {
+            "total": len(video_paths),
+            "succeeded": 0,
+            "failed": len(video_paths),
+            "duration": 0,
+            "results": [],
+            "error": str(e)
+        }
+
+def resume_jobs(terminal_output_func=None, max_workers=None):
+    """
+    Process every unfinished job in the job store: queued videos, videos whose
+    worker died (expired lease) and failed videos with attempts left
+    (jobs.max_attempts). Transcription resumes after the last completed chunk.
+    
+    Returns:
+        dict: Combined summary of the resumed batches
+    """
+    config = load_config()
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "duration": 0, "results": []}
+    store = get_job_store(config)
+    if store is None:
+        return summary
+    
+    # Batches share an output directory
+    batches = {}
+    for job in store.next_jobs(config.get("jobs", {}).get("max_attempts", 3), pipeline=LOCAL_PIPELINE):
+        batches.setdefault(job["output_dir"], []).append(job["video_path"])
+    if terminal_output_func:
+        terminal_output_func(f"Resuming {sum(len(paths) for paths in batches.values())} unfinished jobs")
+    
+    for output_dir, video_paths in batches.items():
+        batch = process_videos_multithreaded(video_paths, output_dir, terminal_output_func, max_workers)
+        for key in ("total", "succeeded", "failed", "duration"):
+            summary[key] += batch[key]
+        summary["results"].extend(batch["results"])
+    return summary
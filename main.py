@@ -6,6 +6,7 @@ It extracts audio, transcribes it, and uses AI to generate content for various p
 """
 import os
 import sys
+import multiprocessing
 
 # Add the current directory to the path to ensure all modules are importable
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -32,4 +33,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Needed for transcription worker processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
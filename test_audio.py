@@ -0,0 +1,357 @@
+import unittest
+import os
+import shutil
+import io
+import struct
+import subprocess
+import sys
+import tempfile
+import wave
+from unittest import mock
+
+import numpy as np
+
+from core.audio import (SAMPLE_RATE, SpanChunks, WavChunker, array_reader, extract_audio_file_parallel,
+                        extraction_ranges, load_audio_array_parallel, read_wav_header)
+from core.vad import plan_speech_chunks
+from core.stitching import fixed_chunk_spans, stitch_segments, to_source_time
+from core.audio_encoding import ENCODING_PROFILES, chunk_seconds, encode_chunks, get_encoding_profile
+from core.transcript_cache import transcript_cache_key
+from core.media_extraction import add_thumbnails, extract_media, parse_scene_metadata, single_pass_command
+
+
+def write_float_wav(path, samples, sample_rate=SAMPLE_RATE):
+    """Write mono float32 samples as an IEEE float WAV file"""
+    data = samples.astype("<f4").tobytes()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sI4s", b"RIFF", 36 + len(data), b"WAVE"))
+        f.write(struct.pack("<4sIHHIIHH", b"fmt ", 16, 3, 1, sample_rate, sample_rate * 4, 4, 32))
+        f.write(struct.pack("<4sI", b"data", len(data)))
+        f.write(data)
+
+
+class TestWavChunker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_float_wav_chunks_are_views(self):
+        """16 kHz mono float32 chunks come straight from the memory map"""
+        samples = np.linspace(-1, 1, SAMPLE_RATE * 65, dtype=np.float32)
+        wav_path = os.path.join(self.temp_dir, "audio.wav")
+        write_float_wav(wav_path, samples)
+
+        chunker = WavChunker(wav_path, chunk_seconds=30)
+        chunks = list(chunker)
+        self.assertEqual(len(chunker), 3)
+        self.assertEqual([len(c) for c in chunks], [SAMPLE_RATE * 30, SAMPLE_RATE * 30, SAMPLE_RATE * 5])
+        self.assertIsNotNone(chunks[0].base)
+        np.testing.assert_array_equal(np.concatenate(chunks), samples)
+
+    def test_int16_stereo_wav_is_converted(self):
+        """Other PCM layouts are converted to 16 kHz mono float32 per chunk"""
+        wav_path = os.path.join(self.temp_dir, "stereo.wav")
+        frames = np.full((44100 * 2, 2), 16384, dtype=np.int16)
+        with wave.open(wav_path, "wb") as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(44100)
+            w.writeframes(frames.tobytes())
+
+        header = read_wav_header(wav_path)
+        self.assertEqual(header["frames"], 44100 * 2)
+
+        chunks = list(WavChunker(wav_path, chunk_seconds=1))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(chunks[0].dtype, np.float32)
+        self.assertEqual(len(chunks[0]), SAMPLE_RATE)
+        self.assertAlmostEqual(float(chunks[0].mean()), 0.5, places=3)
+
+
+class TestAudioSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def processor(self, duration, processing=None):
+        from core.video_processor import VideoProcessor
+
+        config = {"jobs": {"enabled": False}, "processing": processing or {}}
+        info = None if duration is None else {"valid": True, "duration": duration, "audio": {}, "video": None}
+        with mock.patch("core.video_processor.load_config", return_value=config):
+            processor = VideoProcessor(os.path.join(self.temp_dir, "talk.mp4"), self.temp_dir)
+        return processor, mock.patch("core.video_processor.probe", return_value=info)
+
+    def test_long_videos_are_memory_mapped(self):
+        """Only videos up to in_memory_audio_max_seconds are decoded into memory"""
+        for duration, processing, expected in [
+            (600, None, True), (7200, None, False), (None, None, False),
+            (7200, {"in_memory_audio_max_seconds": 0}, True), (600, {"in_memory_audio": False}, False),
+        ]:
+            processor, probed = self.processor(duration, processing)
+            with probed:
+                self.assertEqual(processor._in_memory_audio(), expected, (duration, processing))
+
+    def test_long_video_chunks_come_from_the_audio_file(self):
+        samples = np.zeros(SAMPLE_RATE * 5, dtype=np.float32)
+        processor, probed = self.processor(7200, {"vad": False, "chunk_size": 2, "overlap": 0})
+        write_float_wav(processor.audio_path, samples)
+        with probed, mock.patch.object(processor, "_extract_audio_in_memory") as in_memory, \
+                mock.patch.object(processor, "_extract_audio") as extract:
+            chunks = processor._prepare_chunks()
+        in_memory.assert_not_called()
+        extract.assert_called_once()
+        self.assertEqual(len(chunks), 3)
+
+
+class TestVoiceActivityDetection(unittest.TestCase):
+    def setUp(self):
+        # 20s tone, 10s silence, 20s tone
+        rng = np.random.default_rng(0)
+        t = np.arange(SAMPLE_RATE * 20) / SAMPLE_RATE
+        tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        silence = (rng.standard_normal(SAMPLE_RATE * 10) * 1e-4).astype(np.float32)
+        self.samples = np.concatenate([tone, silence, tone])
+
+    def test_long_silence_is_skipped(self):
+        """Silent stretches are reported and never end up in a chunk"""
+        chunks, skipped = plan_speech_chunks([self.samples], target_seconds=30)
+        self.assertAlmostEqual(skipped, 10, delta=0.5)
+        for spans in chunks:
+            for start, end in spans:
+                self.assertFalse(20.5 < start < 29.5 or 20.5 < end < 29.5)
+
+        total = sum(len(c) for c in SpanChunks(array_reader(self.samples), chunks))
+        self.assertAlmostEqual(total / SAMPLE_RATE, 40, delta=0.5)
+
+    def test_chunks_respect_target_length(self):
+        """Long speech regions are cut so no chunk exceeds the target"""
+        chunks, _ = plan_speech_chunks([self.samples], target_seconds=8)
+        self.assertGreater(len(chunks), 4)
+        for spans in chunks:
+            self.assertLessEqual(sum(end - start for start, end in spans), 8.01)
+
+
+class TestTranscriptStitching(unittest.TestCase):
+    def test_fixed_spans_overlap(self):
+        """Fixed chunks step by chunk_size - overlap and end at the duration"""
+        spans = fixed_chunk_spans(1250, 600, 30)
+        self.assertEqual(spans, [[(0.0, 600.0)], [(570.0, 1170.0)], [(1140.0, 1250)]])
+
+    def test_overlap_is_clamped_to_half_the_chunk(self):
+        """An overlap as long as the chunk steps by half a chunk instead of one second"""
+        with self.assertLogs("VideoProcessor", "WARNING"):
+            spans = fixed_chunk_spans(100, 40, 60)
+        self.assertEqual(spans, [[(0.0, 40.0)], [(20.0, 60.0)], [(40.0, 80.0)], [(60.0, 100)]])
+        with self.assertRaises(ValueError):
+            fixed_chunk_spans(100, 0, 0)
+
+    def test_overlap_is_deduplicated(self):
+        """Segments heard by both chunks appear once in the transcript"""
+        first = ([(0.0, 20.0)], [
+            {"start": 0.0, "end": 8.0, "text": " one two"},
+            {"start": 8.0, "end": 16.0, "text": " three four"},
+            {"start": 16.0, "end": 20.0, "text": " fi"},
+        ])
+        second = ([(10.0, 30.0)], [
+            {"start": 0.0, "end": 6.0, "text": " four"},
+            {"start": 6.0, "end": 12.0, "text": " five six"},
+            {"start": 12.0, "end": 20.0, "text": " seven"},
+        ])
+        self.assertEqual(stitch_segments([first, second]), "one two three four five six seven")
+
+    def test_skipped_silence_maps_to_source_time(self):
+        """Chunks that skip silence are mapped back onto the source timeline"""
+        spans = [(0.0, 5.0), (15.0, 20.0)]
+        self.assertEqual(to_source_time(3.0, spans), 3.0)
+        self.assertEqual(to_source_time(6.0, spans), 16.0)
+
+
+class TestChunkEncoding(unittest.TestCase):
+    def test_chunks_fill_the_upload_limit(self):
+        """Chunk length follows the bitrate and stays under the upload limit"""
+        for profile in ENCODING_PROFILES.values():
+            seconds = chunk_seconds(profile, upload_limit_mb=25)
+            size = seconds * profile["bitrate_kbps"] * 1000 / 8
+            self.assertLessEqual(size, 25 * 1024 * 1024)
+            self.assertGreater(size, 0.85 * 25 * 1024 * 1024)
+        # Opus chunks are far longer than uncompressed ones
+        self.assertGreater(chunk_seconds(ENCODING_PROFILES["opus"]), 10 * chunk_seconds(ENCODING_PROFILES["wav"]))
+
+    def test_max_chunk_seconds_and_profile_lookup(self):
+        self.assertEqual(chunk_seconds(ENCODING_PROFILES["opus"], max_chunk_seconds=600), 600)
+        self.assertEqual(get_encoding_profile({"whisper_api": {"encoding": "flac"}})[0], "flac")
+        self.assertEqual(get_encoding_profile({"whisper_api": {"encoding": "mp9"}})[0], "opus")
+
+    def test_encodes_are_bit_exact(self):
+        """Chunks are encoded without random stream serials or metadata"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        with mock.patch("core.audio_encoding.subprocess.run") as run:
+            encode_chunks("audio.wav", temp_dir, ENCODING_PROFILES["opus"], 600)
+        command = run.call_args[0][0]
+        for option, value in (("-fflags", "+bitexact"), ("-flags:a", "+bitexact"), ("-map_metadata", "-1")):
+            self.assertEqual(command[command.index(option) + 1], value)
+
+    @unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+    def test_cache_key_is_stable_across_encodes(self):
+        """Encoding the same audio twice gives chunks with the same transcript cache keys"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        wav_path = os.path.join(temp_dir, "audio.wav")
+        write_float_wav(wav_path, np.sin(np.arange(SAMPLE_RATE * 5) / 10).astype(np.float32) * 0.5)
+
+        keys = []
+        for run in ("first", "second"):
+            output_dir = os.path.join(temp_dir, run)
+            os.makedirs(output_dir)
+            chunk_keys = []
+            for path in encode_chunks(wav_path, output_dir, ENCODING_PROFILES["opus"], 2):
+                with open(path, "rb") as f:
+                    chunk_keys.append(transcript_cache_key(f.read(), "whisper-1", None))
+            keys.append(chunk_keys)
+        self.assertEqual(len(keys[0]), 3)
+        self.assertEqual(keys[0], keys[1])
+
+
+class FakeRangeDecoder:
+    """Stands in for ffmpeg, decoding -ss/-t ranges of a known signal"""
+
+    def __init__(self, signal, extra_samples=3):
+        self.signal = signal
+        self.extra_samples = extra_samples
+        self.commands = []
+
+    def decode(self, command):
+        self.commands.append(command)
+        start = int(float(command[command.index("-ss") + 1]) * SAMPLE_RATE)
+        end = len(self.signal)
+        if "-t" in command:
+            # Real decodes can run a few samples past the requested length
+            end = start + int(float(command[command.index("-t") + 1]) * SAMPLE_RATE) + self.extra_samples
+        return self.signal[start:end].astype("<f4").tobytes()
+
+    def popen(self, command, **kwargs):
+        process = mock.Mock(stdout=io.BytesIO(self.decode(command)), stderr=io.BytesIO(b""))
+        process.wait.return_value = 0
+        return process
+
+    def run(self, command, **kwargs):
+        with open(command[-1], "wb") as f:
+            f.write(self.decode(command))
+        return subprocess.CompletedProcess(command, 0, stdout=b"", stderr=b"")
+
+
+class TestParallelExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.duration = 250.5
+        self.signal = np.random.default_rng(0).uniform(-1, 1, int(self.duration * SAMPLE_RATE)).astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_ranges_cover_the_recording(self):
+        ranges = extraction_ranges(14400, 4)
+        self.assertEqual(ranges, [(0, 3600), (3600, 3600), (7200, 3600), (10800, None)])
+        self.assertEqual(extraction_ranges(250.5, 4, min_segment_seconds=100), [(0, 126), (126, None)])
+        self.assertEqual(extraction_ranges(30, 4), [(0, None)])
+
+    def test_ranges_join_without_gaps_or_overlap(self):
+        decoder = FakeRangeDecoder(self.signal)
+        with mock.patch("core.audio.subprocess.Popen", side_effect=decoder.popen):
+            samples = load_audio_array_parallel("video.mp4", self.duration, segments=4)
+        self.assertEqual(len(decoder.commands), 4)
+        np.testing.assert_array_equal(samples, self.signal)
+
+    def test_last_range_longer_than_probed(self):
+        """Audio past the probed duration is kept"""
+        decoder = FakeRangeDecoder(self.signal)
+        with mock.patch("core.audio.subprocess.Popen", side_effect=decoder.popen):
+            samples = load_audio_array_parallel("video.mp4", self.duration - 5, segments=4)
+        np.testing.assert_array_equal(samples, self.signal)
+
+    def test_noisy_failing_decode_does_not_hang(self):
+        """A decode that logs more than a pipe holds still fails with its error"""
+        script = ("import sys; sys.stderr.write('corrupt frame\\n' * 50000); "
+                  "sys.stdout.buffer.write(bytes(4000)); sys.exit(1)")
+        with mock.patch("core.audio._range_command", return_value=[sys.executable, "-c", script]):
+            with self.assertRaisesRegex(RuntimeError, "corrupt frame"):
+                load_audio_array_parallel("video.mp4", self.duration, segments=2)
+
+    def test_file_extraction_matches_the_signal(self):
+        decoder = FakeRangeDecoder(self.signal)
+        wav_path = os.path.join(self.temp_dir, "audio.wav")
+        with mock.patch("core.audio.subprocess.run", side_effect=decoder.run):
+            frames = extract_audio_file_parallel("video.mp4", wav_path, self.duration, segments=3)
+        self.assertEqual(frames, len(self.signal))
+        self.assertEqual(os.listdir(self.temp_dir), ["audio.wav"])
+        chunker = WavChunker(wav_path)
+        np.testing.assert_array_equal(chunker.read(0, self.duration), self.signal)
+
+
+SCENE_METADATA = """frame:0    pts:3003    pts_time:3.003
+lavfi.scene_score=0.612000
+frame:1    pts:99099   pts_time:99.099
+lavfi.scene_score=0.451000
+"""
+
+
+class TestSinglePassExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.samples = np.linspace(-1, 1, SAMPLE_RATE * 3, dtype=np.float32)
+        self.commands = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def fake_ffmpeg(self, command, cwd=None, **kwargs):
+        """Write what the mapped outputs of the single pass would produce"""
+        self.commands.append(command)
+        vf = command[command.index("-vf") + 1]
+        with open(os.path.join(cwd, vf.rsplit("file=", 1)[1]), "w") as f:
+            f.write(SCENE_METADATA)
+        with open(command[command.index("-progress") + 1], "w") as f:
+            f.write("frame=2\nout_time=00:00:03.000000\nspeed=41.5x\nprogress=end\n")
+        for i in (1, 2):
+            with open(command[-1] % i, "wb") as f:
+                f.write(b"\xff\xd8")
+        return subprocess.CompletedProcess(command, 0, stdout=self.samples.tobytes(), stderr=b"")
+
+    def test_command_maps_every_output_from_one_input(self):
+        command = single_pass_command("in.mp4", "-", "kf/scene_%03d.jpg", "scenes.txt", "progress.txt")
+        self.assertEqual(command.count("-i"), 1)
+        self.assertEqual([command[i + 1] for i, arg in enumerate(command) if arg == "-map"], ["0:a:0", "0:v:0"])
+        self.assertIn("-skip_frame:v", command)
+        # -fps_mode needs ffmpeg 5.1
+        self.assertNotIn("-fps_mode", command)
+        self.assertNotIn("0:a:0", single_pass_command("in.mp4", None, "kf/%03d.jpg", "s.txt", "p.txt"))
+
+    def test_scene_metadata(self):
+        self.assertEqual(parse_scene_metadata(SCENE_METADATA),
+                         [{"time": 3.003, "score": 0.612}, {"time": 99.099, "score": 0.451}])
+
+    def test_audio_keyframes_and_stats_from_one_run(self):
+        with mock.patch("core.media_extraction.subprocess.run", side_effect=self.fake_ffmpeg):
+            samples, stats = extract_media("video.mp4", self.temp_dir, {})
+        self.assertEqual(len(self.commands), 1)
+        np.testing.assert_array_equal(samples, self.samples)
+        self.assertEqual(stats["audio_seconds"], 3)
+        self.assertEqual([(k["file"], k["time"]) for k in stats["keyframes"]],
+                         [(os.path.join("keyframes", "scene_001.jpg"), 3.003),
+                          (os.path.join("keyframes", "scene_002.jpg"), 99.099)])
+        self.assertEqual(stats["ffmpeg"]["speed"], "41.5x")
+        # Only the artifacts are left behind
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["extraction_stats.json", "keyframes"])
+
+        content = add_thumbnails({"youtube_title": "Title"}, self.temp_dir)
+        self.assertEqual(content["youtube_thumbnails"][1]["time"], 99.099)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,291 @@
+import os
+import shutil
+import tempfile
+import time
+import json
+import unittest
+import subprocess
+import threading
+from unittest import mock
+
+import numpy as np
+
+from utils.disk_cache import DiskCache
+from core.transcript_cache import transcript_cache_key
+from core.llm_cache import cached_completion
+from utils.state_journal import StateJournal
+from utils import media_probe
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_and_set(self):
+        """Stored values round-trip and lookups are counted"""
+        cache = DiskCache(self.directory)
+        self.assertIsNone(cache.get("missing"))
+        cache.set("abc123", [{"start": 0.0, "end": 1.5, "text": "hello"}])
+        self.assertEqual(cache.get("abc123")[0]["text"], "hello")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Going over the size limit removes the oldest entries first"""
+        cache = DiskCache(self.directory, max_size_mb=0.01)
+        payload = "x" * 3000
+        for i, key in enumerate(["aa1", "bb2", "cc3"]):
+            cache.set(key, payload)
+            # Make modification times strictly increasing
+            os.utime(cache._path(key), (time.time() + i, time.time() + i))
+        cache.set("dd4", payload)
+
+        self.assertIsNone(cache.get("aa1"))
+        self.assertIsNotNone(cache.get("dd4"))
+        self.assertLessEqual(cache.stats()["size_bytes"], cache.max_size_bytes)
+
+    def test_ttl_expires_entries(self):
+        """Entries older than the TTL are treated as misses"""
+        cache = DiskCache(self.directory, ttl_seconds=0)
+        cache.set("abc123", "value")
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("abc123"))
+
+    def test_transcript_key_depends_on_audio_and_model(self):
+        """The same samples give the same key; other samples or models do not"""
+        samples = np.linspace(-1, 1, 1600, dtype=np.float32)
+        key = transcript_cache_key(samples, "base", "en")
+        self.assertEqual(key, transcript_cache_key(samples.copy(), "base", "en"))
+        self.assertNotEqual(key, transcript_cache_key(samples[::-1], "base", "en"))
+        self.assertNotEqual(key, transcript_cache_key(samples, "small", "en"))
+        # Arrays are hashed in place but key the same as their bytes
+        self.assertEqual(key, transcript_cache_key(samples.tobytes(), "base", "en"))
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.config = {"cache": {"directory": tempfile.mkdtemp()}}
+
+    def tearDown(self):
+        shutil.rmtree(self.config["cache"]["directory"], ignore_errors=True)
+
+    def test_identical_requests_are_served_from_cache(self):
+        """Only the first identical request, bypassed ones and changed ones reach the API"""
+        calls = []
+
+        def call():
+            calls.append(1)
+            return f"response {len(calls)}"
+
+        request = ("openai", "gpt-4o", "system", "user prompt", 0.7, 1000)
+        self.assertEqual(cached_completion(self.config, call, *request), "response 1")
+        self.assertEqual(cached_completion(self.config, call, *request), "response 1")
+        self.assertEqual(cached_completion(self.config, call, *request, bypass=True), "response 2")
+        self.assertEqual(cached_completion(self.config, call, *request), "response 2")
+        self.assertEqual(cached_completion(self.config, call, "openai", "gpt-4o", "system", "user prompt", 0.2, 1000),
+                         "response 3")
+
+    def test_empty_responses_are_not_cached(self):
+        """A failed (empty) response is requested again next time"""
+        responses = iter(["", "content"])
+        request = ("anthropic", "o1", "system", "user prompt", 0.7, 1000)
+        self.assertEqual(cached_completion(self.config, lambda: next(responses), *request), "")
+        self.assertEqual(cached_completion(self.config, lambda: next(responses), *request), "content")
+
+
+class TestStateJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "processing_state.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_updates_are_appended_and_replayed(self):
+        journal = StateJournal(self.path, fsync=False)
+        journal.update({"audio_extracted": True})
+        journal.update({"transcript_chunk_0": "Hello"})
+        journal.update({"transcript_chunk_0": "Hello again", "chunk_count": 2})
+        size = os.path.getsize(self.path)
+        journal.update({"transcript_chunk_1": "world"})
+        journal.close()
+
+        # A checkpoint only appends its own record
+        self.assertLess(os.path.getsize(self.path) - size, 60)
+        self.assertEqual(StateJournal(self.path).load(), {
+            "audio_extracted": True, "transcript_chunk_0": "Hello again",
+            "chunk_count": 2, "transcript_chunk_1": "world"})
+
+    def test_compaction_keeps_the_state(self):
+        """The journal is rewritten as one snapshot once it doubles in size"""
+        journal = StateJournal(self.path, fsync=False, min_compact_bytes=200)
+        for i in range(50):
+            journal.update({"progress": i})
+        journal.close()
+
+        with open(self.path, encoding="utf-8") as f:
+            self.assertLess(len(f.readlines()), 20)
+        self.assertEqual(StateJournal(self.path).load(), {"progress": 49})
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_torn_last_record_is_dropped(self):
+        """A crash in the middle of a write loses only that record"""
+        journal = StateJournal(self.path, fsync=False)
+        journal.update({"audio_extracted": True})
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"set": {"transcript_chunk_0": "Hel')
+
+        journal = StateJournal(self.path, fsync=False)
+        self.assertEqual(journal.load(), {"audio_extracted": True})
+        journal.update({"transcript_chunk_0": "Hello"})
+        journal.close()
+        self.assertEqual(StateJournal(self.path).load(), {"audio_extracted": True, "transcript_chunk_0": "Hello"})
+
+    def test_records_that_are_not_objects_are_skipped(self):
+        """Valid JSON that isn't a record is skipped instead of raising TypeError"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"set": {"audio_extracted": true}}\n"abc"\n123\n{"set": [1]}\n{"set": {"chunk_count": 2}}\n')
+
+        with self.assertLogs("VideoProcessor", "WARNING") as logs:
+            self.assertEqual(StateJournal(self.path).load(), {"audio_extracted": True, "chunk_count": 2})
+        self.assertEqual(len(logs.output), 3)
+        # Nothing is compacted away while there are lines it can't read
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_records_after_an_unreadable_line_are_kept(self):
+        """A corrupt line in the middle doesn't hide the records after it"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"set": {"audio_extracted": true}}\n{"set": {"transcr\x00\n'
+                    '{"set": {"transcript_chunk_0": "Hello"}}\n{"set": {"chunk_count": 2}}\n')
+        with open(self.path, "rb") as f:
+            contents = f.read()
+
+        with self.assertLogs("VideoProcessor", "WARNING"):
+            state = StateJournal(self.path).load()
+        self.assertEqual(state, {"audio_extracted": True, "transcript_chunk_0": "Hello", "chunk_count": 2})
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), contents)
+
+    def test_unreadable_line_and_torn_last_record(self):
+        """New records start on their own line when the torn end can't be compacted away"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"set": {"audio_extracted": true}}\nnot json\n{"set": {"chunk_count": 2}}\n{"set": {"transcr')
+
+        journal = StateJournal(self.path, fsync=False)
+        with self.assertLogs("VideoProcessor", "WARNING"):
+            self.assertEqual(journal.load(), {"audio_extracted": True, "chunk_count": 2})
+        journal.update({"transcript_chunk_0": "Hello"})
+        journal.close()
+
+        with self.assertLogs("VideoProcessor", "WARNING"):
+            state = StateJournal(self.path).load()
+        self.assertEqual(state, {"audio_extracted": True, "chunk_count": 2, "transcript_chunk_0": "Hello"})
+
+
+FFPROBE_OUTPUT = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080, "avg_frame_rate": "30000/1001"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "48000", "channels": 2},
+        {"codec_type": "video", "codec_name": "mjpeg", "disposition": {"attached_pic": 1}},
+    ],
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "123.456", "bit_rate": "5000000"},
+}
+
+
+class TestMediaProbe(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = {"cache": {"directory": os.path.join(self.directory, "cache")}}
+        self.videos = []
+        for name in ("a.mp4", "b.mp4", "c.mp4"):
+            path = os.path.join(self.directory, name)
+            with open(path, "wb") as f:
+                f.write(b"not really a video")
+            self.videos.append(path)
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def fake_ffprobe(self, command, **kwargs):
+        self.calls.append(command[-1])
+        return subprocess.CompletedProcess(command, 0, stdout=json.dumps(FFPROBE_OUTPUT), stderr="")
+
+    def test_summary(self):
+        info = media_probe.summarize_probe(FFPROBE_OUTPUT)
+        self.assertTrue(info["valid"])
+        self.assertAlmostEqual(info["duration"], 123.456)
+        self.assertEqual((info["video"]["codec"], info["video"]["width"], info["video"]["height"]),
+                         ("h264", 1920, 1080))
+        self.assertAlmostEqual(info["video"]["fps"], 29.97, places=2)
+        self.assertEqual(info["audio"]["sample_rate"], 48000)
+        self.assertFalse(media_probe.summarize_probe({"format": {}, "streams": []})["valid"])
+
+    def test_unchanged_files_are_probed_once(self):
+        """Batches are probed with one ffprobe per file; the index answers repeats until a file changes"""
+        with mock.patch("utils.media_probe.subprocess.run", side_effect=self.fake_ffprobe):
+            durations = media_probe.probed_durations(self.videos, self.config)
+            self.assertEqual(sorted(self.calls), sorted(self.videos))
+            self.assertEqual(set(durations.values()), {123.456})
+
+            self.assertEqual(media_probe.probe(self.videos[0], self.config)["duration"], 123.456)
+            self.assertEqual(len(self.calls), 3)
+
+            with open(self.videos[0], "ab") as f:
+                f.write(b" and more")
+            media_probe.probe(self.videos[0], self.config)
+            self.assertEqual(len(self.calls), 4)
+
+    def test_concurrent_probes_share_one_index(self):
+        """Threads probing a batch at once create a single index between them"""
+        created = []
+
+        def slow_index(*args):
+            time.sleep(0.02)
+            created.append(DiskCache(*args))
+            return created[-1]
+
+        config = {"cache": {"directory": os.path.join(self.directory, "fresh_cache")}}
+        barrier = threading.Barrier(8)
+        indexes = []
+
+        def get_index():
+            barrier.wait()
+            indexes.append(media_probe._get_index(config))
+
+        with mock.patch("utils.media_probe.DiskCache", side_effect=slow_index):
+            threads = [threading.Thread(target=get_index) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(created), 1)
+        self.assertEqual({id(index) for index in indexes}, {id(created[0])})
+
+    def test_rejected_files_are_indexed_as_invalid(self):
+        def reject(command, **kwargs):
+            self.calls.append(command[-1])
+            return subprocess.CompletedProcess(command, 1, stdout="", stderr="Invalid data found")
+
+        with mock.patch("utils.media_probe.subprocess.run", side_effect=reject):
+            self.assertFalse(media_probe.probe(self.videos[0], self.config)["valid"])
+            self.assertFalse(media_probe.probe(self.videos[0], self.config)["valid"])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_missing_ffprobe_is_not_indexed(self):
+        with mock.patch("utils.media_probe.subprocess.run", side_effect=FileNotFoundError("ffprobe")):
+            self.assertIsNone(media_probe.probe(self.videos[0], self.config))
+        with mock.patch("utils.media_probe.subprocess.run", side_effect=self.fake_ffprobe):
+            self.assertTrue(media_probe.probe(self.videos[0], self.config)["valid"])
+        self.assertIsNone(media_probe.probe(os.path.join(self.directory, "missing.mp4"), self.config))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,602 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from core.llm_clients import close_llm_clients, get_llm_client
+from core.rate_limiter import RateLimiter, rate_limited_call
+from core.map_reduce import condense_transcript, split_transcript
+from core.tokens import PromptTooLargeError, check_prompt_fits, context_window, count_tokens
+from core.compaction import FAILED_SEGMENT_MARKER, compact_transcript
+from core.regenerate import latest_social_media_json, regenerate_social_content
+from core.platform_content import PLATFORM_PROMPTS, generate_platform_content, parse_field
+from core.remote_transcription import ChunkTranscriptionError, transcribe_chunk_files
+from core.hedging import Cancellation, HedgeBudget, LatencyTracker, RequestCancelled, hedged_call
+from core.llm import complete
+from core.structured_output import (SOCIAL_MEDIA_SCHEMA, IncrementalJSONParser, extract_json_object,
+                                    structured_response, validate_json)
+
+
+class TestLLMClientPool(unittest.TestCase):
+    def tearDown(self):
+        close_llm_clients()
+
+    def test_clients_are_shared_per_provider_and_key(self):
+        """Every thread gets the same client for the same credentials"""
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_llm_client("openai", api_key="sk-one")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIsNot(clients[0], get_llm_client("openai", api_key="sk-two"))
+        self.assertIsNot(clients[0], get_llm_client("anthropic", api_key="sk-one"))
+
+    def test_pool_settings_come_from_config(self):
+        """Timeouts and connection limits are taken from the llm config section"""
+        config = {"llm": {"pool_size": 3, "timeout": 12, "max_retries": 5}}
+        client = get_llm_client("openai", config, api_key="sk-one")
+        # Retries belong to rate_limited_call, so every 429 reaches the rate limiter
+        self.assertEqual(client.max_retries, 0)
+        self.assertEqual(client.timeout.read, 12)
+
+        # Settings the client isn't built with don't replace it
+        toggled = {"llm": dict(config["llm"], per_platform=True, hedge_requests=True, map_reduce=False)}
+        self.assertIs(get_llm_client("openai", toggled, api_key="sk-one"), client)
+
+        # A new client replaces the old one, whose connections are closed
+        with mock.patch.object(client, "close") as close:
+            replacement = get_llm_client("openai", api_key="sk-one")
+        self.assertIsNot(replacement, client)
+        close.assert_called_once()
+
+
+class FakeClock:
+    """Clock whose sleep() just advances time"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after": "7"}
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_per_minute(self):
+        """A burst up to the limit is immediate, then requests are spaced evenly"""
+        clock = FakeClock()
+        limiter = RateLimiter("test", requests_per_minute=60, clock=clock, sleep=clock.sleep)
+        for _ in range(60):
+            self.assertEqual(limiter.acquire(), 0)
+        self.assertAlmostEqual(limiter.acquire(), 1.0)
+        self.assertAlmostEqual(limiter.acquire(), 1.0)
+        self.assertAlmostEqual(clock.now, 2.0)
+        self.assertAlmostEqual(limiter.stats()["max_wait"], 1.0)
+
+    def test_tokens_per_minute(self):
+        """Large requests wait until enough tokens have refilled"""
+        clock = FakeClock()
+        limiter = RateLimiter("test", tokens_per_minute=6000, clock=clock, sleep=clock.sleep)
+        self.assertEqual(limiter.acquire(6000), 0)
+        self.assertAlmostEqual(limiter.acquire(3000), 30.0)
+
+    def test_retry_after_blocks_and_retries(self):
+        """A 429 is retried after its Retry-After delay"""
+        clock = FakeClock()
+        limiter = RateLimiter("openai/test-model", clock=clock, sleep=clock.sleep)
+        attempts = []
+
+        def call():
+            attempts.append(clock.now)
+            if len(attempts) == 1:
+                raise RateLimitError()
+            return "ok"
+
+        from core import rate_limiter
+        rate_limiter._limiters[("openai/test-model", None, None)] = limiter
+        try:
+            self.assertEqual(rate_limited_call({}, "openai", "test-model", call), "ok")
+        finally:
+            del rate_limiter._limiters[("openai/test-model", None, None)]
+        self.assertEqual(attempts, [0.0, 7.0])
+        self.assertEqual(limiter.stats()["throttled"], 1)
+
+    def test_transient_errors_are_retried_up_to_max_retries(self):
+        """Server errors are retried like the SDK used to; client errors are not"""
+        class ServerError(Exception):
+            status_code = 503
+
+        class BadRequest(Exception):
+            status_code = 400
+
+        attempts = []
+
+        def call(error):
+            def run():
+                attempts.append(error)
+                raise error()
+            return run
+
+        with mock.patch("core.rate_limiter.time.sleep"):
+            with self.assertRaises(ServerError):
+                rate_limited_call({"llm": {"max_retries": 2}}, "openai", "retry-model", call(ServerError))
+            self.assertEqual(len(attempts), 3)
+            with self.assertRaises(BadRequest):
+                rate_limited_call({"llm": {"max_retries": 2}}, "openai", "retry-model", call(BadRequest))
+            self.assertEqual(len(attempts), 4)
+
+    def test_cancelled_requests_are_not_sent_again(self):
+        """A cancel during a retry backoff ends it at once, and no attempt follows a cancel"""
+        class ServerError(Exception):
+            status_code = 503
+
+        attempts = []
+        cancel = threading.Event()
+
+        def call():
+            attempts.append(time.monotonic())
+            threading.Timer(0.05, cancel.set).start()
+            raise ServerError()
+
+        started = time.monotonic()
+        with self.assertRaises(RequestCancelled):
+            rate_limited_call({"llm": {"max_retries": 2}}, "openai", "cancel-model", call, retry_delay=10,
+                              cancel=cancel)
+        self.assertEqual(len(attempts), 1)
+        self.assertLess(time.monotonic() - started, 5)
+
+        with self.assertRaises(RequestCancelled):
+            rate_limited_call({}, "openai", "cancel-model", call, cancel=cancel)
+        self.assertEqual(len(attempts), 1)
+
+
+class TestMapReduce(unittest.TestCase):
+    def setUp(self):
+        self.transcript = " ".join(f"This is sentence number {i} of the talk." for i in range(400))
+
+    def test_sections_fit_and_keep_every_sentence(self):
+        """Sections respect the token limit and break between sentences"""
+        sections = split_transcript(self.transcript, 200)
+        self.assertGreater(len(sections), 1)
+        for section in sections:
+            self.assertLessEqual(count_tokens(section), 200)
+            self.assertTrue(section.endswith("."))
+        self.assertEqual(" ".join(sections), self.transcript)
+
+    def test_unpunctuated_text_is_split_by_words(self):
+        """A transcript without sentence breaks is still split"""
+        sections = split_transcript("word " * 2000, 100)
+        self.assertTrue(all(count_tokens(section) <= 100 for section in sections))
+        self.assertEqual(" ".join(sections), ("word " * 2000).strip())
+
+    def test_long_sentences_are_counted_word_by_word(self):
+        """Splitting a long sentence tokenizes each word once, not the growing piece"""
+        with mock.patch("core.map_reduce.count_tokens", wraps=count_tokens) as counted:
+            split_transcript("word " * 2000, 100)
+        self.assertLess(sum(len(call.args[0]) for call in counted.call_args_list), 5 * 10000)
+
+    def test_long_transcripts_are_condensed(self):
+        """Each section is summarized once and the result fits the budget"""
+        calls = []
+        lock = threading.Lock()
+
+        def complete(system_prompt, user_prompt, max_tokens):
+            with lock:
+                calls.append(user_prompt)
+            return "A short summary."
+
+        condensed = condense_transcript(self.transcript, complete, 500, 1000)
+        self.assertEqual(len(calls), len(split_transcript(self.transcript, 1000)))
+        self.assertLessEqual(count_tokens(condensed), 500)
+        self.assertTrue(condensed.startswith("Part 1: A short summary."))
+
+    def test_short_transcripts_are_unchanged(self):
+        """No requests are made for a transcript that already fits"""
+        self.assertEqual(condense_transcript("Short talk.", None, 500, 1000), "Short talk.")
+
+    def test_context_windows(self):
+        """Dated model snapshots use their family's context window"""
+        self.assertEqual(context_window("gpt-4o-2024-08-06"), 128000)
+        self.assertEqual(context_window("gpt-4"), 8192)
+        self.assertEqual(context_window("unknown-model"), 8192)
+
+
+class TestPlatformContent(unittest.TestCase):
+    def test_fields_are_generated_concurrently_and_streamed(self):
+        """Every field gets its own request and streams partial text before its final value"""
+        barrier = threading.Barrier(len(PLATFORM_PROMPTS), timeout=5)
+
+        def fake_complete(config, model, system_prompt, user_prompt, temperature, max_tokens, on_delta=None):
+            barrier.wait()  # Only passes if all fields are in flight at once
+            pieces = ["First post", "\n---\n", "Second post"]
+            for piece in pieces:
+                on_delta(piece)
+            return "".join(pieces)
+
+        updates = []
+        lock = threading.Lock()
+
+        def on_update(field, text, done):
+            with lock:
+                updates.append((field, text, done))
+
+        with mock.patch("core.platform_content.complete", fake_complete):
+            content = generate_platform_content({}, "gpt-4o", "transcript", on_update=on_update)
+
+        self.assertEqual(set(content), set(PLATFORM_PROMPTS))
+        self.assertEqual(content["tweets"], ["First post", "Second post"])
+        self.assertEqual(content["youtube_title"], "First post\n---\nSecond post")
+        title_updates = [update for update in updates if update[0] == "youtube_title"]
+        self.assertEqual(title_updates[0], ("youtube_title", "First post", False))
+        self.assertTrue(title_updates[-1][2])
+
+    def test_parse_list_fields(self):
+        """List fields split on separator lines and drop empty items"""
+        self.assertEqual(parse_field("one\n---\n\n---\ntwo\nlines\n", True), ["one", "two\nlines"])
+        self.assertEqual(parse_field("  a title \n", False), "a title")
+
+
+class TestHedging(unittest.TestCase):
+    def test_fast_requests_are_not_hedged(self):
+        """A request that finishes before the deadline never starts a hedge"""
+        hedged = []
+        result = hedged_call(lambda cancel: "fast", lambda cancel: hedged.append(1), 1.0)
+        self.assertEqual(result, "fast")
+        self.assertEqual(hedged, [])
+
+    def test_slow_request_loses_to_hedge_and_is_cancelled(self):
+        """The hedge wins and the straggler is told to stop"""
+        cancelled = threading.Event()
+
+        def slow(cancel):
+            if cancel.wait(5):
+                cancelled.set()
+                raise RequestCancelled()
+            return "slow"
+
+        budget = HedgeBudget(ratio=0)
+        self.assertEqual(hedged_call(slow, lambda cancel: "hedge", 0.05, budget), "hedge")
+        self.assertTrue(cancelled.wait(1))
+        self.assertEqual(budget.stats(), {"requests": 1, "hedges": 1, "hedge_wins": 1})
+
+    def test_invalid_result_waits_for_the_other(self):
+        """A finished but invalid response doesn't win the race"""
+        release = threading.Event()
+
+        def primary(cancel):
+            release.wait(5)
+            return '{"youtube_title": "ok"}'
+
+        def hedge(cancel):
+            release.set()
+            return "not json"
+
+        result = hedged_call(primary, hedge, 0.05, validate=lambda text: text.startswith("{"))
+        self.assertEqual(result, '{"youtube_title": "ok"}')
+
+    def test_budget_limits_hedges(self):
+        """Without budget left the slow request is simply awaited"""
+        budget = HedgeBudget(ratio=0)
+        budget.try_spend()
+
+        def slow(cancel):
+            time.sleep(0.1)
+            return "slow"
+
+        self.assertEqual(hedged_call(slow, lambda cancel: "hedge", 0.01, budget), "slow")
+        self.assertEqual(budget.stats()["hedges"], 1)
+
+    def test_losing_response_is_closed_by_the_winner(self):
+        """A stalled loser's response is closed without waiting for it to read anything"""
+        closed = threading.Event()
+
+        def stalled(cancel):
+            cancel.on_cancel(closed.set)
+            closed.wait(5)  # A read that only a close interrupts
+            raise RequestCancelled()
+
+        self.assertEqual(hedged_call(stalled, lambda cancel: "hedge", 0.05), "hedge")
+        self.assertTrue(closed.is_set())
+
+    def test_cancellable_requests_are_not_streamed(self):
+        """A request with a cancel event but no on_delta is sent without stream=True"""
+        client = mock.MagicMock()
+        raw = client.chat.completions.with_streaming_response.create.return_value.__enter__.return_value
+        raw.parse.return_value.choices[0].message.content = "answer"
+        config = {"cache": {"llm_responses": False}}
+        with mock.patch("core.llm.get_llm_client", return_value=client):
+            self.assertEqual(complete(config, "gpt-4o", "system", "user", cancel=Cancellation()), "answer")
+
+        arguments = client.chat.completions.with_streaming_response.create.call_args.kwargs
+        self.assertNotIn("stream", arguments)
+        client.chat.completions.create.assert_not_called()
+
+        # Cancelling closes the response being read and stops the request
+        cancel = Cancellation()
+
+        def parse():
+            cancel.set()  # The winner finishes while this body is being read
+            raw.close.assert_called_once()
+            raise ConnectionError("response closed")
+
+        raw.parse.side_effect = parse
+        raw.close.reset_mock()
+        with mock.patch("core.llm.get_llm_client", return_value=client), \
+                mock.patch("core.llm.latency_tracker") as tracker:
+            with self.assertRaises(RequestCancelled):
+                complete(config, "gpt-4o", "system", "user", cancel=cancel)
+        # The straggler's time so far still counts towards the latency percentile
+        tracker.record.assert_called_once()
+        self.assertEqual(tracker.record.call_args.args[0], "gpt-4o")
+
+    def test_latency_percentile(self):
+        """Percentiles need a few samples first"""
+        tracker = LatencyTracker()
+        tracker.record("gpt-4", 1.0)
+        self.assertIsNone(tracker.percentile("gpt-4", 95))
+        for seconds in range(2, 21):
+            tracker.record("gpt-4", float(seconds))
+        self.assertEqual(tracker.percentile("gpt-4", 95), 19.0)
+        self.assertEqual(tracker.percentile("gpt-4", 50), 11.0)
+
+
+class TestCompaction(unittest.TestCase):
+    def test_fillers_stutters_and_markers_are_removed(self):
+        """Disfluencies and failed-chunk markers are dropped, content words are kept"""
+        text = (f"Um, so I I I think that the, uh, results are good, you know. {FAILED_SEGMENT_MARKER} "
+                "The umbrella, you know, helped.")
+        self.assertEqual(compact_transcript(text),
+                         "So I think that the, results are good. The umbrella, helped.")
+
+    def test_words_that_look_like_fillers_are_kept(self):
+        """Doubled words, content uses of like/so and "you know" as a verb survive compaction"""
+        text = ("He had had enough. I said that that was fine. I like it so much. "
+                "Do you know what I mean? Mhm, you know what, I agree.")
+        self.assertEqual(compact_transcript(text), text)
+
+    def test_duplicate_sentences_are_removed(self):
+        """Long sentences are deduplicated anywhere, short ones only back to back"""
+        long_sentence = "Subscribe to the channel for more videos like this one."
+        text = f"Thank you. Thank you. {long_sentence} Great point. Thank you. {long_sentence}"
+        self.assertEqual(compact_transcript(text), f"Thank you. {long_sentence} Great point. Thank you.")
+
+    def test_preflight_rejects_prompts_that_cannot_fit(self):
+        """Prompts are counted locally and oversized ones raise before any request"""
+        self.assertGreater(check_prompt_fits("gpt-4", "A short prompt.", 1000), 0)
+        with self.assertRaises(PromptTooLargeError):
+            check_prompt_fits("gpt-4", "word " * 40000, 1000)
+
+    def test_token_estimate_when_tiktoken_fails(self):
+        """A tiktoken that can't load its encoding falls back to the conservative estimate"""
+        from core import tokens
+        failing = mock.Mock()
+        failing.encoding_for_model.side_effect = OSError("network unreachable")
+        tokens._encoding.cache_clear()
+        try:
+            with mock.patch.dict("sys.modules", {"tiktoken": failing}):
+                self.assertEqual(count_tokens("x" * 300, "gpt-4o"), 101)
+        finally:
+            tokens._encoding.cache_clear()
+
+
+class TestRegenerate(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        for name, transcript in [("talk_one", "First talk."), ("talk_two", "Second talk."), ("no_transcript", None)]:
+            os.makedirs(os.path.join(self.output_dir, name))
+            if transcript:
+                with open(os.path.join(self.output_dir, name, "transcript.txt"), "w", encoding="utf-8") as f:
+                    f.write(transcript)
+        with open(os.path.join(self.output_dir, "talk_one", "social_media.json"), "w", encoding="utf-8") as f:
+            json.dump({"title": "old"}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_regenerates_from_saved_transcripts(self):
+        """Only the LLM stage runs, with the given prompts, and old results are kept"""
+        seen = []
+
+        def fake_generate(config, transcript, prompts, name, log):
+            seen.append((transcript, prompts["content_generation_prompt"]))
+            return json.dumps({"title": f"new {transcript}"})
+
+        prompts = {"system_prompt": "system", "content_generation_prompt": "New prompt: {transcript}"}
+        with mock.patch("core.regenerate.generate_social_media_content", fake_generate):
+            summary = regenerate_social_content(self.output_dir, prompts, max_workers=2)
+
+        self.assertEqual((summary["total"], summary["succeeded"]), (2, 2))
+        self.assertEqual(sorted(seen), [("First talk.", "New prompt: {transcript}"),
+                                        ("Second talk.", "New prompt: {transcript}")])
+
+        folder = os.path.join(self.output_dir, "talk_one")
+        with open(os.path.join(folder, "social_media.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"title": "old"})
+        latest = latest_social_media_json(folder)
+        self.assertRegex(os.path.basename(latest), r"^social_media\.\d{8}_\d{6}\.json$")
+        with open(latest, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"title": "new First talk."})
+
+VALID_CONTENT = {
+    "youtube_title": "Title",
+    "youtube_description": "About #video",
+    "tweets": ["one", "two", "three"],
+    "linkedin_post": "Post",
+    "clip_suggestions": [{"start": "00:10", "description": "Intro"}],
+}
+
+
+class TestStructuredOutput(unittest.TestCase):
+    def test_fields_are_reported_as_they_complete(self):
+        """Streamed text in any split reports each top-level field once, in order"""
+        text = "```json\n" + json.dumps(VALID_CONTENT) + "\n```"
+        for size in (1, 7, len(text)):
+            fields = []
+            parser = IncrementalJSONParser(lambda key, value: fields.append((key, value)))
+            for i in range(0, len(text), size):
+                parser.feed(text[i:i + size])
+            self.assertEqual(fields, list(VALID_CONTENT.items()))
+
+    def test_partial_string_values(self):
+        """The string being received is available before it is complete"""
+        parser = IncrementalJSONParser()
+        parser.feed('{"youtube_title": "Hello \\"wor')
+        self.assertEqual(parser.partial_value(), ("youtube_title", 'Hello "wor'))
+        parser.feed('ld\\"", "tweets": [')
+        self.assertIsNone(parser.partial_value())
+        self.assertEqual(parser.fields, {"youtube_title": 'Hello "world"'})
+
+    def test_schema_validation(self):
+        self.assertEqual(validate_json(VALID_CONTENT, SOCIAL_MEDIA_SCHEMA), [])
+        errors = validate_json({"youtube_title": 1, "tweets": ["one", 2]}, SOCIAL_MEDIA_SCHEMA)
+        self.assertIn("$.youtube_title should be of type string, not int", errors)
+        self.assertIn("$.tweets[1] should be of type string, not int", errors)
+        self.assertIn('$ is missing required field "linkedin_post"', errors)
+
+    def test_json_is_extracted_from_code_fences(self):
+        self.assertEqual(extract_json_object('Here you go:\n```json\n{"a": 1}\n```'), {"a": 1})
+        self.assertIsNone(extract_json_object("no json here"))
+
+    def test_invalid_response_is_repaired_once(self):
+        """Invalid output gets one repair request containing the errors, not the transcript"""
+        requests = []
+
+        def fake_complete(config, model, system_prompt, user_prompt, **kwargs):
+            requests.append((user_prompt, kwargs))
+            return json.dumps(VALID_CONTENT)
+
+        broken = json.dumps({**VALID_CONTENT, "tweets": "one two three"})
+        with mock.patch("core.structured_output.complete", fake_complete):
+            content = structured_response({}, "gpt-4o", broken)
+            self.assertEqual(json.loads(content), VALID_CONTENT)
+            self.assertEqual(len(requests), 1)
+            self.assertIn("$.tweets should be of type array", requests[0][0])
+            self.assertTrue(requests[0][1]["json_mode"])
+
+            # Valid responses are not sent again
+            structured_response({}, "gpt-4o", json.dumps(VALID_CONTENT))
+            self.assertEqual(len(requests), 1)
+
+
+class StubTranscriptionHandler(BaseHTTPRequestHandler):
+    """Mimics POST /v1/audio/transcriptions, answering with the uploaded file's name"""
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        name = re.search(rb'filename="([^"]+)"', body).group(1).decode()
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.requests.append(name)
+            fail = server.failures.get(name, 0)
+            server.failures[name] = max(0, fail - 1)
+        time.sleep(0.2)
+        with server.lock:
+            server.active -= 1
+
+        status, payload = (500, {"error": {"message": "server error"}}) if fail else (200, {"text": f"Text of {name}."})
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTranscriptionServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops some of the concurrent connects, whose retry takes a second
+    request_queue_size = 32
+
+
+class TestRemoteTranscription(unittest.TestCase):
+    def setUp(self):
+        self.server = StubTranscriptionServer(("127.0.0.1", 0), StubTranscriptionHandler)
+        self.server.lock = threading.Lock()
+        self.server.active = self.server.peak = 0
+        self.server.requests = []
+        self.server.failures = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(8):
+            path = os.path.join(self.directory, f"chunk_{i}.wav")
+            with open(path, "wb") as f:
+                f.write(os.urandom(64))
+            self.paths.append(path)
+        self.config = {
+            "llm": {"openai_base_url": f"http://127.0.0.1:{self.server.server_address[1]}/v1", "max_retries": 5},
+            "whisper_api": {"max_concurrency": 8, "retries": 2, "retry_delay": 0.01},
+            "cache": {"transcripts": False},
+        }
+        self.environment = mock.patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test"})
+        self.environment.start()
+
+    def tearDown(self):
+        self.environment.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        close_llm_clients()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_chunks_are_uploaded_concurrently_and_kept_in_order(self):
+        """Failed chunks are retried on their own and the texts stay in chunk order"""
+        self.server.failures = {"chunk_3.wav": 1}
+        reported = []
+        started = time.time()
+        stats = {}
+        texts = transcribe_chunk_files(self.config, self.paths, on_chunk=lambda i, text: reported.append(i),
+                                       stats=stats)
+
+        self.assertEqual(texts, [f"Text of chunk_{i}.wav." for i in range(8)])
+        self.assertEqual(stats, {"requests": 9, "bytes_uploaded": 9 * 64})
+        self.assertEqual(sorted(reported), list(range(8)))
+        self.assertEqual(self.server.requests.count("chunk_3.wav"), 2)
+        self.assertGreater(self.server.peak, 4)
+        # Sequential uploads would take 9 * 0.2s
+        self.assertLess(time.time() - started, 1.2)
+
+    def test_finished_chunks_are_not_uploaded_again(self):
+        texts = transcribe_chunk_files(self.config, self.paths, done={i: f"Earlier {i}." for i in range(6)})
+        self.assertEqual(sorted(self.server.requests), ["chunk_6.wav", "chunk_7.wav"])
+        self.assertEqual(texts[5:], ["Earlier 5.", "Text of chunk_6.wav.", "Text of chunk_7.wav."])
+
+    def test_chunks_that_keep_failing_are_reported(self):
+        self.server.failures = {"chunk_2.wav": 10}
+        reported = []
+        stats = {}
+        with self.assertRaises(ChunkTranscriptionError) as context:
+            transcribe_chunk_files(self.config, self.paths, on_chunk=lambda i, text: reported.append(i),
+                                   stats=stats)
+        self.assertEqual(list(context.exception.errors), [2])
+        # whisper_api.retries is the only retry budget, and every upload is counted
+        self.assertEqual(self.server.requests.count("chunk_2.wav"), 3)
+        self.assertEqual(stats["requests"], len(self.server.requests))
+        self.assertEqual(sorted(reported), [0, 1, 3, 4, 5, 6, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,483 @@
+import unittest
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from core.scheduler import JobScheduler
+from core.pipeline import StagePipeline
+from core.job_store import LOCAL_PIPELINE, WHISPER_API_PIPELINE, JobStore, close_job_stores
+from core.job_reports import format_jobs, list_jobs
+from core.audio import SpanChunks
+from core.model_registry import ModelRegistry
+from core import transcription_pool
+from core.transcription_pool import TranscriptionPool, get_transcription_pool
+
+
+class TestJobScheduler(unittest.TestCase):
+    def test_concurrency_is_bounded(self):
+        """No more than max_workers jobs run at the same time"""
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def job():
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            return True
+
+        scheduler = JobScheduler(max_workers=3)
+        for i in range(10):
+            scheduler.submit(f"job_{i}", job)
+        summary = scheduler.run()
+
+        self.assertEqual(summary["total"], 10)
+        self.assertEqual(summary["succeeded"], 10)
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_failures_are_reported(self):
+        """Falsy results and exceptions count as failures in the summary"""
+        def explode():
+            raise RuntimeError("boom")
+
+        scheduler = JobScheduler(max_workers=2)
+        scheduler.submit("ok", lambda: True)
+        scheduler.submit("false", lambda: False)
+        scheduler.submit("error", explode)
+        summary = scheduler.run()
+
+        self.assertEqual(summary["failed"], 2)
+        self.assertEqual([r["name"] for r in summary["results"]], ["ok", "false", "error"])
+        self.assertEqual(summary["results"][2]["error"], "boom")
+
+    def test_priority_order(self):
+        """Higher priority jobs start first, FIFO within a priority"""
+        order = []
+        scheduler = JobScheduler(max_workers=1)
+        scheduler.submit("low", order.append, "low")
+        scheduler.submit("high", order.append, "high", priority=5)
+        scheduler.submit("low2", order.append, "low2")
+        scheduler.run()
+        self.assertEqual(order, ["high", "low", "low2"])
+
+
+class TestStagePipeline(unittest.TestCase):
+    def test_stages_overlap_across_items(self):
+        """A slow stage bounds throughput instead of the sum of all stages"""
+        def stage(seconds):
+            def run(item):
+                time.sleep(seconds)
+                return True
+            return run
+
+        pipeline = StagePipeline([("a", stage(0.05), 1), ("b", stage(0.05), 1), ("c", stage(0.05), 1)])
+        summary = pipeline.run(range(6))
+
+        self.assertEqual(summary["succeeded"], 6)
+        # Sequential would take 6 * 0.15s; pipelined is about (6 + 2) * 0.05s
+        self.assertLess(summary["duration"], 0.6)
+
+    def test_failed_items_stop_at_their_stage(self):
+        """Items that fail are reported with the stage they failed in"""
+        seen = []
+
+        def check(item):
+            if item == 1:
+                raise ValueError("bad item")
+            return True
+
+        def record(item):
+            seen.append(item)
+            return True
+
+        pipeline = StagePipeline([("check", check, 2), ("record", record, 1)])
+        summary = pipeline.run([0, 1, 2], names=["zero", "one", "two"])
+
+        self.assertEqual(sorted(seen), [0, 2])
+        self.assertEqual(summary["results"][1]["failed_stage"], "check")
+        self.assertIn("bad item", summary["results"][1]["error"])
+        self.assertEqual(summary["succeeded"], 2)
+
+    def test_stage_workers_are_capped_at_max_workers(self):
+        """max_workers still bounds concurrency when stages are pipelined"""
+        from core import video_processor
+
+        created = {}
+
+        def pipeline(stages, queue_size):
+            created["workers"] = {name: workers for name, _, workers in stages}
+            return mock.Mock(run=mock.Mock(return_value={}))
+
+        config = {"stage_workers": {"extract": 2, "transcribe": 1, "generate": 4}}
+        with mock.patch.object(video_processor, "StagePipeline", side_effect=pipeline):
+            video_processor._run_stage_pipeline([], "out", None, config, max_workers=2)
+            self.assertEqual(created["workers"], {"extract": 2, "transcribe": 1, "generate": 2})
+            video_processor._run_stage_pipeline([], "out", None, config, max_workers=1)
+            self.assertEqual(set(created["workers"].values()), {1})
+
+
+class FakeTensor:
+    def __init__(self, size_mb):
+        self.size_mb = size_mb
+
+    def numel(self):
+        return int(self.size_mb * 1024 * 1024)
+
+    def element_size(self):
+        return 1
+
+
+class FakeWhisperModel:
+    """Stands in for a Whisper model: a parameter size and a transcribe() that tracks overlap"""
+
+    def __init__(self, size_mb):
+        self.size_mb = size_mb
+        self.lock = threading.Lock()
+        self.running = self.peak = 0
+
+    def parameters(self):
+        return [FakeTensor(self.size_mb)]
+
+    def buffers(self):
+        return []
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return {"segments": [], "audio": audio}
+
+
+class FakeRegistry(ModelRegistry):
+    """Registry whose "models" are 100 MB fakes that take a moment to load"""
+
+    def __init__(self, memory_budget_mb):
+        super().__init__(memory_budget_mb)
+        self.loads = []
+
+    def _load(self, model_name, device, dtype):
+        self.loads.append(model_name)
+        time.sleep(0.05)
+        return FakeWhisperModel(100)
+
+
+class TestModelRegistry(unittest.TestCase):
+    def test_least_recently_used_model_is_evicted_over_budget(self):
+        """Using a model moves it to the back; the budget evicts from the front"""
+        registry = FakeRegistry(memory_budget_mb=250)
+        first = registry.get_model("a", "cpu", "float32")
+        registry.get_model("b", "cpu", "float32")
+        self.assertIs(registry.get_model("a", "cpu", "float32"), first)
+        registry.get_model("c", "cpu", "float32")
+
+        self.assertEqual(list(registry.loaded_models()), [("a", "cpu", "float32"), ("c", "cpu", "float32")])
+        self.assertEqual(registry.loads, ["a", "b", "c"])
+        registry.get_model("b", "cpu", "float32")
+        self.assertEqual(registry.loads, ["a", "b", "c", "b"])
+        self.assertNotIn(("a", "cpu", "float32"), registry.loaded_models())
+
+    def test_concurrent_requests_load_a_model_once(self):
+        registry = FakeRegistry(memory_budget_mb=1000)
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(registry.get_model("a", "cpu", "float32")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(registry.loads, ["a"])
+        self.assertEqual(len({id(model) for model in models}), 1)
+
+    def test_transcribe_runs_one_chunk_at_a_time_per_model(self):
+        """Threads sharing a model never decode on it concurrently"""
+        registry = FakeRegistry(memory_budget_mb=1000)
+        model = registry.get_model("a", "cpu", "float32")
+        threads = [threading.Thread(target=registry.transcribe, args=(model, i), kwargs={"language": "en"})
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(model.peak, 1)
+
+
+class InProcessExecutor(ThreadPoolExecutor):
+    """Stands in for the worker processes (whisper and torch aren't needed in the test process)"""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers)
+
+
+def fake_transcribe_in_worker(chunk, language):
+    time.sleep(0.01)
+    return [{"start": 0.0, "end": 1.0, "text": f"{chunk} ({language})"}]
+
+
+class TestTranscriptionPool(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch("core.transcription_pool.ProcessPoolExecutor", InProcessExecutor),
+                   mock.patch("core.transcription_pool._transcribe_in_worker", fake_transcribe_in_worker),
+                   mock.patch.object(transcription_pool, "_pool", None),
+                   mock.patch.object(transcription_pool, "_pool_key", None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_chunks_in_flight_are_bounded(self):
+        """At most two chunks per worker are taken from the chunk iterator ahead of the results"""
+        pool = TranscriptionPool({"model": "base"}, workers=2, threads_per_worker=1)
+        taken = []
+
+        def chunks():
+            for i in range(10):
+                taken.append(i)
+                yield f"chunk {i}"
+
+        results = pool.map(chunks(), "en")
+        self.assertEqual(next(results)[0]["text"], "chunk 0 (en)")
+        self.assertEqual(len(taken), 4)
+        self.assertEqual([segments[0]["text"] for segments in results], [f"chunk {i} (en)" for i in range(1, 10)])
+        pool.shutdown()
+
+    def test_worker_initializer_sets_the_thread_budget(self):
+        cpu_sets = mock.Mock()
+        cpu_sets.get_nowait.return_value = {0, 1}
+        torch = mock.Mock()
+        with mock.patch.dict(os.environ), mock.patch.dict("sys.modules", {"torch": torch}), \
+                mock.patch("core.model_registry.model_registry.warm") as warm, \
+                mock.patch("os.sched_setaffinity", create=True) as set_affinity:
+            transcription_pool._init_worker({"model": "small"}, 2, cpu_sets)
+            self.assertEqual(os.environ["OMP_NUM_THREADS"], "2")
+            self.assertEqual(os.environ["MKL_NUM_THREADS"], "2")
+        torch.set_num_threads.assert_called_once_with(2)
+        set_affinity.assert_called_once_with(0, {0, 1})
+        warm.assert_called_once_with("small", None, None)
+
+    def test_pool_is_only_replaced_when_worker_settings_change(self):
+        config = {"model": "base", "worker_processes": 2, "threads_per_worker": 1, "language": "en"}
+        pool = get_transcription_pool(config)
+        self.assertIs(get_transcription_pool(dict(config, language="de", model_memory_budget_mb=1)), pool)
+        replacement = get_transcription_pool(dict(config, model="small"))
+        self.assertIsNot(replacement, pool)
+        replacement.shutdown()
+
+    def test_replacing_the_pool_does_not_cancel_a_running_map(self):
+        """A video mid-map on a replaced pool still gets every chunk transcribed"""
+        config = {"model": "base", "worker_processes": 1, "threads_per_worker": 1}
+        pool = get_transcription_pool(config)
+        results = pool.map((f"chunk {i}" for i in range(6)), "en")
+        first = next(results)
+
+        get_transcription_pool(dict(config, model="small")).shutdown()
+        texts = [first[0]["text"]] + [segments[0]["text"] for segments in results]
+        self.assertEqual(texts, [f"chunk {i} (en)" for i in range(6)])
+        # Shut down once its last map finished
+        with self.assertRaises(RuntimeError):
+            pool._executor.submit(print)
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.sqlite3")
+
+    def tearDown(self):
+        close_job_stores()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_leases(self):
+        """A live lease keeps other workers out; an expired one makes the job resumable"""
+        store = JobStore(self.path, lease_seconds=60)
+        job_id = store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"))
+        self.assertTrue(store.claim(job_id))
+
+        other = JobStore(self.path, lease_seconds=60)
+        other.owner = "other-host:1"
+        self.assertFalse(other.claim(job_id))
+        self.assertEqual(other.next_jobs(), [])
+
+        # The worker died: its lease runs out without being renewed
+        store._execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+        self.assertEqual([job["id"] for job in other.next_jobs()], [job_id])
+        self.assertTrue(other.claim(job_id))
+        self.assertEqual(other.get_job(job_id)["attempts"], 2)
+        store.close()
+        other.close()
+
+    def test_lease_of_a_dead_local_process_is_taken_over(self):
+        """After a crash and an immediate restart the job doesn't wait for the old lease to run out"""
+        store = JobStore(self.path, lease_seconds=300)
+        job_id = store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"))
+        crashed = subprocess.Popen([sys.executable, "-c", "pass"])
+        crashed.wait()
+        store._execute("UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ? WHERE id = ?",
+                       (f"{socket.gethostname()}:{crashed.pid}", time.time() + 300, job_id))
+
+        self.assertEqual([job["id"] for job in store.next_jobs()], [job_id])
+        self.assertTrue(store.claim(job_id))
+        self.assertEqual(store.get_job(job_id)["lease_owner"], store.owner)
+
+        # A live process on this host keeps its lease
+        store._execute("UPDATE jobs SET lease_owner = ? WHERE id = ?",
+                       (f"{socket.gethostname()}:{os.getppid()}", job_id))
+        self.assertFalse(store.claim(job_id))
+        self.assertEqual(store.next_jobs(), [])
+        store.close()
+
+    def test_chunks_and_reruns(self):
+        """Chunks are checkpointed; finished jobs start over when enqueued again"""
+        store = JobStore(self.path)
+        job_id = store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"))
+        store.claim(job_id)
+        store.save_chunk(job_id, 0, 0.0, 10.0, [{"start": 0, "end": 5, "text": "one"}])
+        store.save_chunk(job_id, 1, 10.0, 20.0, [])
+        self.assertEqual(store.completed_chunks(job_id), {0: (0.0, 10.0, [{"start": 0, "end": 5, "text": "one"}])})
+        self.assertEqual(list_jobs(store)[0]["chunks_done"], 1)
+
+        store.finish(job_id, False, "crashed")
+        self.assertEqual(store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk")), job_id)
+        self.assertEqual(len(store.completed_chunks(job_id)), 1)
+
+        store.finish(job_id, True)
+        store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"))
+        self.assertEqual(store.completed_chunks(job_id), {})
+        self.assertEqual(store.get_job(job_id)["status"], "queued")
+        store.close()
+
+    def test_pipelines_resume_only_their_own_jobs(self):
+        """Backend (whisper-1) and local jobs share the database but not the resume queue"""
+        store = JobStore(self.path)
+        local = store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"))
+        remote = store.enqueue("demo.mp4", self.directory, os.path.join(self.directory, "demo"),
+                               pipeline=WHISPER_API_PIPELINE)
+        self.assertEqual([job["id"] for job in store.next_jobs(pipeline=LOCAL_PIPELINE)], [local])
+        self.assertEqual([job["id"] for job in store.next_jobs(pipeline=WHISPER_API_PIPELINE)], [remote])
+        self.assertEqual([job["id"] for job in list_jobs(store, pipeline=WHISPER_API_PIPELINE)], [remote])
+        self.assertIn(WHISPER_API_PIPELINE, format_jobs(list_jobs(store)))
+
+        # Running a video through the other pipeline moves its job over and starts it afresh
+        store.claim(local)
+        store.save_chunk(local, 0, 0.0, 10.0, [{"start": 0, "end": 5, "text": "one"}])
+        store.finish(local, False, "crashed")
+        self.assertEqual(store.enqueue("talk.mp4", self.directory, os.path.join(self.directory, "talk"),
+                                       pipeline=WHISPER_API_PIPELINE), local)
+        self.assertEqual(store.completed_chunks(local), {})
+        self.assertEqual(store.next_jobs(pipeline=LOCAL_PIPELINE), [])
+        store.close()
+
+    def test_old_databases_gain_the_pipeline_column(self):
+        import sqlite3
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY, video_path TEXT NOT NULL, "
+                           "output_dir TEXT NOT NULL, output_folder TEXT NOT NULL, status TEXT NOT NULL "
+                           "DEFAULT 'queued', stage TEXT, priority INTEGER NOT NULL DEFAULT 0, attempts INTEGER "
+                           "NOT NULL DEFAULT 0, lease_owner TEXT, lease_expires REAL, error TEXT, created REAL "
+                           "NOT NULL, started REAL, finished REAL, UNIQUE (video_path, output_dir))")
+        connection.execute("INSERT INTO jobs (video_path, output_dir, output_folder, created) "
+                           "VALUES ('/v/talk.mp4', '/out', '/out/talk', 0)")
+        connection.commit()
+        connection.close()
+
+        store = JobStore(self.path)
+        self.assertEqual([job["pipeline"] for job in store.next_jobs()], [LOCAL_PIPELINE])
+        store.close()
+
+    def test_backend_runs_without_a_working_job_store(self):
+        """A locked or corrupt database doesn't stop the backend from processing"""
+        import video_processor_backend
+        store = mock.Mock()
+        store.enqueue.side_effect = RuntimeError("database is locked")
+        with mock.patch.object(video_processor_backend, "get_job_store", return_value=store):
+            processor = video_processor_backend.VideoProcessor(os.path.join(self.directory, "talk.mp4"),
+                                                               self.directory)
+        self.assertIsNone(processor.job_id)
+
+    def test_processor_resumes_after_last_completed_chunk(self):
+        """A restarted run only transcribes the chunks the interrupted one didn't finish"""
+        from core.video_processor import VideoProcessor
+
+        config = {"jobs": {"database": self.path}, "whisper": {"worker_processes": 0},
+                  "cache": {"transcripts": False}}
+        plan = [[(0.0, 10.0)], [(10.0, 20.0)], [(20.0, 30.0)]]
+        transcribed = []
+
+        def transcribe(processor, span):
+            if span == (20.0, 30.0) and not transcribed[-1:] == ["crash"]:
+                transcribed.append("crash")
+                raise RuntimeError("worker killed")
+            transcribed.append(span)
+            return [{"start": 0.0, "end": 5.0, "text": f"Words at {span[0]:.0f}."}]
+
+        with mock.patch("core.video_processor.load_config", return_value=config), \
+                mock.patch.object(VideoProcessor, "_prepare_chunks",
+                                  lambda processor: SpanChunks(lambda start, end: (start, end), plan)), \
+                mock.patch.object(VideoProcessor, "_transcribe_audio", transcribe):
+            video = os.path.join(self.directory, "talk.mp4")
+            first = VideoProcessor(video, self.directory)
+            self.assertTrue(first.run_stage("extract"))
+            self.assertFalse(first.run_stage("transcribe"))
+
+            second = VideoProcessor(video, self.directory)
+            self.assertTrue(second.run_stage("extract"))
+            self.assertTrue(second.run_stage("transcribe"))
+            self.assertEqual(transcribed, [(0.0, 10.0), (10.0, 20.0), "crash", (20.0, 30.0)])
+            self.assertIn("Words at 0.", second.full_transcript)
+            self.assertIn("Words at 20.", second.full_transcript)
+
+            # The run fails before generating; the next one reuses the transcript
+            second._finish_job(False, "generate stage failed")
+            third = VideoProcessor(video, self.directory)
+            self.assertTrue(third.run_stage("extract"))
+            self.assertTrue(third.run_stage("transcribe"))
+            self.assertEqual(len(transcribed), 4)
+            self.assertEqual(third.full_transcript, second.full_transcript)
+
+    def test_failed_chunks_leave_the_job_unfinished(self):
+        """A chunk that failed to transcribe fails the job, and resuming transcribes only that chunk"""
+        from core.video_processor import VideoProcessor
+
+        config = {"jobs": {"database": self.path}, "whisper": {"worker_processes": 0},
+                  "cache": {"transcripts": False}}
+        plan = [[(0.0, 10.0)], [(10.0, 20.0)]]
+        transcribed = []
+
+        def transcribe(processor, span):
+            transcribed.append(span)
+            if span == (10.0, 20.0) and len(transcribed) == 2:
+                return []  # _transcribe_audio's result for an error
+            return [{"start": 0.0, "end": 5.0, "text": f"Words at {span[0]:.0f}."}]
+
+        with mock.patch("core.video_processor.load_config", return_value=config), \
+                mock.patch.object(VideoProcessor, "_prepare_chunks",
+                                  lambda processor: SpanChunks(lambda start, end: (start, end), plan)), \
+                mock.patch.object(VideoProcessor, "_transcribe_audio", transcribe), \
+                mock.patch.object(VideoProcessor, "_generate_stage", lambda processor: None):
+            video = os.path.join(self.directory, "talk.mp4")
+            first = VideoProcessor(video, self.directory)
+            self.assertTrue(first.process_video())
+            job = first.jobs.get_job(first.job_id)
+            self.assertEqual(job["status"], "failed")
+            self.assertNotIn("transcribe", first.jobs.completed_stages(first.job_id))
+
+            second = VideoProcessor(video, self.directory)
+            self.assertTrue(second.process_video())
+            self.assertEqual(transcribed, [(0.0, 10.0), (10.0, 20.0), (10.0, 20.0)])
+            self.assertEqual(second.jobs.get_job(second.job_id)["status"], "done")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
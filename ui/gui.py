@@ -14,7 +14,11 @@ import traceback
 import queue
 import platform
 
-from core.video_processor import VideoProcessor, process_videos_multithreaded
+from core.video_processor import VideoProcessor, process_videos_multithreaded, resume_jobs
+from core.job_store import get_job_store
+from core.job_reports import format_jobs, list_jobs, status_counts
+from core.platform_content import parse_field
+from core.regenerate import latest_social_media_json, regenerate_social_content
 from utils.config import load_config, save_config, get_api_key, set_api_key
 from utils.prompts import load_prompts, save_prompts
 from utils.logger import logger, log_exception
@@ -31,6 +35,10 @@ class VideoProcessorGUI:
         """Initialize the GUI"""
         self.window = None
         
+        # Streaming social media content: whether the Results tab was reset, last update per field
+        self.streaming_results = False
+        self.stream_updates = {}
+        
         # Load configuration
         self.config = load_config()
         
@@ -81,6 +89,8 @@ class VideoProcessorGUI:
             ], font=("Helvetica", 10, "bold"), pad=(10, 5))],
             [sg.Button("Process Video", size=(15, 1), button_color=("white", "#1E6FBA")), 
              sg.Button("View Results", size=(15, 1), button_color=("white", "#1E6FBA")), 
+             sg.Button("Job Status", key="-JOBS-", size=(12, 1), button_color=("white", "#7D8597")),
+             sg.Button("Resume Jobs", key="-RESUME_JOBS-", size=(12, 1), button_color=("white", "#7D8597")),
              sg.Button("Exit", size=(10, 1), button_color=("white", "#B31312"))],
             [sg.Text("Status:", size=(10, 1)), 
              sg.Text("Ready", size=(50, 1), key="-STATUS-", relief=sg.RELIEF_SUNKEN)],
@@ -94,7 +104,9 @@ class VideoProcessorGUI:
                 [sg.Text("Select Output Directory:", font=("Helvetica", 10))],
                 [sg.Input(key="-RESULTS_DIR-", size=(60, 1)), 
                  sg.FolderBrowse(size=(10, 1))],
-                [sg.Button("Load Results", size=(15, 1), button_color=("white", "#1E6FBA"))]
+                [sg.Button("Load Results", size=(15, 1), button_color=("white", "#1E6FBA")),
+                 sg.Button("Regenerate Social Content", key="-REGENERATE-", size=(22, 1),
+                           button_color=("white", "#7D8597"))]
             ], font=("Helvetica", 10, "bold"), pad=(10, 5))],
             [sg.Frame("Processed Videos", [
                 [sg.Listbox(values=[], size=(80, 5), key="-VIDEO_LIST-", enable_events=True, 
@@ -176,7 +188,10 @@ class VideoProcessorGUI:
                           resolution=0.1, orientation="h", size=(20, 15), key="-OPENAI_TEMP-")],
                 [sg.Text("Max Tokens:", size=(15, 1)), 
                  sg.Slider(range=(100, 4000), default_value=config.get("openai", {}).get("max_tokens", 1000),
-                          resolution=100, orientation="h", size=(20, 15), key="-OPENAI_TOKENS-")]
+                          resolution=100, orientation="h", size=(20, 15), key="-OPENAI_TOKENS-")],
+                [sg.Text("", size=(15, 1)),
+                 sg.Checkbox("Generate platforms concurrently (streaming)",
+                             default=config.get("llm", {}).get("per_platform", False), key="-PER_PLATFORM-")]
             ], font=("Helvetica", 10, "bold"), pad=(10, 5))],
             
             [sg.Frame("Whisper Settings", [
@@ -191,8 +206,11 @@ class VideoProcessorGUI:
             
             [sg.Frame("Processing Settings", [
                 [sg.Text("Chunk Size (sec):", size=(15, 1)), 
-                 sg.Slider(range=(30, 1200), default_value=config.get("processing", {}).get("chunk_size", 600) / 60,
+                 sg.Slider(range=(30, 1200), default_value=config.get("processing", {}).get("chunk_size", 600),
                           resolution=30, orientation="h", size=(20, 15), key="-CHUNK_SIZE-")],
+                [sg.Text("Overlap (sec):", size=(15, 1)), 
+                 sg.Slider(range=(0, 60), default_value=config.get("processing", {}).get("overlap", 30),
+                          resolution=5, orientation="h", size=(20, 15), key="-OVERLAP-")],
                 [sg.Text("Max Threads:", size=(15, 1)), 
                  sg.Slider(range=(1, 8), default_value=config.get("processing", {}).get("max_threads", 4),
                           resolution=1, orientation="h", size=(20, 15), key="-MAX_THREADS-")]
@@ -251,7 +269,8 @@ class VideoProcessorGUI:
         """Process a single video file"""
         try:
             self.update_terminal_output(f"Starting video processing for: {os.path.basename(video_path)}")
-            processor = VideoProcessor(video_path, output_dir, self.update_terminal_output)
+            processor = VideoProcessor(video_path, output_dir, self.update_terminal_output,
+                                       self.stream_social_media_content)
             result = processor.process_video()
             if result:
                 # Use write_event_value instead of direct updates from worker threads
@@ -275,13 +294,39 @@ class VideoProcessorGUI:
             self.window.write_event_value("-UPDATE_STATUS-", "Error processing video")
             self.window.write_event_value("-VIDEO_PROCESSING_DONE-", {"success": False, "error": str(e)})
     
+    def stream_social_media_content(self, field, text, done):
+        """Forward streamed social media text to the Results tab (called from worker threads)"""
+        # Send at most ~20 updates per second per field; the final text is always sent
+        now = time.monotonic()
+        if not done and now - self.stream_updates.get(field, 0) < 0.05:
+            return
+        self.stream_updates[field] = now
+        self.window.write_event_value("-SM_STREAM-", {"field": field, "text": text})
+    
+    def show_streamed_content(self, field, text):
+        """Show a streamed social media field in the matching Results tab field"""
+        if field == "youtube_title":
+            self.window["-SM_TITLE-"].update(text)
+        elif field == "youtube_description":
+            self.window["-SM_DESCRIPTION-"].update(text)
+            self.window["-SM_HASHTAGS-"].update(" ".join(re.findall(r"#\w+", text)))
+        elif field == "tweets":
+            # A JSON response streams the finished list; per-platform mode streams separated text
+            tweets = text if isinstance(text, list) else parse_field(text, True)
+            self.window["-SM_CAPTIONS-"].update("\n\n".join(str(tweet) for tweet in tweets))
+    
     def process_multiple_videos(self, video_paths, output_dir):
         """Process multiple videos concurrently"""
         try:
             self.update_terminal_output(f"Starting multi-threaded processing of {len(video_paths)} videos")
-            process_videos_multithreaded(video_paths, output_dir, self.update_terminal_output)
-            self.window.write_event_value("-UPDATE_STATUS-", "Processing completed")
-            self.update_terminal_output("All videos processed successfully", "SUCCESS")
+            summary = process_videos_multithreaded(video_paths, output_dir, self.update_terminal_output)
+            if summary["failed"] == 0:
+                self.window.write_event_value("-UPDATE_STATUS-", "Processing completed")
+                self.update_terminal_output("All videos processed successfully", "SUCCESS")
+            else:
+                failed = [result["name"] for result in summary["results"] if not result["success"]]
+                self.window.write_event_value("-UPDATE_STATUS-", f"Processing completed with {summary['failed']} failures")
+                self.update_terminal_output(f"{summary['failed']} of {summary['total']} videos failed: {', '.join(failed)}", "WARNING")
             
             # For multiple videos, we'll just load the results directory without selecting a specific video
             self.window.write_event_value("-VIDEO_PROCESSING_DONE-", {
@@ -294,12 +339,58 @@ class VideoProcessorGUI:
             self.window.write_event_value("-UPDATE_STATUS-", "Error processing videos")
             self.window.write_event_value("-VIDEO_PROCESSING_DONE-", {"success": False, "error": str(e)})
     
+    def resume_unfinished_jobs(self):
+        """Resume every interrupted or queued job in the job store (runs in a worker thread)"""
+        try:
+            summary = resume_jobs(self.update_terminal_output)
+            self.window.write_event_value("-UPDATE_STATUS-",
+                                          f"Resumed {summary['total']} jobs, {summary['failed']} failed")
+            self.update_terminal_output(f"Resumed {summary['succeeded']}/{summary['total']} jobs",
+                                        "SUCCESS" if summary["failed"] == 0 else "WARNING")
+        except Exception as e:
+            log_exception(logger, e, "Error resuming jobs", self.update_terminal_output)
+            self.window.write_event_value("-UPDATE_STATUS-", "Error resuming jobs")
+    
+    def show_job_status(self):
+        """Print the most recent jobs and their progress to the terminal"""
+        store = get_job_store(load_config())
+        if store is None:
+            self.update_terminal_output("The job store is disabled (jobs.enabled in settings)", "WARNING")
+            return
+        counts = status_counts(store)
+        self.update_terminal_output("Jobs: " + (", ".join(f"{count} {status}" for status, count in counts.items())
+                                                or "none"))
+        jobs = list_jobs(store)[:50]
+        if jobs:
+            self.update_terminal_output(format_jobs(jobs))
+        self.window["-STATUSBAR-"].update(f"{counts.get('running', 0)} running, {counts.get('queued', 0)} queued, "
+                                          f"{counts.get('failed', 0)} failed jobs")
+    
+    def regenerate_results(self, folder_path):
+        """Regenerate social media content for every video in a results folder (runs in a worker thread)"""
+        try:
+            summary = regenerate_social_content(folder_path, terminal_output_func=self.update_terminal_output)
+            self.window.write_event_value("-UPDATE_STATUS-",
+                                          f"Regenerated {summary['succeeded']}/{summary['total']} videos")
+            self.window.write_event_value("-REGENERATE_DONE-", {"output_dir": folder_path, "summary": summary})
+        except Exception as e:
+            log_exception(logger, e, "Error regenerating social media content", self.update_terminal_output)
+            self.window.write_event_value("-UPDATE_STATUS-", "Error regenerating social media content")
+    
     def load_video_results(self, folder_path):
         """Load list of processed videos from the results folder"""
         try:
-            # Find all subdirectories in the results folder (each should be a processed video)
-            video_folders = []
-            for item in os.listdir(folder_path):
+            # Videos processed with the job store are looked up there; older results are found on disk
+            store = get_job_store(load_config())
+            jobs = list_jobs(store, output_dir=folder_path) if store else []
+            video_folders = [job["output_folder"] for job in jobs
+                             if job["status"] == "done" and os.path.isdir(job["output_folder"])]
+            unfinished = sum(1 for job in jobs if job["status"] != "done")
+            if unfinished:
+                self.update_terminal_output(f"{unfinished} videos in {folder_path} are unfinished "
+                                            f"(see Job Status / Resume Jobs)", "WARNING")
+            
+            for item in ([] if jobs else os.listdir(folder_path)):
                 item_path = os.path.join(folder_path, item)
                 if os.path.isdir(item_path):
                     # Check if this folder contains our output files
@@ -340,9 +431,9 @@ class VideoProcessorGUI:
                 except Exception as e:
                     self.update_terminal_output(f"Error reading transcript: {str(e)}", "ERROR")
             
-            # Load and display social media content
-            social_media_path = os.path.join(video_folder, "social_media.json")
-            if os.path.exists(social_media_path):
+            # Load and display social media content (the newest version if it was regenerated)
+            social_media_path = latest_social_media_json(video_folder)
+            if social_media_path:
                 try:
                     with open(social_media_path, 'r', encoding='utf-8') as f:
                         content = json.load(f)
@@ -444,7 +535,9 @@ class VideoProcessorGUI:
                         ).start()
                         self.window["-STATUSBAR-"].update(f"Processing {len(video_paths)} videos concurrently...")
                     else:
-                        # Process single video
+                        # Process single video, streaming its social media content to the Results tab
+                        self.streaming_results = False
+                        self.stream_updates = {}
                         threading.Thread(
                             target=self.process_single_video, 
                             args=(video_paths[0], output_dir), 
@@ -452,6 +545,13 @@ class VideoProcessorGUI:
                         ).start()
                         self.window["-STATUSBAR-"].update(f"Processing video: {os.path.basename(video_paths[0])}")
                         
+                if event == "-JOBS-":
+                    self.show_job_status()
+                
+                if event == "-RESUME_JOBS-":
+                    threading.Thread(target=self.resume_unfinished_jobs, daemon=True).start()
+                    self.window["-STATUSBAR-"].update("Resuming unfinished jobs...")
+                
                 if event == "View Results":
                     folder_path = values["-OUTPUT-"]
                     if folder_path and os.path.isdir(folder_path):
@@ -471,6 +571,24 @@ class VideoProcessorGUI:
                     else:
                         sg.popup("Please select a valid results folder.")
                 
+                if event == "-REGENERATE-":
+                    folder_path = values["-RESULTS_DIR-"]
+                    if folder_path and os.path.isdir(folder_path):
+                        # Only the LLM stage is re-run, using the prompts saved in the Prompts tab
+                        threading.Thread(target=self.regenerate_results, args=(folder_path,), daemon=True).start()
+                        self.window["-STATUSBAR-"].update("Regenerating social media content...")
+                    else:
+                        sg.popup_error("Please select a valid results directory")
+                
+                if event == "-REGENERATE_DONE-":
+                    result = values["-REGENERATE_DONE-"]
+                    summary = result["summary"]
+                    sg.popup_notify("Regeneration completed",
+                                    f"{summary['succeeded']} of {summary['total']} videos regenerated")
+                    self.load_video_results(result["output_dir"])
+                    if values["-VIDEO_LIST-"]:
+                        self.display_video_results(values["-VIDEO_LIST-"][0])
+                
                 if event == "-VIDEO_LIST-" and values["-VIDEO_LIST-"]:
                     selected_video = values["-VIDEO_LIST-"][0]
                     self.display_video_results(selected_video)
@@ -528,6 +646,9 @@ class VideoProcessorGUI:
                     config["openai"]["model"] = values["-OPENAI_MODEL-"]
                     config["openai"]["temperature"] = float(values["-OPENAI_TEMP-"])
                     config["openai"]["max_tokens"] = int(values["-OPENAI_TOKENS-"])
+                    if "llm" not in config:
+                        config["llm"] = {}
+                    config["llm"]["per_platform"] = bool(values["-PER_PLATFORM-"])
                     
                     # Update Whisper settings
                     if "whisper" not in config:
@@ -538,7 +659,8 @@ class VideoProcessorGUI:
                     # Update processing settings
                     if "processing" not in config:
                         config["processing"] = {}
-                    config["processing"]["chunk_size"] = int(values["-CHUNK_SIZE-"]) * 60  # Convert to seconds
+                    config["processing"]["chunk_size"] = int(values["-CHUNK_SIZE-"])
+                    config["processing"]["overlap"] = int(values["-OVERLAP-"])
                     config["processing"]["max_threads"] = int(values["-MAX_THREADS-"])
                     
                     # Update UI settings
@@ -567,9 +689,11 @@ class VideoProcessorGUI:
                     self.window["-OPENAI_MODEL-"].update(config["openai"]["model"])
                     self.window["-OPENAI_TEMP-"].update(config["openai"]["temperature"])
                     self.window["-OPENAI_TOKENS-"].update(config["openai"]["max_tokens"])
+                    self.window["-PER_PLATFORM-"].update(config["llm"]["per_platform"])
                     self.window["-WHISPER_MODEL-"].update(config["whisper"]["model"])
                     self.window["-WHISPER_LANG-"].update(config["whisper"]["language"])
-                    self.window["-CHUNK_SIZE-"].update(config["processing"]["chunk_size"] / 60)
+                    self.window["-CHUNK_SIZE-"].update(config["processing"]["chunk_size"])
+                    self.window["-OVERLAP-"].update(config["processing"]["overlap"])
                     self.window["-MAX_THREADS-"].update(config["processing"]["max_threads"])
                     self.window["-UI_THEME-"].update(config["ui"]["theme"])
                     
@@ -632,6 +756,17 @@ class VideoProcessorGUI:
                         else:
                             sg.popup_error("Video processing failed - check logs for details")
                 
+                # Show social media content as it streams in
+                if event == "-SM_STREAM-":
+                    update = values["-SM_STREAM-"]
+                    if not self.streaming_results:
+                        # First streamed text of this run: start from empty fields on the Results tab
+                        self.streaming_results = True
+                        for key in ("-SM_TITLE-", "-SM_DESCRIPTION-", "-SM_HASHTAGS-", "-SM_CAPTIONS-"):
+                            self.window[key].update("")
+                        self.window["-TABGROUP-"].Widget.select(1)
+                    self.show_streamed_content(update["field"], update["text"])
+                
                 # Handle terminal update event from worker threads
                 if event == "-TERMINAL_UPDATE-":
                     text = values["-TERMINAL_UPDATE-"]["text"]
@@ -89,12 +89,90 @@ DEFAULT_CONFIG = {
     },
     "whisper": {
         "model": "base",
-        "language": "en"
+        "language": "en",
+        "device": None,  # None picks cuda when available, otherwise cpu
+        "dtype": None,  # None picks float16 on cuda, otherwise float32
+        "model_memory_budget_mb": 4096,  # Loaded models above this are evicted LRU
+        "worker_processes": "auto",  # Transcription processes; "auto" = cores / threads_per_worker (0 on cuda)
+        "threads_per_worker": 4,  # torch intra-op threads per transcription process
+        "cpu_affinity": False  # Pin each transcription process to its own cores (Linux)
+    },
+    "whisper_api": {
+        "max_concurrency": 8,  # whisper-1 chunk uploads in flight per video
+        "retries": 3,  # Retries of a chunk upload that fails to connect, times out or hits a server error
+        "retry_delay": 1.0,  # Seconds before the first retry; doubles with each one
+        "timeout": 120,  # Seconds per chunk upload
+        "encoding": "opus",  # Chunk encoding: "opus" (smallest), "flac" (lossless) or "wav"
+        "upload_limit_mb": 25,  # Largest file the transcription endpoint accepts
+        # Cap on chunk length so long videos still upload in parallel; bytes per video don't
+        # depend on it, only the number of requests and the latency of the slowest chunk do
+        "max_chunk_seconds": 600
     },
     "processing": {
         "chunk_size": 10 * 60,  # 10 minutes in seconds
         "overlap": 30,  # 30 seconds overlap between chunks
-        "max_threads": 4
+        "max_threads": 4,
+        "in_memory_audio": True,  # Decode 16 kHz audio straight into memory instead of audio.wav
+        # Longer videos are memory-mapped from audio.wav instead (30 minutes of 16 kHz float32 is
+        # 115 MB per video in flight); 0 decodes every video into memory
+        "in_memory_audio_max_seconds": 1800,
+        "extract_segments": 4,  # Parallel ffmpeg decodes per long video (1 decodes in one process)
+        "extract_segment_min_seconds": 300,  # Shortest time range given its own decode
+        "keyframes": True,  # Save scene-change keyframes (YouTube thumbnails) from the audio pass
+        "keyframes_only": True,  # Decode only the video's keyframes to find scene changes
+        "keyframe_threshold": 0.4,  # Scene score (0-1) a frame needs to count as a scene change
+        "keyframe_min_interval": 30,  # Seconds between saved keyframes
+        "keyframe_max": 20,
+        "keyframe_width": 640,
+        "vad": True,  # Cut chunks in pauses and skip silent stretches
+        "vad_min_silence": 1.0,  # Silences at least this long (seconds) are not transcribed
+        "pipeline_stages": True,  # Overlap extract/transcribe/generate across videos
+        "stage_workers": {"extract": 2, "transcribe": 1, "generate": 4},
+        "stage_queue_size": 2,  # Videos allowed to wait between two stages
+        "probe_workers": 8  # ffprobe processes run at once when probing a batch of videos
+    },
+    "llm": {
+        "pool_size": 10,  # Keep-alive connections per provider client
+        "timeout": 60,  # Seconds per API request
+        "connect_timeout": 10,
+        "max_retries": 2,  # Retries of a request that failed to connect, timed out or hit a server error
+        "openai_base_url": None,  # OpenAI-compatible endpoint; None uses api.openai.com
+        "rate_limit_retries": 3,  # Retries of a request rejected with HTTP 429
+        "compact_transcript": True,  # Remove fillers, repeated sentences and failure markers
+        "map_reduce": True,  # Summarize transcripts that don't fit the model's context window
+        "section_tokens": 4000,  # Transcript tokens per summarized section
+        "summary_tokens": 500,  # Maximum tokens per section summary
+        "map_workers": 4,  # Sections summarized at the same time
+        "per_platform": False,  # One concurrent, streamed request per social media field
+        "hedge_requests": False,  # Duplicate requests that run longer than usual
+        "hedge_percentile": 95,  # Latency percentile after which a request is duplicated
+        "hedge_default_deadline": 30,  # Seconds, until enough latencies have been seen
+        "hedge_min_deadline": 5,
+        "hedge_fallback_model": None,  # Model for the duplicate (None: the same model)
+        "hedge_budget": 0.1  # Fraction of requests that may be duplicated
+    },
+    "rate_limits": {
+        # Per provider, or per "provider/model" to override a provider's limits
+        "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+        "openai/whisper-1": {"requests_per_minute": 50},
+        "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40000}
+    },
+    "cache": {
+        "directory": None,  # None uses Documents/VideoProcessor_Cache
+        "transcripts": True,  # Reuse transcripts of audio that was transcribed before
+        "transcript_max_mb": 256,
+        "llm_responses": True,  # Reuse responses to identical generation requests
+        "llm_ttl_hours": 168,  # 0 keeps responses until they are evicted by size
+        "llm_max_mb": 64,
+        "llm_bypass": False,  # Always call the API (fresh responses still refresh the cache)
+        "media_probe": True,  # Remember ffprobe results of unchanged files (path, size, mtime)
+        "probe_max_mb": 8
+    },
+    "jobs": {
+        "enabled": True,  # Record jobs, stages and chunks so interrupted runs resume
+        "database": None,  # None uses Documents/VideoProcessor_Data/jobs.sqlite3
+        "lease_seconds": 300,  # A job whose worker stops renewing its lease is resumable after this
+        "max_attempts": 3  # Failed jobs are retried by "resume" until they have run this often
     },
     "ui": {
         "theme": "Default Blue"
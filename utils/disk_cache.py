@@ -0,0 +1,160 @@
+"""
+Size-bounded on-disk cache for the Video Processor application.
+
+Values are stored as one JSON file per key. Entries are evicted least
+recently used first (file modification time is refreshed on every hit) once
+the cache grows past its size limit, and can optionally expire after a TTL.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from utils.file_ops import get_documents_directory
+
+logger = logging.getLogger("VideoProcessor")
+
+
+def cache_directory(config, name):
+    """Return the directory of a named cache (under cache.directory if configured)"""
+    root = config.get("cache", {}).get("directory") or os.path.join(get_documents_directory(), "VideoProcessor_Cache")
+    return os.path.join(root, name)
+
+
+def make_cache_key(*parts):
+    """Hash any mix of str/bytes parts into a hex cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, (bytes, bytearray, memoryview)):
+            part = str(part).encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Thread-safe JSON cache with LRU size eviction, optional TTL and hit/miss statistics"""
+
+    def __init__(self, directory, max_size_mb=256, ttl_seconds=None):
+        self.directory = directory
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._size_bytes = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        """Entries are sharded by key prefix to keep directories small"""
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if self.ttl_seconds is not None and time.time() - entry["created"] > self.ttl_seconds:
+                self._remove(path)
+                raise KeyError(key)
+            os.utime(path)  # Mark as recently used
+            with self._lock:
+                self.hits += 1
+            return entry["value"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Store a JSON-serializable value and evict old entries if over the size limit"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+            # Write to a temporary file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f, ensure_ascii=False)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+
+            with self._lock:
+                if self._size_bytes is not None:
+                    self._size_bytes += size - previous_size
+            if self._current_size() > self.max_size_bytes:
+                self._evict()
+            return True
+        except Exception as e:
+            logger.error(f"Error writing cache entry {key}: {str(e)}")
+            return False
+
+    def _entries(self):
+        """Return (mtime, size, path) for every entry"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                        entries.append((stat.st_mtime, stat.st_size, path))
+                    except OSError:
+                        pass
+        return entries
+
+    def _current_size(self):
+        """Total size of all entries, scanned once and then tracked incrementally"""
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, size, _ in self._entries())
+            return self._size_bytes
+
+    def _remove(self, path):
+        """Delete one entry and update the size total"""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            with self._lock:
+                if self._size_bytes is not None:
+                    self._size_bytes -= size
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is at 90% of its limit"""
+        target = self.max_size_bytes * 0.9
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._size_bytes = total
+
+    def clear(self):
+        """Remove every entry"""
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        """Return hit/miss counts and the current size of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_rate = self.hits / lookups if lookups else 0.0
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hit_rate,
+            "size_bytes": self._current_size(),
+        }
@@ -161,27 +161,21 @@ def is_valid_video_file(file_path):
         if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
             return False
             
-        # Try to open the file with moviepy to verify it's a valid video
+        # One cached ffprobe run tells us whether it has a playable duration
+        from utils.media_probe import probe
+        info = probe(file_path)
+        if info is not None:
+            return info["valid"]
+
+        # ffprobe couldn't be run; fall back to opening the file with moviepy
         try:
             from moviepy.editor import VideoFileClip
             clip = VideoFileClip(file_path)
             duration = clip.duration  # This will fail if the file is not a valid video
             clip.close()
-            return True
+            return duration > 0
         except Exception:
-            # If moviepy fails, try ffprobe as a fallback
-            try:
-                import subprocess
-                result = subprocess.run(
-                    ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                # If we get a duration, it's likely a valid video
-                return result.returncode == 0 and float(result.stdout.strip()) > 0
-            except Exception:
-                return False
+            return False
     except Exception:
         return False
 
@@ -217,15 +211,16 @@ def get_file_metadata(file_path):
         "type": os.path.splitext(file_path)[1].lower() if os.path.exists(file_path) else "",
     }
     
-    # For video files, try to get duration
+    # For video files, add duration and dimensions from the (cached) probe
     if metadata["exists"] and metadata["type"] in ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']:
         try:
-            from moviepy.editor import VideoFileClip
-            clip = VideoFileClip(file_path)
-            metadata["duration"] = clip.duration
-            metadata["width"] = clip.size[0]
-            metadata["height"] = clip.size[1]
-            clip.close()
+            from utils.media_probe import probe
+            info = probe(file_path)
+            if info and info["valid"]:
+                metadata["duration"] = info["duration"]
+                if info["video"]:
+                    metadata["width"] = info["video"]["width"]
+                    metadata["height"] = info["video"]["height"]
         except Exception as e:
             logger.error(f"Error getting video metadata for {file_path}: {str(e)}")
     
@@ -69,5 +69,8 @@ def log_exception(logger, e, context="", terminal_output_func=None):
 def graceful_shutdown():
     """Perform cleanup operations before application shutdown"""
     logger.info("Performing graceful shutdown")
-    # Add any cleanup operations here
+    from core.llm_clients import close_llm_clients
+    close_llm_clients()
+    from core.job_store import close_job_stores
+    close_job_stores()
     logger.info("Application shutdown complete")
@@ -0,0 +1,154 @@
+"""
+Media probing for the Video Processor application.
+
+Runs a single ffprobe per file (instead of opening it with moviepy, which
+starts ffmpeg and a frame reader just to read the duration) and keeps the
+results in a small on-disk index keyed by path, size and modification time,
+so validating or listing the same files again costs no processes at all.
+"""
+import os
+import json
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.disk_cache import DiskCache, cache_directory, make_cache_key
+
+logger = logging.getLogger("VideoProcessor")
+
+PROBE_TIMEOUT = 30
+
+_index = None
+_index_directory = None
+_index_lock = threading.Lock()
+
+
+def _get_index(config):
+    """Return the shared probe index, or None when cache.media_probe is off"""
+    global _index, _index_directory
+    cache_config = config.get("cache", {})
+    if not cache_config.get("media_probe", True):
+        return None
+    directory = cache_directory(config, "probe")
+    # probe_workers threads ask at once; they must all share one index
+    with _index_lock:
+        if _index is None or _index_directory != directory:
+            _index = DiskCache(directory, cache_config.get("probe_max_mb", 8))
+            _index_directory = directory
+        return _index
+
+
+def _rate(value):
+    """Convert an ffprobe frame rate such as "30000/1001" to a float"""
+    try:
+        numerator, _, denominator = str(value).partition("/")
+        return float(numerator) / float(denominator or 1)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def summarize_probe(data):
+    """Reduce ffprobe's JSON output to what the application uses"""
+    streams = data.get("streams", [])
+    fmt = data.get("format", {})
+    # Cover art is reported as a video stream; it isn't one
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    duration = fmt.get("duration") or (video or audio or {}).get("duration") or 0
+    try:
+        duration = float(duration)
+    except (TypeError, ValueError):
+        duration = 0.0
+
+    return {
+        "valid": duration > 0,
+        "duration": duration,
+        "format": fmt.get("format_name"),
+        "bit_rate": int(fmt["bit_rate"]) if str(fmt.get("bit_rate", "")).isdigit() else None,
+        "video": {
+            "codec": video.get("codec_name"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "fps": _rate(video.get("avg_frame_rate")),
+        } if video else None,
+        "audio": {
+            "codec": audio.get("codec_name"),
+            "sample_rate": int(audio["sample_rate"]) if str(audio.get("sample_rate", "")).isdigit() else None,
+            "channels": audio.get("channels"),
+        } if audio else None,
+    }
+
+
+def _run_ffprobe(path):
+    """Probe one file; returns the summary (valid False if ffprobe rejects the file)"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=PROBE_TIMEOUT
+    )
+    if result.returncode != 0:
+        return {"valid": False, "duration": 0.0, "error": result.stderr.strip()[-500:]}
+    return summarize_probe(json.loads(result.stdout or "{}"))
+
+
+def probe(path, config=None):
+    """
+    Return a file's media information, from the index when the file is unchanged.
+
+    Returns:
+        dict: valid, duration, format, bit_rate, video and audio (see
+            summarize_probe), or None if the file is missing or ffprobe
+            can't be run
+
+    Invalid files are indexed as well, so they aren't probed again either.
+    """
+    if config is None:
+        from utils.config import load_config
+        config = load_config()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    index = _get_index(config)
+    key = make_cache_key(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if index is not None:
+        info = index.get(key)
+        if info is not None:
+            return info
+
+    try:
+        info = _run_ffprobe(path)
+    except (OSError, subprocess.TimeoutExpired, ValueError) as e:
+        # Not cached: a missing ffprobe or a stalled network share says nothing about the file
+        logger.error(f"Error probing {path}: {str(e)}")
+        return None
+    if index is not None:
+        index.set(key, info)
+    return info
+
+
+def probe_many(paths, config=None, max_workers=None):
+    """
+    Probe many files concurrently.
+
+    Returns:
+        dict: {path: probe(path)} for every path
+    """
+    if config is None:
+        from utils.config import load_config
+        config = load_config()
+    paths = list(dict.fromkeys(paths))
+    if max_workers is None:
+        max_workers = config.get("processing", {}).get("probe_workers", 8)
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as executor:
+        return dict(zip(paths, executor.map(lambda path: probe(path, config), paths)))
+
+
+def probed_durations(paths, config=None):
+    """Return {path: duration in seconds} (0 for files that couldn't be probed)"""
+    return {path: (info or {}).get("duration", 0.0) for path, info in probe_many(paths, config).items()}
@@ -0,0 +1,160 @@
+"""
+Append-only state journal for the Video Processor application.
+
+Processing state is saved as a JSON Lines file: every checkpoint appends one
+record with only the keys that changed, so its cost does not grow with the
+size of the state. Loading replays the records in order. Once the journal has
+grown to twice the size of its last snapshot it is compacted into a single
+snapshot record, written to a temporary file and atomically renamed over the
+journal, which keeps compaction amortized constant per checkpoint.
+"""
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger("VideoProcessor")
+
+# Journals smaller than this are never compacted
+MIN_COMPACT_BYTES = 1024 * 1024
+
+
+class StateJournal:
+    """Thread-safe key/value state persisted as an append-only JSON Lines journal"""
+
+    def __init__(self, path, fsync=True, min_compact_bytes=MIN_COMPACT_BYTES):
+        """
+        Args:
+            path (str): Journal file (created on the first update)
+            fsync (bool): Flush every record to disk before update() returns
+            min_compact_bytes (int): Size below which the journal is never compacted
+        """
+        self.path = path
+        self.fsync = fsync
+        self.min_compact_bytes = min_compact_bytes
+        self.state = {}
+        self._file = None
+        self._size = 0
+        self._snapshot_size = 0
+        # Set when the journal ends without a newline that load() couldn't repair
+        self._needs_newline = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Replay the journal and return the state.
+
+        A record cut off by a crash can only be the last one; it is dropped
+        (or kept if only its newline is missing) and the journal is compacted
+        so new records start on a clean line. Any other line that can't be
+        read (not JSON, or not a {"set": ...} or {"snapshot": ...} object) is
+        logged and skipped, and the journal is left as it is rather than
+        compacted, so nothing after or in those lines is lost.
+        """
+        with self._lock:
+            self.state = {}
+            self._size = self._snapshot_size = 0
+            self._needs_newline = False
+            if not os.path.exists(self.path):
+                return dict(self.state)
+
+            skipped = 0
+            complete = True
+            with open(self.path, "rb") as f:
+                for number, line in enumerate(f, 1):
+                    self._size += len(line)
+                    # Only the last line can lack its newline
+                    complete = line.endswith(b"\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        if not complete:
+                            # A write cut off by a crash
+                            continue
+                        record = None
+                    if not _is_record(record):
+                        skipped += 1
+                        logger.warning(f"Skipping unreadable line {number} of {self.path}")
+                        continue
+                    if "snapshot" in record:
+                        self.state = record["snapshot"]
+                        self._snapshot_size = len(line)
+                    else:
+                        self.state.update(record.get("set", {}))
+
+            if skipped:
+                # Compacting would drop the unreadable lines for good; the next record starts a new line instead
+                self._needs_newline = not complete
+            elif not complete:
+                logger.warning(f"Repairing an incomplete record at the end of {self.path}")
+                self._compact()
+            return dict(self.state)
+
+    def update(self, changes):
+        """Apply changes to the state and append them to the journal"""
+        if not changes:
+            return
+        line = (json.dumps({"set": changes}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self.state.update(changes)
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "ab")
+            if self._needs_newline:
+                # Don't glue this record onto the journal's unterminated last line
+                line = b"\n" + line
+                self._needs_newline = False
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._size += len(line)
+
+            if self._size > max(2 * self._snapshot_size, self.min_compact_bytes):
+                self._compact()
+
+    def compact(self):
+        """Rewrite the journal as a single snapshot record"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        line = (json.dumps({"snapshot": self.state}, ensure_ascii=False) + "\n").encode("utf-8")
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.replace(temp_path, self.path)
+        _fsync_directory(os.path.dirname(self.path) or ".")
+        self._size = self._snapshot_size = len(line)
+        self._needs_newline = False
+
+    def close(self):
+        """Close the journal file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _is_record(record):
+    """Whether a decoded line is a {"set": {...}} or {"snapshot": {...}} record"""
+    return isinstance(record, dict) and all(isinstance(record.get(key, {}), dict) for key in ("set", "snapshot"))
+
+
+def _fsync_directory(directory):
+    """Make a rename in directory durable (not supported on Windows)"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -13,6 +13,10 @@ import shutil
 import subprocess
 import sys
 
+from core.audio import SAMPLE_RATE, WavChunker
+from core.compaction import compact_transcript
+from utils.state_journal import StateJournal
+
 # Set up logging in user's documents folder
 user_docs = os.path.expanduser('~\\Documents')
 log_dir = os.path.join(user_docs, 'VideoProcessor_Logs')
@@ -90,25 +94,32 @@ class VideoProcessor:
             "transcription_complete": False,
             "social_media_generated": False
         }
-        self.state_file = os.path.join(self.output_folder, "processing_state.json")
+        # Each checkpoint appends only what changed (see utils.state_journal)
+        self.state_file = os.path.join(self.output_folder, "processing_state.jsonl")
+        self.legacy_state_file = os.path.join(self.output_folder, "processing_state.json")
+        self.state_journal = StateJournal(self.state_file)
         self._load_processing_state()
     
     def _load_processing_state(self):
-        """Load processing state from file if it exists"""
+        """Load processing state by replaying the journal, if there is one"""
         try:
-            from utils.file_ops import safe_read_json
-            saved_state = safe_read_json(self.state_file, default={})
+            saved_state = self.state_journal.load()
+            if not saved_state and os.path.exists(self.legacy_state_file):
+                # Carry over the state of a run saved before the journal existed
+                from utils.file_ops import safe_read_json
+                saved_state = safe_read_json(self.legacy_state_file, default={})
+                self.state_journal.update(saved_state)
             if saved_state:
                 self.processing_state.update(saved_state)
-                self.logger.info(f"Loaded processing state: {self.processing_state}")
+                self.logger.info(f"Loaded processing state: {sorted(saved_state)}")
         except Exception as e:
             self.logger.error(f"Error loading processing state: {str(e)}")
     
-    def _save_processing_state(self):
-        """Save current processing state to file"""
+    def _update_processing_state(self, **changes):
+        """Update the processing state and append the changes to the journal"""
+        self.processing_state.update(changes)
         try:
-            from utils.file_ops import safe_write_json
-            safe_write_json(self.state_file, self.processing_state)
+            self.state_journal.update(changes)
         except Exception as e:
             self.logger.error(f"Error saving processing state: {str(e)}")
     
@@ -130,36 +141,25 @@ class VideoProcessor:
                 success = self._extract_audio_with_retry()
                 if not success:
                     return False
-                self.processing_state["audio_extracted"] = True
-                self._save_processing_state()
+                self._update_processing_state(audio_extracted=True)
             else:
                 update_terminal_output(f"Audio already extracted for: {self.video_name}", "INFO")
             
-            # Split audio into chunks (with recovery)
+            # Split audio into chunks (memory-mapped, so this is cheap to redo on resume)
+            status_queue.put(f"Splitting audio into chunks: {self.video_name}")
+            update_terminal_output(f"Splitting audio into chunks: {self.video_name}")
+            chunks = self._split_audio_with_retry()
+            if not chunks:
+                return False
             if not self.processing_state.get("audio_split", False):
-                status_queue.put(f"Splitting audio into chunks: {self.video_name}")
-                update_terminal_output(f"Splitting audio into chunks: {self.video_name}")
-                chunks = self._split_audio_with_retry()
-                if not chunks:
-                    return False
-                self.processing_state["audio_split"] = True
-                self.processing_state["chunks"] = chunks
-                self._save_processing_state()
-            else:
-                chunks = self.processing_state.get("chunks", [])
-                if not chunks:
-                    # If we don't have chunks stored, try to split again
-                    chunks = self._split_audio_with_retry()
-                    if not chunks:
-                        return False
-                update_terminal_output(f"Using {len(chunks)} previously split audio chunks", "INFO")
+                self._update_processing_state(audio_split=True, chunk_count=len(chunks))
             
             # Transcribe each chunk (with recovery)
             if not self.processing_state.get("transcription_complete", False):
                 transcripts = []
-                for i, chunk_path in enumerate(chunks):
+                for i, chunk in enumerate(chunks):
                     status_queue.put(f"Transcribing chunk {i+1}/{len(chunks)} for {self.video_name}")
-                    update_terminal_output(f"Transcribing chunk {i+1}/{len(chunks)}: {os.path.basename(chunk_path)}")
+                    update_terminal_output(f"Transcribing chunk {i+1}/{len(chunks)}")
                     
                     # Check if we already have this chunk transcribed
                     chunk_key = f"transcript_chunk_{i}"
@@ -167,15 +167,14 @@ class VideoProcessor:
                         transcript = self.processing_state[chunk_key]
                         update_terminal_output(f"Using cached transcription for chunk {i+1}", "INFO")
                     else:
-                        transcript = self._transcribe_audio_with_retry(chunk_path)
+                        transcript = self._transcribe_audio_with_retry(chunk)
                         if not transcript:
                             # If transcription fails, try alternative method
                             update_terminal_output(f"Trying alternative transcription method for chunk {i+1}", "WARNING")
-                            transcript = self._transcribe_audio_alternative(chunk_path)
+                            transcript = self._transcribe_audio_alternative(chunk)
                         
                         if transcript:
-                            self.processing_state[chunk_key] = transcript
-                            self._save_processing_state()
+                            self._update_processing_state(**{chunk_key: transcript})
                         else:
                             update_terminal_output(f"Failed to transcribe chunk {i+1}", "ERROR")
                             # Continue with other chunks instead of failing completely
@@ -191,17 +190,14 @@ class VideoProcessor:
                     f.write(full_transcript)
                 update_terminal_output(f"Saved transcript to: {self.transcript_path}", "SUCCESS")
                 
-                self.processing_state["transcription_complete"] = True
-                self.processing_state["full_transcript"] = full_transcript
-                self._save_processing_state()
+                self._update_processing_state(transcription_complete=True, full_transcript=full_transcript)
             else:
                 # Use cached transcript
                 full_transcript = self.processing_state.get("full_transcript", "")
                 if not full_transcript and os.path.exists(self.transcript_path):
                     with open(self.transcript_path, "r", encoding="utf-8") as f:
                         full_transcript = f.read()
-                    self.processing_state["full_transcript"] = full_transcript
-                    self._save_processing_state()
+                    self._update_processing_state(full_transcript=full_transcript)
                 
                 update_terminal_output(f"Using cached transcript for: {self.video_name}", "INFO")
             
@@ -209,7 +205,7 @@ class VideoProcessor:
             if not self.processing_state.get("social_media_generated", False):
                 status_queue.put(f"Generating social media content for {self.video_name}")
                 update_terminal_output(f"Generating social media content for: {self.video_name}")
-                social_media_content = self._generate_social_media_content_with_retry(full_transcript)
+                social_media_content = self._generate_social_media_content_with_retry(compact_transcript(full_transcript))
                 if not social_media_content:
                     return False
                 
@@ -229,8 +225,7 @@ class VideoProcessor:
                     with open(self.social_media_json_path, "w", encoding="utf-8") as f:
                         f.write(json.dumps({"content": social_media_content}, indent=2, ensure_ascii=False))
                 
-                self.processing_state["social_media_generated"] = True
-                self._save_processing_state()
+                self._update_processing_state(social_media_generated=True)
             else:
                 update_terminal_output(f"Using cached social media content for: {self.video_name}", "INFO")
             
@@ -242,6 +237,8 @@ class VideoProcessor:
             error_msg = log_exception(e, f"Error processing video {self.video_name}")
             status_queue.put(f"Error processing {self.video_name}: {str(e)}")
             return False
+        finally:
+            self.state_journal.close()
     
     def _extract_audio_with_retry(self):
         """Extract audio with automatic retry"""
@@ -278,8 +275,8 @@ class VideoProcessor:
             # Command to extract audio
             command = [
                 "ffmpeg", "-i", self.video_path, 
-                "-vn", "-acodec", "pcm_s16le", 
-                "-ar", "44100", "-ac", "1", 
+                "-vn", "-acodec", "pcm_f32le", 
+                "-ar", str(SAMPLE_RATE), "-ac", "1", 
                 self.audio_path, "-y"
             ]
             
@@ -336,4 +333,18 @@ class VideoProcessor:
             log_exception(e, "Error in alternative audio extraction")
             return False
 
+    def _split_audio_with_retry(self):
+        """Memory-map the extracted audio into lazily produced chunks, with retry"""
+        for attempt in range(self.max_retries):
+            try:
+                chunks = WavChunker(self.audio_path)
+                update_terminal_output(f"Mapped {chunks.duration:.1f}s of audio into {len(chunks)} chunks", "INFO")
+                return chunks
+            except Exception as e:
+                log_exception(e, "Error splitting audio")
+                if attempt < self.max_retries - 1:
+                    update_terminal_output(f"Audio splitting error, retrying ({attempt+1}/{self.max_retries})", "WARNING")
+                    time.sleep(self.retry_delay * (attempt + 1))
+        return None
+
 # ... rest of the code remains the same ...
@@ -3,7 +3,6 @@ import logging
 import json
 import datetime
 import traceback
-import threading
 import queue
 import time
 import shutil
@@ -11,7 +10,22 @@ import subprocess
 import argparse
 
 from moviepy.editor import VideoFileClip
-import openai
+
+from core.scheduler import JobScheduler
+from core.remote_transcription import transcribe_chunk_files
+from core.audio_encoding import (UPLOAD_LIMIT_MB, chunk_seconds, encode_chunks, get_encoding_profile,
+                                 oversized_chunks)
+from core.llm_cache import cached_completion
+from core.llm_clients import get_llm_client
+from core.rate_limiter import rate_limited_call, rate_limiter_stats
+from core.tokens import check_prompt_fits
+from core.compaction import compact_with_report
+from core.structured_output import ANY_OBJECT_SCHEMA, extract_json_object, structured_response
+from core.regenerate import regenerate_social_content
+from core.job_store import WHISPER_API_PIPELINE, get_job_store
+from core.job_reports import format_jobs, list_jobs
+from utils.config import load_config
+from utils.media_probe import probed_durations
 
 # Set up logging in user's documents folder
 user_docs = os.path.expanduser('~\Documents')
@@ -31,9 +45,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info(f"Backend application started. Log file: {log_file}")
 
-# Set your OpenAI API key here
-openai.api_key = '' # API key should be provided by the user via settings
-
 # Global queue for status updates (if needed)
 status_queue = queue.Queue()
 
@@ -62,8 +73,9 @@ def save_prompts(prompts):
 
 
 class VideoProcessor:
-    def __init__(self, video_path, output_dir=None):
+    def __init__(self, video_path, output_dir=None, bypass_cache=False):
         self.video_path = video_path
+        self.bypass_cache = bypass_cache  # Ignore cached LLM responses
         self.video_name = os.path.splitext(os.path.basename(video_path))[0]
         self.retries = 3  # Number of retries for operations
         self.retry_delay = 2  # Delay between retries in seconds
@@ -82,6 +94,22 @@ class VideoProcessor:
         # Load AI prompts
         self.prompts = load_prompts()
 
+        # Record the job so an interrupted run skips the chunks already transcribed
+        self.jobs = get_job_store(load_config())
+        self.job_id = None
+        if self.jobs is not None:
+            try:
+                self.job_id = self.jobs.enqueue(video_path, output_dir, self.output_dir,
+                                                pipeline=WHISPER_API_PIPELINE)
+            except Exception as e:
+                # Processing works without the job store, it just can't resume
+                logger.warning(f"Error recording job for {self.video_name}, it won't be resumable: {str(e)}")
+
+        # Set by split_audio and transcribe_video
+        self.encoding = None
+        self.chunk_duration = None
+        self.upload_stats = {}
+
     def retry_operation(self, operation, *args, **kwargs):
         """Retry an operation with exponential backoff"""
         for attempt in range(self.retries):
@@ -104,77 +132,121 @@ class VideoProcessor:
 
     def _extract_audio(self):
         status_queue.put(f"Extracting audio from: {self.video_name}")
+        # Only 16 kHz mono is transcribed, so nothing more is decoded
         audio_path = os.path.join(self.temp_dir, f"{self.video_name}.wav")
         try:
-            clip = VideoFileClip(self.video_path)
-            clip.audio.write_audiofile(audio_path)
-            clip.close()
-        except Exception as e:
-            logger.warning(f"MoviePy failed: {str(e)}, trying ffmpeg...")
             subprocess.run([
                 'ffmpeg', '-i', self.video_path,
                 '-vn', '-acodec', 'pcm_s16le',
-                '-ar', '44100', '-ac', '2', '-y',
+                '-ar', '16000', '-ac', '1', '-y',
                 audio_path
             ], check=True, capture_output=True, text=True)
+        except Exception as e:
+            logger.warning(f"ffmpeg failed: {str(e)}, trying MoviePy...")
+            clip = VideoFileClip(self.video_path)
+            clip.audio.write_audiofile(audio_path, fps=16000, nbytes=2, ffmpeg_params=['-ac', '1'])
+            clip.close()
         return audio_path
 
     def extract_audio(self):
         return self.retry_operation(self._extract_audio)
 
-    def split_audio(self, audio_path, chunk_duration=60):
+    def split_audio(self, audio_path, chunk_duration=None):
+        """Encode the audio into upload-sized chunks with the configured encoding profile"""
         status_queue.put(f"Splitting audio into chunks: {self.video_name}")
-        from pydub import AudioSegment
-        audio = AudioSegment.from_file(audio_path)
-        chunks = []
-        for i in range(0, len(audio), chunk_duration * 1000):
-            chunk = audio[i:i + chunk_duration * 1000]
-            chunk_filename = os.path.join(self.temp_dir, f"chunk_{i//1000}.wav")
-            chunk.export(chunk_filename, format="wav")
-            chunks.append(chunk_filename)
-            status_queue.put(f"Created chunk {len(chunks)} for {self.video_name}")
+        config = load_config()
+        api_config = config.get("whisper_api", {})
+        self.encoding, profile = get_encoding_profile(config)
+        upload_limit_mb = api_config.get("upload_limit_mb", UPLOAD_LIMIT_MB)
+        self.chunk_duration = chunk_duration or chunk_seconds(profile, upload_limit_mb,
+                                                              api_config.get("max_chunk_seconds"))
+        try:
+            chunks = encode_chunks(audio_path, self.temp_dir, profile, self.chunk_duration)
+        except Exception as e:
+            logger.warning(f"ffmpeg chunk encoding failed: {str(e)}, using pydub...")
+            from pydub import AudioSegment
+            audio = AudioSegment.from_file(audio_path)
+            chunks = []
+            for i in range(0, len(audio), self.chunk_duration * 1000):
+                chunk = audio[i:i + self.chunk_duration * 1000]
+                chunk_filename = os.path.join(self.temp_dir, f"chunk_{i//1000:05d}.{profile['format']}")
+                chunk.export(chunk_filename, format=profile['format'], codec=profile['codec'],
+                             bitrate=profile['bitrate'], parameters=['-ac', '1', '-ar', '16000'])
+                chunks.append(chunk_filename)
+        for path in oversized_chunks(chunks, upload_limit_mb):
+            logger.warning(f"{os.path.basename(path)} is over the {upload_limit_mb} MB upload limit; "
+                           f"lower whisper_api.max_chunk_seconds or use a smaller encoding")
+        status_queue.put(f"Created {len(chunks)} {self.encoding} chunks of {self.chunk_duration}s for {self.video_name}")
         return chunks
 
     def transcribe_video(self):
         audio_path = self.extract_audio()
         chunks = self.split_audio(audio_path)
-        full_transcript = ""
-        for i, chunk_file in enumerate(chunks):
-            status_queue.put(f"Transcribing chunk {i+1}/{len(chunks)} for {self.video_name}")
-            try:
-                with open(chunk_file, "rb") as audio_file:
-                    transcript = openai.Audio.transcribe("whisper-1", audio_file, request_timeout=15)
-                full_transcript += transcript["text"] + " "
-            except Exception as e:
-                logger.error(f"Error transcribing chunk {i+1}: {str(e)}")
-                continue
-            finally:
-                time.sleep(0.5)
+        config = load_config()
+        seconds = self.chunk_duration
+        # Chunks transcribed by an interrupted run are reused if they cover the same audio
+        done = {i: segments[0]["text"] for i, (start, end, segments) in self.jobs.completed_chunks(self.job_id).items()
+                if start == i * seconds and end == (i + 1) * seconds} if self.job_id else {}
+
+        def checkpoint(i, text):
+            status_queue.put(f"Transcribed chunk {i+1}/{len(chunks)} for {self.video_name}")
+            if self.job_id:
+                self.jobs.save_chunk(self.job_id, i, i * seconds, (i + 1) * seconds, [{"text": text}])
+
+        status_queue.put(f"Transcribing {len(chunks)} chunks for {self.video_name}")
+        stats = {}
+        try:
+            # Chunks are uploaded in parallel; failed ones are retried on their own
+            texts = transcribe_chunk_files(config, chunks, done=done, on_chunk=checkpoint, stats=stats)
+        finally:
+            for path in chunks + [audio_path]:
                 try:
-                    os.remove(chunk_file)
+                    os.remove(path)
                 except Exception as e:
-                    logger.error(f"Error removing chunk file {chunk_file}: {str(e)}")
-        try:
-            os.remove(audio_path)
-        except Exception as e:
-            logger.error(f"Error removing audio file {audio_path}: {str(e)}")
-        return full_transcript.strip()
+                    logger.error(f"Error removing audio file {path}: {str(e)}")
+            self.upload_stats = {"encoding": self.encoding, "chunk_seconds": seconds, "chunks": len(chunks), **stats}
+            logger.info(f"Uploaded {stats.get('bytes_uploaded', 0) / (1024 * 1024):.1f} MB in "
+                        f"{stats.get('requests', 0)} requests for {self.video_name} "
+                        f"({len(chunks)} {self.encoding} chunks of {seconds}s)")
+        return " ".join(text.strip() for text in texts if text and text.strip())
 
     def generate_social_media_content(self, transcript):
+        transcript, before, after = compact_with_report(transcript, "gpt-3.5-turbo")
+        logger.info(f"Transcript compaction saved {before - after} tokens for {self.video_name}")
+        system_prompt = self.prompts["system_prompt"]
+        user_prompt = self.prompts["content_generation_prompt"].format(transcript=transcript)
         messages = [
-            {"role": "system", "content": self.prompts["system_prompt"]},
-            {"role": "user", "content": self.prompts["content_generation_prompt"].format(transcript=transcript)}
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
         ]
-        try:
-            response = openai.ChatCompletion.create(
+
+        config = load_config()
+
+        # JSON mode needs the prompt to mention JSON; the default prompts do
+        json_mode = "json" in (system_prompt + user_prompt).lower()
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+        def call_api():
+            response = get_llm_client("openai", config).chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages,
-                request_timeout=30
+                timeout=30,
+                **options
             )
             # Assuming response has simplified output for backend
-            content = response.choices[0].message.content
-            # For simplicity, wrap the content in a dict
-            return json.loads(content) if content.strip().startswith('{') else {"generated_content": content}
+            return response.choices[0].message.content
+
+        try:
+            # Refuse prompts that can't fit before making the request
+            tokens = check_prompt_fits("gpt-3.5-turbo", system_prompt + user_prompt, 1000) + 1000
+            content = cached_completion(
+                config, lambda: rate_limited_call(config, "openai", "gpt-3.5-turbo", call_api, tokens), "openai", "gpt-3.5-turbo", system_prompt, user_prompt,
+                None, None, bypass=self.bypass_cache, response_format="json" if json_mode else None
+            )
+            # Invalid JSON gets one repair request rather than a full regeneration
+            content = structured_response(config, "gpt-3.5-turbo", content, ANY_OBJECT_SCHEMA)
+            data = extract_json_object(content)
+            return data if data is not None else {"generated_content": content}
         except Exception as e:
             logger.error(f"Error generating social media content: {str(e)}")
             return {"error": str(e)}
@@ -189,13 +261,23 @@ class VideoProcessor:
                 f.write(str(social_content))
             json_file = os.path.join(self.output_dir, "social_media.json")
             with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump({"source_info": self.video_name, "content": social_content}, f, indent=4)
+                json.dump({"source_info": self.video_name, "transcription": self.upload_stats,
+                           "content": social_content}, f, indent=4)
             return True
         except Exception as e:
             logger.error(f"Error saving outputs: {str(e)}")
             return False
 
     def process_video(self):
+        if self.job_id and not self.jobs.claim(self.job_id):
+            logger.error(f"{self.video_name} is being processed by another worker")
+            return False
+        result = self._process_video()
+        if self.job_id:
+            self.jobs.finish(self.job_id, result, None if result else "see log for details")
+        return result
+
+    def _process_video(self):
         try:
             transcript = self.transcribe_video()
             if not transcript:
@@ -213,32 +295,85 @@ class VideoProcessor:
             return False
 
 
-def process_videos_multithreaded(video_paths, output_dir):
-    """Process multiple videos concurrently using threads"""
-    threads = []
+def _process_single_video(video_path, output_dir, bypass_cache=False):
+    """Create a processor for one video and run it (a scheduler job)"""
+    return VideoProcessor(video_path, output_dir, bypass_cache).process_video()
+
+
+def process_videos_multithreaded(video_paths, output_dir, max_workers=None, bypass_cache=False):
+    """Process multiple videos on a bounded pool of worker threads and return a summary"""
+    if max_workers is None:
+        max_workers = load_config().get("processing", {}).get("max_threads", 4)
+    # Longest videos first, so a long one doesn't start last and hold up the batch
+    durations = probed_durations(video_paths)
+    scheduler = JobScheduler(max_workers)
     for video in video_paths:
-        processor = VideoProcessor(video, output_dir)
-        t = threading.Thread(target=processor.process_video)
-        t.start()
-        threads.append(t)
-    for t in threads:
-        t.join()
+        scheduler.submit(os.path.basename(video), _process_single_video, video, output_dir, bypass_cache,
+                         priority=int(durations.get(video, 0)))
+    summary = scheduler.run()
+    for result in summary["results"]:
+        if not result["success"]:
+            logger.error(f"Failed to process {result['name']}: {result['error'] or 'see log for details'}")
+    summary["rate_limits"] = rate_limiter_stats()
+    for name, stats in summary["rate_limits"].items():
+        logger.info(f"Rate limiter {name}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                    f"waited {stats['total_wait']:.1f}s (max {stats['max_wait']:.1f}s)")
+    return summary
 
 
 def main():
     parser = argparse.ArgumentParser(description='Backend Video Processor')
-    parser.add_argument('--videos', nargs='+', help='List of video file paths', required=True)
+    parser.add_argument('--videos', nargs='+', help='List of video file paths')
+    parser.add_argument('--regenerate', metavar='OUTPUT_DIR', default=None,
+                        help='Regenerate social media content from the saved transcripts in OUTPUT_DIR '
+                             'using the current prompts (no extraction or transcription)')
+    parser.add_argument('--jobs', nargs='?', const='all', default=None,
+                        choices=['all', 'queued', 'running', 'done', 'failed'],
+                        help='List jobs from the job store (optionally only queued, running, done or failed)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume every unfinished job in the job store')
     parser.add_argument('--output', help='Output directory', default=None)
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='Maximum videos processed at once (defaults to processing.max_threads)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Call the LLM even if a cached response exists for the same request')
     args = parser.parse_args()
 
+    if args.regenerate:
+        summary = regenerate_social_content(args.regenerate, max_workers=args.max_workers)
+        print(f"Regenerated {summary['succeeded']}/{summary['total']} videos ({summary['duration']:.1f}s).")
+        return
+    if args.jobs:
+        store = get_job_store(load_config())
+        if store is None:
+            parser.error('the job store is disabled (jobs.enabled in config.json)')
+        print(format_jobs(list_jobs(store, None if args.jobs == 'all' else args.jobs)))
+        return
+    if args.resume:
+        store = get_job_store(load_config())
+        # Only jobs started by this backend; the GUI's jobs are resumed by the GUI
+        jobs = (store.next_jobs(load_config().get("jobs", {}).get("max_attempts", 3), pipeline=WHISPER_API_PIPELINE)
+                if store else [])
+        summary = {"succeeded": 0, "failed": 0}
+        for output_dir in sorted({job["output_dir"] for job in jobs}):
+            batch = process_videos_multithreaded([job["video_path"] for job in jobs if job["output_dir"] == output_dir],
+                                                 output_dir, args.max_workers, args.no_cache)
+            summary["succeeded"] += batch["succeeded"]
+            summary["failed"] += batch["failed"]
+        print(f"Resumed {len(jobs)} jobs. Succeeded: {summary['succeeded']}, failed: {summary['failed']}")
+        return
+    if not args.videos:
+        parser.error('--videos is required unless --regenerate, --jobs or --resume is given')
+
     video_paths = args.videos
     output_dir = args.output if args.output else os.path.dirname(video_paths[0])
 
     if len(video_paths) > 1:
-        process_videos_multithreaded(video_paths, output_dir)
+        summary = process_videos_multithreaded(video_paths, output_dir, args.max_workers, args.no_cache)
         print(f"Processed {len(video_paths)} videos concurrently.")
+        print(f"Succeeded: {summary['succeeded']}, failed: {summary['failed']} ({summary['duration']:.1f}s)")
     else:
-        processor = VideoProcessor(video_paths[0], output_dir)
+        processor = VideoProcessor(video_paths[0], output_dir, args.no_cache)
         result = processor.process_video()
         if result:
             print("Video processed successfully.")